@@ -12,37 +12,55 @@ from pathlib import Path
 import base64
 import ijson
 import sys
+import argparse
+import import_common
+import embedding
+import retry_queue
+import ingest_metrics
+import query_cache
+import dates
+import vector_index
+import replication
+import re
 
-if len(sys.argv) > 1:
-    LOCAL_JSON_PATH = sys.argv[1]
-else:
-    print("Error: No file path provided.")
-    print(f"Usage: python {sys.argv[0]} <path_to_json_file>")
-    sys.exit(1)
-if not os.path.isfile(LOCAL_JSON_PATH):
-    print(f"Error: The file '{LOCAL_JSON_PATH}' does not exist.")
-    sys.exit(1)
-if not LOCAL_JSON_PATH.endswith('.json'):
-    print(f"Error: The file '{LOCAL_JSON_PATH}' does not have a .json extension.")
-    sys.exit(1)
-
-# Don't need OPENAI_APIKEY when connecting to local LM Studio
-headers = {
-    # "X-OpenAI-Api-Key": os.getenv("OPENAI_APIKEY")
-    "X-OpenAI-Api-Key": "NO_KEY_NEEDED_FOR_LM_STUDIO"
-}  # Replace with your OpenAI API key
-
-client = None
-
-try:
-    client = weaviate.connect_to_local(
-        headers=headers,     
-        additional_config=AdditionalConfig(
-            timeout=Timeout(init=30, query=60, insert=120)  # Values in seconds
-        )
-    )
-    assert client.is_live()
-    metainfo = client.get_meta()
+# Single source of truth for the product schema: the collection is created
+# from this list and normalize_products() coerces input records to match it.
+PRODUCT_PROPERTIES = [
+    wc.Property(name="category", data_type=wc.DataType.TEXT_ARRAY, index_filterable=True, index_searchable=True),
+    wc.Property(name="tech1", data_type=wc.DataType.TEXT, skip_vectorization=True, index_filterable=False, index_searchable=False),
+    wc.Property(name="tech2", data_type=wc.DataType.TEXT, skip_vectorization=True, index_filterable=False, index_searchable=False),
+    wc.Property(name="description", data_type=wc.DataType.TEXT_ARRAY, index_filterable=True, index_searchable=True),
+    wc.Property(name="fit", data_type=wc.DataType.TEXT, skip_vectorization=True, index_filterable=False, index_searchable=False),
+    wc.Property(name="title", data_type=wc.DataType.TEXT, index_filterable=True, index_searchable=True),
+    wc.Property(name="also_buy", data_type=wc.DataType.TEXT_ARRAY, skip_vectorization=True, index_filterable=False, index_searchable=False),
+    wc.Property(name="image", data_type=wc.DataType.TEXT_ARRAY, skip_vectorization=True, index_filterable=False, index_searchable=False),
+    wc.Property(name="brand", data_type=wc.DataType.TEXT, index_filterable=True, index_searchable=True),
+    wc.Property(name="feature", data_type=wc.DataType.TEXT_ARRAY, skip_vectorization=True, index_filterable=False, index_searchable=False),
+    wc.Property(name="rank", data_type=wc.DataType.TEXT_ARRAY, skip_vectorization=True, index_filterable=False, index_searchable=False),
+    wc.Property(name="also_view", data_type=wc.DataType.TEXT_ARRAY, skip_vectorization=True, index_filterable=False, index_searchable=False),
+    #wc.Property(name="details", data_type=wc.DataType.OBJECT),
+    wc.Property(name="main_cat", data_type=wc.DataType.TEXT, index_filterable=True, index_searchable=True),
+    #wc.Property(name="similar_item", data_type=wc.DataType.TEXT, skip_vectorization=True, index_filterable=False, index_searchable=False),
+    wc.Property(name="date", data_type=wc.DataType.TEXT, skip_vectorization=True, index_filterable=True, index_searchable=True),
+    wc.Property(name="price", data_type=wc.DataType.TEXT, skip_vectorization=True, index_filterable=True, index_searchable=True),
+    wc.Property(name="asin", data_type=wc.DataType.TEXT, index_filterable=True, index_searchable=True),
+    # Typed copies of price and date for range filters; the raw text above is kept as-is
+    wc.Property(name="price_value", data_type=wc.DataType.NUMBER, skip_vectorization=True, index_filterable=True, index_range_filters=True),
+    wc.Property(name="release_date", data_type=wc.DataType.DATE, skip_vectorization=True, index_filterable=True, index_range_filters=True),
+]
+# Written onto products by batch_import_reviews.py --aggregate, not by this importer
+REVIEW_AGGREGATE_PROPERTIES = [
+    wc.Property(name="review_count", data_type=wc.DataType.INT, skip_vectorization=True, index_filterable=True, index_range_filters=True),
+    wc.Property(name="rating_mean", data_type=wc.DataType.NUMBER, skip_vectorization=True, index_filterable=True, index_range_filters=True),
+    wc.Property(name="verified_share", data_type=wc.DataType.NUMBER, skip_vectorization=True, index_filterable=True, index_range_filters=True),
+    wc.Property(name="latest_review_date", data_type=wc.DataType.DATE, skip_vectorization=True, index_filterable=True, index_range_filters=True),
+]
+# Properties the collection's text2vec-openai module vectorizes (no skip_vectorization)
+VECTORIZED_PROPERTIES = [p.name for p in PRODUCT_PROPERTIES if not p.skip_vectorization]
+interval = 100  # print progress every this many records; should be bigger than the batch_size
+NORMALIZE_CHUNK = 2000  # records normalized together, one column at a time
+
+def create_product_collection(client, vector_index_config=None, sharding_config=None, replication_config=None):
     #print(json.dumps(metainfo, indent=2))  # Print the meta information in a readable format
 #    if client.collections.exists("product"):
 #        print("Dropping existing product collection")
@@ -52,26 +70,10 @@ try:
         print("Before Create product collection")
         client.collections.create(
             name = "product",
-            properties = [
-                wc.Property(name="category", data_type=wc.DataType.TEXT_ARRAY, index_filterable=True, index_searchable=True),
-                wc.Property(name="tech1", data_type=wc.DataType.TEXT, skip_vectorization=True, index_filterable=False, index_searchable=False),
-                wc.Property(name="tech2", data_type=wc.DataType.TEXT, skip_vectorization=True, index_filterable=False, index_searchable=False),
-                wc.Property(name="description", data_type=wc.DataType.TEXT_ARRAY, index_filterable=True, index_searchable=True),
-                wc.Property(name="fit", data_type=wc.DataType.TEXT, skip_vectorization=True, index_filterable=False, index_searchable=False),
-                wc.Property(name="title", data_type=wc.DataType.TEXT, index_filterable=True, index_searchable=True),
-                wc.Property(name="also_buy", data_type=wc.DataType.TEXT_ARRAY, skip_vectorization=True, index_filterable=False, index_searchable=False),
-                wc.Property(name="image", data_type=wc.DataType.TEXT_ARRAY, skip_vectorization=True, index_filterable=False, index_searchable=False),
-                wc.Property(name="brand", data_type=wc.DataType.TEXT, index_filterable=True, index_searchable=True),
-                wc.Property(name="feature", data_type=wc.DataType.TEXT_ARRAY, skip_vectorization=True, index_filterable=False, index_searchable=False),
-                wc.Property(name="rank", data_type=wc.DataType.TEXT_ARRAY, skip_vectorization=True, index_filterable=False, index_searchable=False),
-                wc.Property(name="also_view", data_type=wc.DataType.TEXT_ARRAY, skip_vectorization=True, index_filterable=False, index_searchable=False),
-                #wc.Property(name="details", data_type=wc.DataType.OBJECT),
-                wc.Property(name="main_cat", data_type=wc.DataType.TEXT, index_filterable=True, index_searchable=True),
-                #wc.Property(name="similar_item", data_type=wc.DataType.TEXT, skip_vectorization=True, index_filterable=False, index_searchable=False),
-                wc.Property(name="date", data_type=wc.DataType.TEXT, skip_vectorization=True, index_filterable=True, index_searchable=True),
-                wc.Property(name="price", data_type=wc.DataType.TEXT, skip_vectorization=True, index_filterable=True, index_searchable=True),
-                wc.Property(name="asin", data_type=wc.DataType.TEXT, index_filterable=True, index_searchable=True),
-            ],
+            properties = PRODUCT_PROPERTIES + REVIEW_AGGREGATE_PROPERTIES,
+            vector_index_config = vector_index_config,
+            sharding_config = sharding_config,
+            replication_config = replication_config,
             vectorizer_config = wc.Configure.Vectorizer.text2vec_openai(
                 base_url="http://host.docker.internal:1234"
             ),
@@ -80,158 +82,220 @@ try:
             )
         )
         print("After Create product collection")
+    else:
+        if (vector_index_config, sharding_config, replication_config) != (None, None, None):
+            print("product collection already exists, keeping its vector index, sharding and replication settings")
+        ensure_product_properties(client)
 
-    counter = 0
-    interval = 100  # print progress every this many records; should be bigger than the batch_size
-
-    # Get the collection
+def ensure_product_properties(client):
+    # Collections created before a property was added to the schema above
     products = client.collections.get("product")
+    existing = {p.name for p in products.config.get().properties}
+    for prop in PRODUCT_PROPERTIES + REVIEW_AGGREGATE_PROPERTIES:
+        if prop.name not in existing:
+            print(f"Adding {prop.name} property to product collection")
+            products.config.add_property(prop)
+
+def _text_column(values):
+    return values
+
+def _text_array_column(values):
+    # Scalars become one-element lists, missing values become empty lists
+    return [v if type(v) is list else ([] if v is None else [v]) for v in values]
+
+def _strings_or_list_column(values):
+    # Sometimes rank is a string and sometimes it is an array; anything else is dropped
+    return [v if type(v) is list else ([v] if type(v) is str else []) for v in values]
+
+PRICE_RE = re.compile(r"\$\s*([0-9][0-9,]*(?:\.[0-9]+)?|\.[0-9]+)")
+
+def _price_column(values):
+    # "$12.99" -> 12.99; for ranges like "$5.99 - $12.99" the low end. The
+    # field also holds empty strings and HTML, which become None.
+    prices = []
+    for v in values:
+        m = PRICE_RE.search(v) if type(v) is str else None
+        prices.append(float(m.group(1).replace(",", "")) if m else None)
+    return prices
+
+COLUMN_COERCERS = {
+    wc.DataType.TEXT: _text_column,
+    wc.DataType.TEXT_ARRAY: _text_array_column,
+}
+# Input quirks the data type alone doesn't describe
+COERCE_OVERRIDES = {
+    "rank": _strings_or_list_column,
+}
+# Properties computed from another input field: name -> (source field, column function)
+DERIVED_COLUMNS = {
+    "price_value": ("price", _price_column),
+    "release_date": ("date", dates.text_to_iso),
+}
+_COLUMNS = [
+    DERIVED_COLUMNS.get(p.name, (p.name, COERCE_OVERRIDES.get(p.name, COLUMN_COERCERS.get(p.dataType))))
+    for p in PRODUCT_PROPERTIES
+]
+_NAMES = [p.name for p in PRODUCT_PROPERTIES]
 
-    # Enter context manager
-    with products.batch.dynamic() as batch:
-        print("opening ", LOCAL_JSON_PATH)
-        with open(LOCAL_JSON_PATH, "rb") as f:
-            #print("about to call parse")
-            objects = ijson.items(f, '', multiple_values=True)
-            #print("after calling parse")
-            for obj in objects:
-                #print("category: ", obj["category"])
-                product_obj = {}
-#                if "category" in obj:
-#                    product_obj["category"] = obj["category"]
-#                if "tech1" in obj:
-#                    product_obj["tech1"] = obj["tech1"]
-#                if "tech2" in obj:
-#                    product_obj["tech2"] = obj["tech2"]
-#                if "description" in obj:
-#                    product_obj["description"] = obj["description"]
-#                if "fit" in obj:
-#                    product_obj["fit"] = obj["fit"]
-#                if "title" in obj:
-#                    product_obj["title"] = obj["title"]
-#                if "also_buy" in obj:
-#                    product_obj["also_buy"] = obj["also_buy"]
-#                if "image" in obj:
-#                    product_obj["image"] = obj["image"]
-#                if "brand" in obj:
-#                    product_obj["brand"] = obj["brand"]
-#                if "feature" in obj:
-#                    product_obj["feature"] = obj["feature"]
-#                if "rank" in obj:
-#                    product_obj["rank"] = obj["rank"]
-#                if "also_view" in obj:
-#                    product_obj["also_view"] = obj["also_view"]
-#                if "main_cat" in obj:
-#                    product_obj["main_cat"] = obj["main_cat"]
-#                if "date" in obj:
-#                    product_obj["date"] = obj["date"]
-#                if "price" in obj:
-#                    product_obj["price"] = obj["price"]
-#                #if "details" in obj:
-#                    #product_obj["details"] = obj["details"]
-#                #if "similar_item" in obj:
-#                    #product_obj["similar_item"] = obj["similar_item"]
-                product_obj = {
-                    "category" : obj["category"],
-                    "tech1" : obj["tech1"],
-                    "tech2" : obj["tech2"],
-                    "description" : obj["description"],
-                    "fit" : obj["fit"],
-                    "title" : obj["title"],
-                    "also_buy" : obj["also_buy"],
-                    "image" : obj["image"],
-                    "brand" : obj["brand"],
-                    "feature" : obj["feature"],
-                    "rank" : obj["rank"],
-                    "also_view" : obj["also_view"],
-                    "main_cat" : obj["main_cat"],
-                    "date" : obj["date"],
-                    "price" : obj["price"],
-                    "asin" : obj["asin"],
-                    #"details" : obj["details"],
-                    #"similar_item" : obj["similar_item"],
-                }
-                if not isinstance(obj["category"], list):
-                    product_obj["category"] = [obj["category"]]
-                if not isinstance(obj["description"], list):
-                    product_obj["description"] = [obj["description"]]
-                if not isinstance(obj["also_buy"], list):
-                    product_obj["also_buy"] = [obj["also_buy"]]
-                if not isinstance(obj["image"], list):
-                    product_obj["image"] = [obj["image"]]
-                if not isinstance(obj["feature"], list):
-                    product_obj["feature"] = [obj["feature"]]
-                if not isinstance(obj["also_view"], list):
-                    product_obj["also_view"] = [obj["also_view"]]
-
-                # Sometimes rank is a string and sometimes it is an array
-                if isinstance(obj["rank"], str):
-                    product_obj["rank"] = [obj["rank"]]
-                elif isinstance(obj["rank"], list):
-                    product_obj["rank"] = obj["rank"]
-                else:
-                    product_obj["rank"] = []
-                #print(json.dumps(product_obj, indent=2))
-                # Add object to batch queue
-                batch.add_object(
-                    properties=product_obj,
-                    #uuid=generate_uuid5(obj["asin"])
-                    # references=reference_obj  # You can add references here
-                )
-
-                # Calculate and display progress
-                counter += 1
-                if counter % interval == 0:
-                    print(f"{LOCAL_JSON_PATH}: Imported {counter} products...")
-    print(f"{LOCAL_JSON_PATH}: Before flushing batch")
-    batch.flush()
-    print(f"{LOCAL_JSON_PATH}: After flushing batch")
-    # Check for failed objects
-    old_failed_obj_count = len(products.batch.failed_objects)
-    new_failed_obj_count = 0
-    while True:
-        if len(products.batch.failed_objects) == 0:
-            print(f"{LOCAL_JSON_PATH}: All products imported successfully")
-            break
-        print(f"{LOCAL_JSON_PATH}: Retrying {len(products.batch.failed_objects)} failed objects...")
+def normalize_products(objs):
+    # Build each property as a column over the whole chunk, then zip the
+    # columns back into one dict per product
+    columns = [coerce([obj.get(source) for obj in objs]) for source, coerce in _COLUMNS]
+    return [dict(zip(_NAMES, row)) for row in zip(*columns)]
+
+def product_vector_text(product_obj):
+    return embedding.vectorizer_text("product", product_obj, VECTORIZED_PROPERTIES)
+
+def import_products(path, args, start=0, end=None, worker_id=None, progress_queue=None, metrics=None):
+    label = import_common.shard_label(path, worker_id)
+    if metrics is None:
+        metrics = ingest_metrics.Metrics(label)
+    checkpoint = None
+    if args.checkpoint:
+        checkpoint = import_common.Checkpoint(path, start, end if end is not None else os.path.getsize(path))
+        if args.resume:
+            checkpoint.load()
+            if checkpoint.done:
+                print(f"{label}: Already imported according to {checkpoint.file}, skipping")
+                return 0, 0
+            print(f"{label}: Resuming at byte {checkpoint.offset} ({checkpoint.acknowledged} objects already acknowledged)")
+        acknowledged_before = checkpoint.acknowledged
+    retries = retry_queue.queue_from_args(args, label, path, worker_id)
+    stage = embedding.stage_from_args(args, product_vector_text, metrics=metrics, retries=retries)
+    client = import_common.connect_local(replication.node_for(args, worker_id))
+    try:
         counter = 0
 
-        # save the failed_objects array because calling batch.dynamic() after will clear it out
-        current_failed_object_count = len(products.batch.failed_objects)
-        failed_objects = products.batch.failed_objects
+        # Get the collection
+        products = replication.with_consistency(client.collections.get("product"), args)
+
+        # Enter context manager
         with products.batch.dynamic() as batch:
-            print(f"{LOCAL_JSON_PATH}: Inside retry loop are {len(failed_objects)} failed objects...")
-
-            for failed in failed_objects:
-                try:
-                    if new_failed_obj_count == old_failed_obj_count:
-                        print(f"{LOCAL_JSON_PATH}: Debugging stuck object: {failed}")
-                    batch.add_object(
-                        properties=failed.object_.properties,
-                        uuid=failed.object_.uuid
-                    )
-                except Exception as e:
-                    print(f"{LOCAL_JSON_PATH}: Exception while retrying: {e}")
-                    print(f"{LOCAL_JSON_PATH}: Failed Object: {failed}")
-                    break
-
-                counter += 1
-                if counter % interval == 0:
-                    print(f"{LOCAL_JSON_PATH}: Retried {counter} products...")
-
-            # Execute the batch to retry failed objects
-            batch.flush()
-        old_failed_object_count = current_failed_object_count
-        new_failed_object_count = len(products.batch.failed_objects)
-
-    # Check for failed objects
-    # if len(products.batch.failed_objects) > 0:
-    #     print(f"Failed to import {len(products.batch.failed_objects)} objects")
-    #     for failed in products.batch.failed_objects:
-    #         #print(f"e.g. Failed to import object with error: {failed.message}")
-    #         print("Failed to import object with error: %s", json.dumps(failed, indent=2, default=str))   
-
-except Exception as e:
-    print(f"Exception: {e}")
-finally:  # This will always be executed, even if an exception is raised
-    client.close()  # Close the connection & release resources
+            print("opening ", label)
+            with open(path, "rb") as f:
+                #print("about to call parse")
+                objects = metrics.timed_iter(import_common.iter_records(f, args.parser, start if checkpoint is None else checkpoint.offset, end), "parse")
+                #print("after calling parse")
+                for offset, obj, product_obj in import_common.normalized(objects, metrics.timed(normalize_products, "normalize"), NORMALIZE_CHUNK):
+                    #print(json.dumps(product_obj, indent=2))
+                    # Add object to batch queue
+                    uuid = generate_uuid5(obj["asin"]) if args.uuid5 else None
+                    with metrics.timer("send"):
+                        if stage is None:
+                            batch.add_object(
+                                properties=product_obj,
+                                uuid=uuid,
+                                # references=reference_obj  # You can add references here
+                            )
+                        else:
+                            stage.add(batch, product_obj, uuid)
+
+                    # Calculate and display progress
+                    counter += 1
+                    if checkpoint is not None and counter % import_common.CHECKPOINT_INTERVAL == 0:
+                        # Only record the offset once everything before it has been
+                        # acknowledged or dead-lettered: pending retries exist only in memory
+                        if stage is not None:
+                            stage.flush(batch)
+                        batch.flush()
+                        retries.settle(batch, products.batch.failed_objects)
+                        checkpoint.save(offset, acknowledged_before + counter - retries.dead)
+                    if counter % interval == 0:
+                        retries.poll(batch, products.batch.failed_objects)
+                        metrics.observe(counter, batch=batch, retries=retries, stage=stage)
+                        if progress_queue is None:
+                            print(f"{label}: Imported {counter} products ({metrics.rate():.0f}/s)...")
+                            metrics.export(args)
+                        else:
+                            progress_queue.put(("progress", worker_id, counter, 0, metrics.snapshot()))
+            if stage is not None:
+                # Embed whatever is left and wait for requests still in flight
+                stage.flush(batch)
+        print(f"{label}: Before flushing batch")
+        batch.flush()
+        print(f"{label}: After flushing batch")
+        # Objects still waiting on a retry get their remaining attempts here;
+        # anything that can't be imported ends up in the dead-letter file
+        with metrics.timer("retry"):
+            retries.drain(products)
+        metrics.observe(counter, retries=retries, stage=stage)
+        if progress_queue is not None:
+            progress_queue.put(("progress", worker_id, counter, retries.dead, metrics.snapshot()))
+        if retries.dead:
+            print(f"{label}: {retries.dead} products could not be imported, see {retries.dead_letter_path}")
+        else:
+            print(f"{label}: All products imported successfully")
+        if stage is not None:
+            print(f"{label}: Client-side vectors: {stage.summary()}")
+        if checkpoint is not None:
+            checkpoint.save(checkpoint.end, acknowledged_before + counter - retries.dead, done=True)
+        return counter, retries.dead
+    finally:  # This will always be executed, even if an exception is raised
+        retries.close()
+        if stage is not None:
+            stage.close()
+        client.close()  # Close the connection & release resources
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch import Amazon product metadata into Weaviate")
+    parser.add_argument("path", help="path to the product JSON file")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of parallel import processes; input must be newline-delimited JSON when > 1")
+    parser.add_argument("--uuid5", action="store_true",
+                        help="derive object UUIDs from the record so re-imports overwrite instead of duplicating")
+    parser.add_argument("--checkpoint", action="store_true",
+                        help="record the durable byte offset in a checkpoint file next to the input (implies --uuid5)")
+    parser.add_argument("--resume", action="store_true",
+                        help="continue from the last checkpoint instead of the start of the file (implies --checkpoint)")
+    import_common.add_parser_argument(parser)
+    import_common.add_wait_indexed_argument(parser)
+    vector_index.add_arguments(parser)
+    replication.add_arguments(parser)
+    embedding.add_arguments(parser)
+    retry_queue.add_arguments(parser)
+    ingest_metrics.add_arguments(parser)
+    args = parser.parse_args()
+    args.checkpoint = args.checkpoint or args.resume
+    args.uuid5 = args.uuid5 or args.checkpoint
+    LOCAL_JSON_PATH = args.path
+    import_common.check_json_path(LOCAL_JSON_PATH)
+    ndjson = import_common.is_ndjson(LOCAL_JSON_PATH)
+    args.parser = import_common.resolve_parser(args.parser, LOCAL_JSON_PATH, ndjson)
+    print(f"{LOCAL_JSON_PATH}: Using {import_common.describe_parser(args.parser)}")
+    if (args.workers > 1 or args.checkpoint) and not ndjson:
+        print("Error: --workers and --checkpoint need newline-delimited JSON input.")
+        sys.exit(1)
+    if args.checkpoint and args.parser == "ijson":
+        print("Error: --checkpoint needs a line-based parser (--parser orjson or json).")
+        sys.exit(1)
+    vector_index_config = vector_index.config_from_args(args)
+
+    client = None
+    try:
+        client = import_common.connect_local(replication.node_for(args))
+        metainfo = client.get_meta()
+        replication.check_cluster(client, args)
+        create_product_collection(client, vector_index_config,
+                                  sharding_config=replication.sharding_config(args),
+                                  replication_config=replication.replication_config(args))
+        client.close()
+
+        metrics = ingest_metrics.Metrics("products")
+        metrics.start(args)
+        if args.workers > 1:
+            counter, failed_count = import_common.run_sharded(LOCAL_JSON_PATH, args, import_products, "products", metrics)
+        else:
+            counter, failed_count = import_products(LOCAL_JSON_PATH, args, metrics=metrics)
+        if args.wait_indexed:
+            import_common.wait_indexed("product", metrics, timeout=args.wait_indexed_timeout)
+        metrics.finish(args)
+        print(f"{LOCAL_JSON_PATH}: Imported {counter} products, {failed_count} dead-lettered")
+        query_cache.mark_changed("product")
+    except Exception as e:
+        print(f"Exception: {e}")
+    finally:  # This will always be executed, even if an exception is raised
+        if client is not None:
+            client.close()  # Close the connection & release resources
+
+if __name__ == "__main__":
+    main()
@@ -12,47 +12,38 @@ from pathlib import Path
 import base64
 import ijson
 import sys
+import argparse
+import import_common
+import embedding
+import retry_queue
+import dates
+import vector_index
+import replication
+import ingest_metrics
+import query_cache
+import review_aggregates
+from batch_import_products import ensure_product_properties
+import tempfile
+import shutil
+import time
 
-if len(sys.argv) > 1:
-    LOCAL_JSON_PATH = sys.argv[1]
-else:
-    print("Error: No file path provided.")
-    print(f"Usage: python {sys.argv[0]} <path_to_json_file>")
-    sys.exit(1)
-if not os.path.isfile(LOCAL_JSON_PATH):
-    print(f"Error: The file '{LOCAL_JSON_PATH}' does not exist.")
-    sys.exit(1)
-if not LOCAL_JSON_PATH.endswith('.json'):
-    print(f"Error: The file '{LOCAL_JSON_PATH}' does not have a .json extension.")
-    sys.exit(1)
-
-# Don't need OPENAI_APIKEY when connecting to local LM Studio
-headers = {
-    # "X-OpenAI-Api-Key": os.getenv("OPENAI_APIKEY")
-    "X-OpenAI-Api-Key": "NO_KEY_NEEDED_FOR_LM_STUDIO"
-}  # Replace with your OpenAI API key
-
-client = None
 REVIEW_COLLECTION_NAME = "review2"
+# Properties the collection's text2vec-openai module vectorizes (no skip_vectorization)
+VECTORIZED_PROPERTIES = ["reviewText", "summary"]
+interval = 100  # print progress every this many records; should be bigger than the batch_size
+NORMALIZE_CHUNK = 2000  # records normalized together
 
-try:
-    client = weaviate.connect_to_local(
-        headers=headers,     
-        additional_config=AdditionalConfig(
-            timeout=Timeout(init=30, query=60, insert=120)  # Values in seconds
-        )
-    )
-    assert client.is_live()
-    metainfo = client.get_meta()
+def create_review_collection(client, name=REVIEW_COLLECTION_NAME, vector_index_config=None, sharding_config=None,
+                             replication_config=None):
     #print(json.dumps(metainfo, indent=2))  # Print the meta information in a readable format
-    #if client.collections.exists(REVIEW_COLLECTION_NAME):
-        #print(f"Dropping existing {REVIEW_COLLECTION_NAME} collection")
-        #client.collections.delete(REVIEW_COLLECTION_NAME)
+    #if client.collections.exists(name):
+        #print(f"Dropping existing {name} collection")
+        #client.collections.delete(name)
     
-    if not client.collections.exists(REVIEW_COLLECTION_NAME):
-        print(f"Before Create {REVIEW_COLLECTION_NAME} collection")
+    if not client.collections.exists(name):
+        print(f"Before Create {name} collection")
         client.collections.create(
-            name = REVIEW_COLLECTION_NAME,
+            name = name,
             properties = [
                 wc.Property(name="overall", data_type=wc.DataType.NUMBER),
                 wc.Property(name="verified", data_type=wc.DataType.BOOL, skip_vectorization=True),
@@ -67,6 +58,9 @@ try:
                 wc.Property(name="reviewTime", data_type=wc.DataType.TEXT, skip_vectorization=True),
                 wc.Property(name="image", data_type=wc.DataType.TEXT_ARRAY, skip_vectorization=True),
             ],
+            vector_index_config = vector_index_config,
+            sharding_config = sharding_config,
+            replication_config = replication_config,
             # references=[
             #     wc.ReferenceProperty(
             #         name="asin",
@@ -81,100 +75,244 @@ try:
             )
         )
         print("After Create review collection")
+    elif (vector_index_config, sharding_config, replication_config) != (None, None, None):
+        print(f"{name} collection already exists, keeping its vector index, sharding and replication settings")
 
-    counter = 0
-    interval = 100  # print progress every this many records; should be bigger than the batch_size
+def to_review_obj(obj):
+    #print("category: ", obj["category"])
+    review_obj = {}
+    if "overall" in obj:
+        review_obj["overall"] = float(obj["overall"])
+    if "verified" in obj:
+        review_obj["verified"] = obj["verified"]
+    if "reviewerID" in obj:
+        review_obj["reviewerID"] = obj["reviewerID"]
+    if "asin" in obj:
+        review_obj["asin"] = obj["asin"]
+    if "reviewerName" in obj:
+        review_obj["reviewerName"] = obj["reviewerName"]
+    if "reviewText" in obj:
+        review_obj["reviewText"] = obj["reviewText"]
+    if "summary" in obj:
+        review_obj["summary"] = obj["summary"]
+    if "unixReviewTime" in obj:
+        review_obj["unixReviewTime"] = obj["unixReviewTime"]
+        # unixReviewDate is filled in per chunk by normalize_reviews()
+    if "reviewTime" in obj:
+        review_obj["reviewTime"] = obj["reviewTime"]
+    if "image" in obj:
+        review_obj["image"] = obj["image"]
+    else:
+        review_obj["image"] = []
+    return review_obj
 
-    # Get the collection
-    reviews = client.collections.get(REVIEW_COLLECTION_NAME)
+def normalize_reviews(objs):
+    review_objs = [to_review_obj(obj) for obj in objs]
+    # Derive unixReviewDate for the whole chunk in one conversion
+    dated = [review_obj for review_obj in review_objs if "unixReviewTime" in review_obj]
+    iso_dates = dates.unix_to_iso([review_obj["unixReviewTime"] for review_obj in dated])
+    for review_obj, date in zip(dated, iso_dates):
+        review_obj["unixReviewDate"] = date
+    return review_objs
 
-    # Enter context manager
-    with reviews.batch.dynamic() as batch:
-        print("opening ", LOCAL_JSON_PATH)
-        with open(LOCAL_JSON_PATH, "rb") as f:
-            print("about to call parse")
-            objects = ijson.items(f, '', multiple_values=True)
-            print("after calling parse")
-            for obj in objects:
-                #print("category: ", obj["category"])
-                review_obj = {}
-                if "overall" in obj:
-                    review_obj["overall"] = float(obj["overall"])
-                if "verified" in obj:
-                    review_obj["verified"] = obj["verified"]
-                if "reviewerID" in obj:
-                    review_obj["reviewerID"] = obj["reviewerID"]
-                if "asin" in obj:
-                    review_obj["asin"] = obj["asin"]
-                if "reviewerName" in obj:
-                    review_obj["reviewerName"] = obj["reviewerName"]
-                if "reviewText" in obj:
-                    review_obj["reviewText"] = obj["reviewText"]
-                if "summary" in obj:
-                    review_obj["summary"] = obj["summary"]
-                if "unixReviewTime" in obj:
-                    review_obj["unixReviewTime"] = obj["unixReviewTime"]
-                    review_obj["unixReviewDate"] = datetime.fromtimestamp(obj["unixReviewTime"], timezone.utc).strftime("%Y-%m-%dT%H:%M:%S+00:00")
-                if "reviewTime" in obj:
-                    review_obj["reviewTime"] = obj["reviewTime"]
-                if "image" in obj:
-                    review_obj["image"] = obj["image"]
-                else:
-                    review_obj["image"] = []
-                #print(json.dumps(review_obj, indent=2, default=str))
-                # Add object to batch queue
-                batch.add_object(
-                    properties=review_obj,
-                    #uuid=generate_uuid5(obj["asin"] + obj["reviewerID"] + obj["reviewTime"])
-                )
+def review_vector_text(review_obj):
+    return embedding.vectorizer_text(REVIEW_COLLECTION_NAME, review_obj, VECTORIZED_PROPERTIES)
 
-                # Calculate and display progress
-                counter += 1
-                if counter % interval == 0:
-                    print(f"{LOCAL_JSON_PATH}: Imported {counter} reviews...")
+def review_uuid(obj):
+    return generate_uuid5(obj.get("asin", "") + obj.get("reviewerID", "") + obj.get("reviewTime", ""))
 
-    print(f"{LOCAL_JSON_PATH}: Before flushing batch")
-    batch.flush()
-    print(f"{LOCAL_JSON_PATH}After flushing batch")
-    # Check for failed objects
-    old_failed_obj_count = len(reviews.batch.failed_objects)
-    new_failed_obj_count = 0
-    while True:
-        if len(reviews.batch.failed_objects) == 0:
-            print(f"{LOCAL_JSON_PATH}:All reviews imported successfully")
-            break
-        print(f"{LOCAL_JSON_PATH}:Retrying {len(reviews.batch.failed_objects)} failed objects...")
+def import_reviews(path, args, start=0, end=None, worker_id=None, progress_queue=None, metrics=None):
+    label = import_common.shard_label(path, worker_id)
+    if metrics is None:
+        metrics = ingest_metrics.Metrics(label)
+    checkpoint = None
+    if args.checkpoint:
+        checkpoint = import_common.Checkpoint(path, start, end if end is not None else os.path.getsize(path))
+        if args.resume:
+            checkpoint.load()
+            if checkpoint.done:
+                print(f"{label}: Already imported according to {checkpoint.file}, skipping")
+                return 0, 0
+            print(f"{label}: Resuming at byte {checkpoint.offset} ({checkpoint.acknowledged} objects already acknowledged)")
+        acknowledged_before = checkpoint.acknowledged
+    retries = retry_queue.queue_from_args(args, label, path, worker_id)
+    stage = embedding.stage_from_args(args, review_vector_text, metrics=metrics, retries=retries)
+    aggregates = None
+    if args.aggregate:
+        aggregates = review_aggregates.ReviewAggregates(args.aggregate_dir, args.aggregate_run, f"w{worker_id or 0}")
+        # Reviews are counted as they are sent; the ones that end up
+        # dead-lettered are taken back out
+        retries.on_dead_letter = aggregates.remove
+    client = import_common.connect_local(replication.node_for(args, worker_id))
+    try:
         counter = 0
 
-        # save the failed_objects array because calling batch.dynamic() after will clear it out
-        current_failed_object_count = len(reviews.batch.failed_objects)
-        failed_objects = reviews.batch.failed_objects
+        # Get the collection
+        reviews = replication.with_consistency(client.collections.get(REVIEW_COLLECTION_NAME), args)
+
+        # Enter context manager
         with reviews.batch.dynamic() as batch:
-            print(f"{LOCAL_JSON_PATH}:Inside retry loop are {len(failed_objects)} failed objects...")
+            print("opening ", label)
+            with open(path, "rb") as f:
+                print("about to call parse")
+                objects = metrics.timed_iter(import_common.iter_records(f, args.parser, start if checkpoint is None else checkpoint.offset, end), "parse")
+                print("after calling parse")
+                for offset, obj, review_obj in import_common.normalized(objects, metrics.timed(normalize_reviews, "normalize"), NORMALIZE_CHUNK):
+                    #print(json.dumps(review_obj, indent=2, default=str))
+                    # Add object to batch queue
+                    uuid = review_uuid(obj) if args.uuid5 else None
+                    if aggregates is not None:
+                        aggregates.add(review_obj)
+                    with metrics.timer("send"):
+                        if stage is None:
+                            batch.add_object(
+                                properties=review_obj,
+                                uuid=uuid,
+                            )
+                        else:
+                            stage.add(batch, review_obj, uuid)
+
+                    # Calculate and display progress
+                    counter += 1
+                    if checkpoint is not None and counter % import_common.CHECKPOINT_INTERVAL == 0:
+                        # Only record the offset once everything before it has been
+                        # acknowledged or dead-lettered: pending retries exist only in memory
+                        if stage is not None:
+                            stage.flush(batch)
+                        batch.flush()
+                        retries.settle(batch, reviews.batch.failed_objects)
+                        checkpoint.save(offset, acknowledged_before + counter - retries.dead)
+                    if counter % interval == 0:
+                        retries.poll(batch, reviews.batch.failed_objects)
+                        metrics.observe(counter, batch=batch, retries=retries, stage=stage)
+                        if progress_queue is None:
+                            print(f"{label}: Imported {counter} reviews ({metrics.rate():.0f}/s)...")
+                            metrics.export(args)
+                        else:
+                            progress_queue.put(("progress", worker_id, counter, 0, metrics.snapshot()))
+            if stage is not None:
+                # Embed whatever is left and wait for requests still in flight
+                stage.flush(batch)
 
-            for failed in failed_objects:
-                try:
-                    if new_failed_obj_count == old_failed_obj_count:
-                        print(f"{LOCAL_JSON_PATH}: Debugging stuck object: {failed}")
-                    batch.add_object(
-                        properties=failed.object_.properties,
-                        uuid=failed.object_.uuid
-                    )
-                except Exception as e:
-                    print(f"{LOCAL_JSON_PATH}:Exception while retrying: {e}")
-                    print(f"{LOCAL_JSON_PATH}:Failed Object: {failed}")
-                    break
+        print(f"{label}: Before flushing batch")
+        batch.flush()
+        print(f"{label}After flushing batch")
+        # Objects still waiting on a retry get their remaining attempts here;
+        # anything that can't be imported ends up in the dead-letter file
+        with metrics.timer("retry"):
+            retries.drain(reviews)
+        metrics.observe(counter, retries=retries, stage=stage)
+        if progress_queue is not None:
+            progress_queue.put(("progress", worker_id, counter, retries.dead, metrics.snapshot()))
+        if retries.dead:
+            print(f"{label}: {retries.dead} reviews could not be imported, see {retries.dead_letter_path}")
+        else:
+            print(f"{label}: All reviews imported successfully")
+        if stage is not None:
+            print(f"{label}: Client-side vectors: {stage.summary()}")
+        if checkpoint is not None:
+            checkpoint.save(checkpoint.end, acknowledged_before + counter - retries.dead, done=True)
+        return counter, retries.dead
+    finally:  # This will always be executed, even if an exception is raised
+        retries.close()
+        if aggregates is not None:
+            aggregates.close()
+        if stage is not None:
+            stage.close()
+        client.close()  # Close the connection & release resources
 
-                counter += 1
-                if counter % interval == 0:
-                    print(f"{LOCAL_JSON_PATH}:  Retried {counter} reviews...")
+def main():
+    parser = argparse.ArgumentParser(description="Batch import Amazon reviews into Weaviate")
+    parser.add_argument("path", help="path to the review JSON file")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of parallel import processes; input must be newline-delimited JSON when > 1")
+    parser.add_argument("--uuid5", action="store_true",
+                        help="derive object UUIDs from the record so re-imports overwrite instead of duplicating")
+    parser.add_argument("--checkpoint", action="store_true",
+                        help="record the durable byte offset in a checkpoint file next to the input (implies --uuid5)")
+    parser.add_argument("--resume", action="store_true",
+                        help="continue from the last checkpoint instead of the start of the file (implies --checkpoint)")
+    import_common.add_parser_argument(parser)
+    import_common.add_wait_indexed_argument(parser)
+    vector_index.add_arguments(parser)
+    replication.add_arguments(parser)
+    embedding.add_arguments(parser)
+    retry_queue.add_arguments(parser)
+    parser.add_argument("--aggregate", action="store_true",
+                        help="collect per-ASIN review count, mean rating, verified share and latest date and write them onto "
+                             "the products; this replaces their previous values, so use it for a full reload of every review")
+    parser.add_argument("--aggregate-dir", metavar="DIR",
+                        help="where aggregate tables spill while importing, with --aggregate (default: a temporary directory)")
+    ingest_metrics.add_arguments(parser)
+    args = parser.parse_args()
+    args.checkpoint = args.checkpoint or args.resume
+    args.uuid5 = args.uuid5 or args.checkpoint
+    LOCAL_JSON_PATH = args.path
+    import_common.check_json_path(LOCAL_JSON_PATH)
+    ndjson = import_common.is_ndjson(LOCAL_JSON_PATH)
+    args.parser = import_common.resolve_parser(args.parser, LOCAL_JSON_PATH, ndjson)
+    print(f"{LOCAL_JSON_PATH}: Using {import_common.describe_parser(args.parser)}")
+    if (args.workers > 1 or args.checkpoint) and not ndjson:
+        print("Error: --workers and --checkpoint need newline-delimited JSON input.")
+        sys.exit(1)
+    if args.checkpoint and args.parser == "ijson":
+        print("Error: --checkpoint needs a line-based parser (--parser orjson or json).")
+        sys.exit(1)
+    vector_index_config = vector_index.config_from_args(args)
+    if args.aggregate_dir and not args.aggregate:
+        print("Error: --aggregate-dir only applies with --aggregate.")
+        sys.exit(1)
+    if args.aggregate and args.resume:
+        # The aggregates would only cover the part of the file read after resuming
+        print("Error: --aggregate needs a full pass over the file and can't be combined with --resume.")
+        sys.exit(1)
+    temporary_aggregate_dir = args.aggregate and not args.aggregate_dir
+    if temporary_aggregate_dir:
+        args.aggregate_dir = tempfile.mkdtemp(prefix="review-aggregates-")
+    elif args.aggregate_dir:
+        os.makedirs(args.aggregate_dir, exist_ok=True)
+    # Names this run's spill files, so a reused --aggregate-dir can't mix in old ones
+    args.aggregate_run = f"run-{int(time.time())}-{os.getpid()}"
 
-            # Execute the batch to retry failed objects
-            batch.flush() 
-        old_failed_object_count = current_failed_object_count
-        new_failed_object_count = len(reviews.batch.failed_objects)
+    client = None
+    try:
+        client = import_common.connect_local(replication.node_for(args))
+        metainfo = client.get_meta()
+        replication.check_cluster(client, args)
+        create_review_collection(client, vector_index_config=vector_index_config,
+                                 sharding_config=replication.sharding_config(args),
+                                 replication_config=replication.replication_config(args))
+        client.close()
+
+        metrics = ingest_metrics.Metrics("reviews")
+        metrics.start(args)
+        if args.workers > 1:
+            counter, failed_count = import_common.run_sharded(LOCAL_JSON_PATH, args, import_reviews, "reviews", metrics)
+        else:
+            counter, failed_count = import_reviews(LOCAL_JSON_PATH, args, metrics=metrics)
+        if args.aggregate:
+            with metrics.timer("aggregate"):
+                client = import_common.connect_local(replication.node_for(args))
+                if client.collections.exists("product"):
+                    ensure_product_properties(client)
+                    review_aggregates.apply(client, args.aggregate_dir, args.aggregate_run,
+                                            consistency_level=replication.consistency_level(args))
+                    query_cache.mark_changed("product")
+                else:
+                    print("No product collection, not writing review aggregates")
+                client.close()
+        if args.wait_indexed:
+            import_common.wait_indexed(REVIEW_COLLECTION_NAME, metrics, timeout=args.wait_indexed_timeout)
+        metrics.finish(args)
+        print(f"{LOCAL_JSON_PATH}: Imported {counter} reviews, {failed_count} dead-lettered")
+        query_cache.mark_changed(REVIEW_COLLECTION_NAME)
+    except Exception as e:
+        print(f"Exception: {e}")
+    finally:  # This will always be executed, even if an exception is raised
+        if client is not None:
+            client.close()  # Close the connection & release resources
+        if temporary_aggregate_dir:
+            shutil.rmtree(args.aggregate_dir, ignore_errors=True)
 
-except Exception as e:
-    print(f"Exception: {e}")
-finally:  # This will always be executed, even if an exception is raised
-    client.close()  # Close the connection & release resources
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+import argparse
+import itertools
+import json
+import os
+import tempfile
+import time
+import numpy as np
+import requests
+import weaviate.classes.config as wc
+from weaviate.util import generate_uuid5
+import batch_import_products
+import count
+import embedding
+import import_common
+import ingest_metrics
+import synthetic_data
+import vector_index
+from embedding_cache import EmbeddingCache
+
+# Vector index benchmark: embeds a sample of products on the client, loads
+# it into a scratch collection once per index setting (hnsw, hnsw+pq,
+# flat+bq, ...) and reports import rate, time until the index has caught up,
+# server memory, and recall@k of near_vector searches against exact
+# brute-force neighbours computed here from the uncompressed vectors.
+#
+# Memory comes from Weaviate's Prometheus endpoint, which docker-compose.yml
+# enables on port 2112: the growth of the Go heap while a setting is loaded
+# and the process RSS afterwards. The Go runtime returns freed memory lazily,
+# so compare heap growth between settings rather than RSS.
+
+DEFAULT_SETTINGS = "hnsw,hnsw+pq,hnsw+bq,hnsw+sq,flat,flat+bq"
+DEFAULT_METRICS_URL = "http://localhost:2112/metrics"
+HEAP_METRIC = "go_memstats_heap_inuse_bytes"
+RSS_METRIC = "process_resident_memory_bytes"
+COLLECTION_PREFIX = "IndexBench"
+MAX_TRAINING_LIMIT = 100000  # Weaviate's PQ/SQ default
+
+def load_sample(path, count_needed):
+    # The first count_needed products with the text the importer would embed
+    parser = import_common.resolve_parser("auto", path)
+    with open(path, "rb") as f:
+        objs = [obj for _, obj in itertools.islice(import_common.iter_records(f, parser), count_needed)]
+    products = batch_import_products.normalize_products(objs)
+    return [p["asin"] for p in products], [batch_import_products.product_vector_text(p) for p in products]
+
+def embed_texts(texts, args):
+    if args.embed_url == embedding.STUB_EMBED_URL:
+        import fake_weaviate
+        embedder = fake_weaviate.StubEmbedder(args.embed_model)
+    else:
+        embedder = embedding.Embedder(args.embed_url, args.embed_model)
+    cache = EmbeddingCache(args.embed_cache, args.embed_model) if args.embed_cache else None
+    vectors = [cache.get(t) if cache is not None else None for t in texts]
+    missing = [i for i, v in enumerate(vectors) if v is None]
+    for start in range(0, len(missing), args.embed_batch):
+        chunk = missing[start:start + args.embed_batch]
+        new_vectors = embedder.embed([texts[i] for i in chunk])
+        if cache is not None:
+            cache.put_many([texts[i] for i in chunk], new_vectors)
+        for i, vector in zip(chunk, new_vectors):
+            vectors[i] = vector
+        print(f"Embedded {start + len(chunk)}/{len(missing)} texts", end="\r")
+    if missing:
+        print()
+    return np.asarray(vectors, dtype=np.float32)
+
+def exact_neighbours(vectors, queries, k):
+    # Cosine ground truth, the collection's default distance
+    data = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    q = queries / np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+    scores = q @ data.T
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    return [set(row) for row in top]
+
+def server_memory(url):
+    # {metric: bytes} from the Prometheus text format, or None if unreachable
+    try:
+        response = requests.get(url, timeout=5)
+        response.raise_for_status()
+    except requests.RequestException:
+        return None
+    values = {}
+    for line in response.text.splitlines():
+        if line.startswith("#"):
+            continue
+        name, _, value = line.rpartition(" ")
+        name = name.split("{", 1)[0]
+        if name in (HEAP_METRIC, RSS_METRIC):
+            values[name] = values.get(name, 0.0) + float(value)
+    return values
+
+def setting_config(setting, args, sample_size):
+    # The shared tuning flags, applied where they fit the setting
+    index_type, quantizer = vector_index.parse_setting(setting)
+    tuning = vector_index.tuning_from_args(args)
+    if index_type == "flat":
+        tuning.update(ef=None, ef_construction=None, max_connections=None)
+    if index_type != "dynamic":
+        tuning["dynamic_threshold"] = None
+    if quantizer in ("pq", "sq") and tuning["training_limit"] is None:
+        # Otherwise a sample smaller than the default limit is never compressed
+        tuning["training_limit"] = min(sample_size, MAX_TRAINING_LIMIT)
+    return index_type, quantizer, vector_index.index_config(index_type, quantizer, **tuning)
+
+def run_setting(setting, vectors, asins, queries, truth, args):
+    index_type, quantizer, config = setting_config(setting, args, len(vectors))
+    name = f"{COLLECTION_PREFIX}_{index_type}_{quantizer}"
+
+    client = import_common.connect_local()
+    try:
+        if client.collections.exists(name):
+            client.collections.delete(name)
+        memory_before = server_memory(args.metrics_url)
+        client.collections.create(
+            name=name,
+            properties=[wc.Property(name="asin", data_type=wc.DataType.TEXT, skip_vectorization=True)],
+            vectorizer_config=wc.Configure.Vectorizer.none(),
+            vector_index_config=config,
+        )
+        collection = client.collections.get(name)
+        metrics = ingest_metrics.Metrics(name)
+        started = time.perf_counter()
+        with collection.batch.dynamic() as batch:
+            for i, (asin, vector) in enumerate(zip(asins, vectors)):
+                batch.add_object(properties={"asin": asin}, uuid=generate_uuid5(i), vector=vector.tolist())
+        import_seconds = time.perf_counter() - started
+        failed = len(collection.batch.failed_objects)
+        queryable_seconds = import_common.wait_indexed(name, metrics)
+        memory_after = server_memory(args.metrics_url)
+        shards = count.shards_for(count.shard_stats(client), name)
+
+        ids = {generate_uuid5(i): i for i in range(len(vectors))}
+        hits = 0
+        latencies = []
+        for q, expected in zip(queries, truth):
+            started = time.perf_counter()
+            response = collection.query.near_vector(near_vector=q.tolist(), limit=args.k, return_properties=[])
+            latencies.append(time.perf_counter() - started)
+            hits += len({ids.get(str(o.uuid)) for o in response.objects} & expected)
+
+        vector_bytes = vector_index.compressed_vector_bytes(vectors.shape[1], quantizer, args.pq_segments)
+        result = {
+            "setting": setting,
+            "objects": len(vectors) - failed,
+            "failed": failed,
+            "import_seconds": import_seconds,
+            "import_objects_per_second": len(vectors) / import_seconds if import_seconds else 0.0,
+            "queryable_seconds": queryable_seconds,
+            "compressed": any(s["compressed"] for s in shards),
+            "vector_bytes_estimate": vector_bytes * len(vectors) if vector_bytes else None,
+            "heap_growth_bytes": None,
+            "rss_bytes": None,
+            f"recall_at_{args.k}": hits / (len(queries) * args.k),
+            "query_p50_ms": float(np.percentile(latencies, 50)) * 1000,
+            "query_p95_ms": float(np.percentile(latencies, 95)) * 1000,
+        }
+        if memory_before and memory_after:
+            result["heap_growth_bytes"] = memory_after.get(HEAP_METRIC, 0) - memory_before.get(HEAP_METRIC, 0)
+            result["rss_bytes"] = memory_after.get(RSS_METRIC)
+        if not args.keep:
+            client.collections.delete(name)
+        return result
+    finally:
+        client.close()
+
+def _mib(value):
+    return "n/a" if value is None else f"{value / (1 << 20):.1f}"
+
+def print_results(results, k):
+    print(f"{'setting':<12}{'objects':>9}{'obj/s':>9}{'ready s':>9}{'heap MiB':>10}{'RSS MiB':>9}"
+          f"{'vec MiB':>9}{'compr':>7}{f'recall@{k}':>11}{'p50 ms':>8}{'p95 ms':>8}")
+    for r in results:
+        ready = "n/a" if r["queryable_seconds"] is None else f"{r['queryable_seconds']:.1f}"
+        print(f"{r['setting']:<12}{r['objects']:>9}{r['import_objects_per_second']:>9.0f}{ready:>9}"
+              f"{_mib(r['heap_growth_bytes']):>10}{_mib(r['rss_bytes']):>9}{_mib(r['vector_bytes_estimate']):>9}"
+              f"{'yes' if r['compressed'] else 'no':>7}{r[f'recall_at_{k}']:>11.3f}"
+              f"{r['query_p50_ms']:>8.1f}{r['query_p95_ms']:>8.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare vector index settings by memory, import rate and recall")
+    parser.add_argument("path", nargs="?",
+                        help="product JSON file to sample (default: synthetic products, see --data-dir)")
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "weaviate-index-bench"))
+    parser.add_argument("--sample", type=int, default=20000, help="products loaded per setting")
+    parser.add_argument("--queries", type=int, default=200, help="held-out products used as queries")
+    parser.add_argument("-k", type=int, default=10, help="neighbours per query for recall@k")
+    parser.add_argument("--settings", default=DEFAULT_SETTINGS,
+                        help="comma-separated index[+quantizer] settings, e.g. hnsw,hnsw+pq,flat+bq,dynamic")
+    vector_index.add_tuning_arguments(parser)
+    parser.add_argument("--embed-url", default=embedding.DEFAULT_EMBED_URL,
+                        help="OpenAI-compatible embedding server, or 'stub' for in-process fake embeddings")
+    parser.add_argument("--embed-model", default=embedding.DEFAULT_EMBED_MODEL)
+    parser.add_argument("--embed-batch", type=int, default=embedding.DEFAULT_EMBED_BATCH)
+    parser.add_argument("--embed-cache", metavar="DIR", help="reuse embeddings between runs from this cache directory")
+    parser.add_argument("--metrics-url", default=DEFAULT_METRICS_URL, help="Weaviate's Prometheus metrics endpoint")
+    parser.add_argument("--keep", action="store_true", help="leave the benchmark collections in place")
+    parser.add_argument("--json", metavar="PATH", help="also write the results here")
+    args = parser.parse_args()
+    settings = args.settings.split(",")
+    try:
+        for setting in settings:
+            # Fail on a bad combination before embedding anything
+            setting_config(setting, args, args.sample)
+    except ValueError as e:
+        parser.error(str(e))
+
+    path = args.path
+    if path is None:
+        path = os.path.join(args.data_dir, f"products_{args.sample + args.queries}_0.json")
+        if not os.path.isfile(path):
+            print(f"Generating {args.sample + args.queries} synthetic products in {args.data_dir}")
+            synthetic_data.generate(args.data_dir, args.sample + args.queries, reviews_per_product=0)
+    asins, texts = load_sample(path, args.sample + args.queries)
+    if len(texts) <= args.queries:
+        parser.error(f"{path} has only {len(texts)} products, need more than --queries {args.queries}")
+    vectors = embed_texts(texts, args)
+    data, queries = vectors[:-args.queries], vectors[-args.queries:]
+    truth = exact_neighbours(data, queries, args.k)
+    print(f"{len(data)} products, {len(queries)} queries, {vectors.shape[1]} dimensions")
+    if server_memory(args.metrics_url) is None:
+        print(f"No metrics at {args.metrics_url} (PROMETHEUS_MONITORING_ENABLED?), memory won't be reported")
+
+    results = []
+    for setting in settings:
+        result = run_setting(setting, data, asins[:len(data)], queries, truth, args)
+        print(f"{setting}: {result['import_objects_per_second']:.0f} objects/s, "
+              f"recall@{args.k} {result[f'recall_at_{args.k}']:.3f}, heap +{_mib(result['heap_growth_bytes'])} MiB")
+        results.append(result)
+    print_results(results, args.k)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"path": path, "sample": len(data), "queries": len(queries), "k": args.k,
+                       "dimensions": int(vectors.shape[1]), "embed_model": args.embed_model,
+                       "results": results}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
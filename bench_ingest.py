@@ -0,0 +1,112 @@
+import argparse
+import itertools
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import synthetic_data
+
+# Ingest throughput benchmark: generates (or reuses) synthetic product and
+# review files, runs the real importers over them for every combination of
+# --workers and --parser, and reports objects/s plus the per-stage times
+# from each run's --metrics-json. Vectorization is stubbed out: by default
+# nothing is embedded, --vectors stub sends fake_weaviate's in-process
+# embeddings with each object. --target fake (the default) imports into
+# fake_weaviate.FakeClient, so only our side of the pipeline is measured;
+# --target weaviate writes into the docker-compose instance's collections.
+
+IMPORTERS = {
+    "products": "batch_import_products.py",
+    "reviews": "batch_import_reviews.py",
+}
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+def data_files(args):
+    products_path = os.path.join(args.data_dir, f"products_{args.products}_{args.seed}.json")
+    reviews_path = os.path.join(args.data_dir, f"reviews_{args.products}x{args.reviews_per_product}_{args.seed}.json")
+    if not (os.path.isfile(products_path) and os.path.isfile(reviews_path)):
+        print(f"Generating {args.products} synthetic products in {args.data_dir}")
+        synthetic_data.generate(args.data_dir, args.products, args.reviews_per_product, args.seed)
+    return {"products": products_path, "reviews": reviews_path}
+
+def run_import(kind, path, workers, parser, args, scratch):
+    metrics_path = os.path.join(scratch, f"{kind}-{workers}-{parser}.json")
+    command = [sys.executable, os.path.join(HERE, IMPORTERS[kind]), path,
+               "--workers", str(workers), "--parser", parser,
+               "--metrics-json", metrics_path,
+               "--dead-letter", os.path.join(scratch, f"{kind}.deadletter.ndjson")]
+    if args.vectors == "stub":
+        command += ["--client-vectors", "--embed-url", "stub"]
+    command += args.importer_args
+    env = dict(os.environ, WEAVIATE_TARGET="fake" if args.target == "fake" else "local")
+    started = time.perf_counter()
+    result = subprocess.run(command, env=env, capture_output=True, text=True)
+    wall = time.perf_counter() - started
+    if result.returncode != 0 or not os.path.isfile(metrics_path):
+        print(result.stdout[-2000:], result.stderr[-2000:], sep="\n")
+        raise RuntimeError(f"{IMPORTERS[kind]} --workers {workers} --parser {parser} failed")
+    with open(metrics_path) as f:
+        metrics = json.load(f)
+    os.unlink(metrics_path)
+    objects = metrics["counters"].get("objects", 0)
+    return {
+        "kind": kind,
+        "workers": workers,
+        "parser": parser,
+        "objects": objects,
+        "wall_seconds": wall,
+        "objects_per_second": objects / wall if wall else 0.0,
+        "import_objects_per_second": metrics["objects_per_second"],
+        "stage_seconds": metrics["stage_seconds"],
+    }
+
+def print_results(results):
+    print(f"{'kind':<10}{'workers':>8}{'parser':>8}{'objects':>10}{'wall s':>9}{'obj/s':>10}  stages")
+    for r in results:
+        stages = ", ".join(f"{k} {v:.1f}s" for k, v in sorted(r["stage_seconds"].items()))
+        print(f"{r['kind']:<10}{r['workers']:>8}{r['parser']:>8}{r['objects']:>10}{r['wall_seconds']:>9.2f}"
+              f"{r['objects_per_second']:>10.0f}  {stages}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark import throughput on synthetic data",
+                                     epilog="Arguments after -- are passed to every importer run.")
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "weaviate-ingest-bench"))
+    parser.add_argument("--products", type=int, default=100000)
+    parser.add_argument("--reviews-per-product", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--kinds", default="products,reviews", help="comma-separated: products, reviews")
+    parser.add_argument("--workers", default="1,2,4", help="comma-separated worker counts to try")
+    parser.add_argument("--parsers", default="auto", help="comma-separated parsers to try (orjson, json, ijson, auto)")
+    parser.add_argument("--rounds", type=int, default=1, help="runs per combination; the fastest is reported")
+    parser.add_argument("--target", choices=("fake", "weaviate"), default="fake")
+    parser.add_argument("--vectors", choices=("none", "stub"), default="none",
+                        help="none: send no vectors; stub: attach stub embeddings computed in the importer")
+    parser.add_argument("--json", metavar="PATH", help="also write the results here, e.g. to compare commits")
+    argv = sys.argv[1:]
+    importer_args = []
+    if "--" in argv:
+        importer_args = argv[argv.index("--") + 1:]
+        argv = argv[:argv.index("--")]
+    args = parser.parse_args(argv)
+    args.importer_args = importer_args
+
+    files = data_files(args)
+    results = []
+    with tempfile.TemporaryDirectory() as scratch:
+        combinations = itertools.product(args.kinds.split(","), [int(w) for w in args.workers.split(",")],
+                                         args.parsers.split(","))
+        for kind, workers, parser_name in combinations:
+            runs = [run_import(kind, files[kind], workers, parser_name, args, scratch) for _ in range(args.rounds)]
+            best = max(runs, key=lambda r: r["objects_per_second"])
+            print(f"{kind} --workers {workers} --parser {parser_name}: {best['objects_per_second']:.0f} objects/s")
+            results.append(best)
+    print_results(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"target": args.target, "vectors": args.vectors, "products": args.products,
+                       "reviews_per_product": args.reviews_per_product, "results": results}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+import argparse
+import asyncio
+import json
+import time
+import numpy as np
+import weaviate.classes.query as wq
+import embedding
+import query
+import query_async
+import fake_weaviate
+import replication
+
+# Query latency benchmark: replays a workload of searches through
+# query_async at a fixed concurrency and reports p50/p95/p99 latency and QPS
+# per query type. --target fake swaps in fake_weaviate's in-process
+# collections and stub embeddings, so it runs without docker or a network.
+#
+# Workload files are newline-delimited JSON, one query per line:
+#   {"type": "bm25", "text": "charlie parker"}
+#   {"type": "near_text", "text": "background music for dinner parties", "limit": 5}
+#   {"type": "hybrid", "text": "bebop"}
+#   {"type": "filtered", "text": "jazz", "filter": {"property": "main_cat", "op": "equal", "value": "Digital Music"}}
+#   {"type": "with_reviews", "text": "dire straits live"}
+
+DEFAULT_WORKLOAD = [
+    {"type": "bm25", "text": "charlie parker"},
+    {"type": "bm25", "text": "Trans-Siberian Orchestra"},
+    {"type": "near_text", "text": "background music for dinner parties"},
+    {"type": "near_text", "text": "ethereal and eerie music"},
+    {"type": "hybrid", "text": "classical trumpet players"},
+    {"type": "hybrid", "text": "bebop"},
+    {"type": "filtered", "text": "live jazz", "filter": {"property": "main_cat", "op": "equal", "value": "Digital Music"}},
+    {"type": "filtered", "text": "bebop", "filter": {"property": "price_value", "op": "less_than", "value": 20}},
+    {"type": "with_reviews", "text": "dire straits live"},
+]
+
+def build_filter(spec):
+    # {"property": p, "op": "greater_than", "value": v}, or {"and"/"or": [specs]}
+    for combinator in ("and", "or"):
+        if combinator in spec:
+            parts = [build_filter(s) for s in spec[combinator]]
+            return wq.Filter.all_of(parts) if combinator == "and" else wq.Filter.any_of(parts)
+    return getattr(wq.Filter.by_property(spec["property"]), spec["op"])(spec["value"])
+
+def to_call(entry):
+    # Returns (coroutine_function, args...) for one workload entry
+    kind = entry["type"]
+    text = entry["text"]
+    limit = entry.get("limit", 5)
+    if kind == "bm25":
+        return (query_async.keyword_query, text, limit)
+    if kind == "near_text":
+        return (query_async.text_query, text, limit)
+    if kind == "hybrid":
+        return (query_async.hybrid_query, text, limit)
+    if kind == "filtered":
+        return (query_async.text_query_with_filter, text, build_filter(entry["filter"]), limit)
+    if kind == "with_reviews":
+        return (query_async.text_query_with_reviews, text, limit)
+    raise ValueError(f"Unknown query type {kind!r}")
+
+def load_workload(path):
+    if path is None:
+        return DEFAULT_WORKLOAD
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+async def run_workload(workload, concurrency, rounds):
+    latencies = {}
+    errors = {}
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(entry):
+        call = to_call(entry)
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await call[0](*call[1:])
+            except Exception as e:
+                errors[entry["type"]] = errors.get(entry["type"], 0) + 1
+                if errors[entry["type"]] == 1:
+                    print(f"{entry['type']}: {e}")
+                return
+            latencies.setdefault(entry["type"], []).append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*[run(entry) for _ in range(rounds) for entry in workload])
+    return latencies, errors, time.perf_counter() - started
+
+def summarize(latencies, errors, elapsed):
+    report = {"elapsed_seconds": elapsed, "types": {}}
+    total = 0
+    for kind in sorted(set(latencies) | set(errors)):
+        samples = np.array(latencies.get(kind, []))
+        total += len(samples)
+        stats = {"count": len(samples), "errors": errors.get(kind, 0), "qps": len(samples) / elapsed if elapsed else 0.0}
+        if len(samples):
+            p50, p95, p99 = np.percentile(samples, [50, 95, 99]) * 1000
+            stats.update({"p50_ms": p50, "p95_ms": p95, "p99_ms": p99, "mean_ms": samples.mean() * 1000})
+        report["types"][kind] = stats
+    report["count"] = total
+    report["qps"] = total / elapsed if elapsed else 0.0
+    return report
+
+def print_report(report):
+    print(f"{'type':<14}{'count':>8}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'qps':>10}")
+    for kind, s in report["types"].items():
+        print(f"{kind:<14}{s['count']:>8}{s['errors']:>8}{s.get('p50_ms', 0):>10.2f}{s.get('p95_ms', 0):>10.2f}"
+              f"{s.get('p99_ms', 0):>10.2f}{s['qps']:>10.1f}")
+    print(f"Total: {report['count']} queries in {report['elapsed_seconds']:.2f}s ({report['qps']:.1f} qps)")
+
+async def main(args):
+    if args.target == "fake":
+        query_async._clients = [fake_weaviate.FakeAsyncClient(products=args.fake_products, seed=args.seed,
+                                                              latency=args.fake_latency / 1000)]
+        if args.client_vectors:
+            query.query_embedder = embedding.QueryEmbedder(fake_weaviate.StubEmbedder())
+    else:
+        query_async.use_nodes(replication.parse_nodes(args.nodes), replication.consistency_level(args))
+        if args.client_vectors:
+            query.use_client_vectors(args.embed_url, args.embed_model)
+    if not args.cache:
+        query.cache.max_entries = 0  # measure the searches, not the result cache
+    workload = load_workload(args.workload)
+    try:
+        if args.warmup:
+            await run_workload(workload, args.concurrency, args.warmup)
+        latencies, errors, elapsed = await run_workload(workload, args.concurrency, args.rounds)
+    finally:
+        await query_async.close_client()
+    report = summarize(latencies, errors, elapsed)
+    report.update({"target": args.target, "concurrency": args.concurrency, "rounds": args.rounds,
+                   "cache": args.cache, "client_vectors": args.client_vectors,
+                   "nodes": len(query_async.NODES) if args.target == "weaviate" else 1, "consistency": args.consistency})
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark query latency and throughput")
+    parser.add_argument("--target", choices=("weaviate", "fake"), default="weaviate",
+                        help="the docker-compose Weaviate, or a deterministic in-process fake")
+    parser.add_argument("--workload", metavar="PATH", help="newline-delimited JSON queries (default: a built-in mix)")
+    parser.add_argument("--concurrency", type=int, default=8, help="queries in flight")
+    parser.add_argument("--rounds", type=int, default=20, help="times the workload is replayed")
+    parser.add_argument("--warmup", type=int, default=1, help="rounds run before measuring")
+    parser.add_argument("--cache", action="store_true", help="leave the query result cache on")
+    parser.add_argument("--client-vectors", action="store_true", help="embed queries on the client (see query.py)")
+    parser.add_argument("--embed-url", default=embedding.DEFAULT_EMBED_URL)
+    parser.add_argument("--embed-model", default=embedding.DEFAULT_EMBED_MODEL)
+    parser.add_argument("--fake-products", type=int, default=5000, help="products in the fake collection")
+    parser.add_argument("--fake-latency", type=float, default=0.0, help="simulated round trip per fake request, ms")
+    replication.add_nodes_argument(parser)
+    parser.add_argument("--consistency", choices=replication.CONSISTENCY_LEVELS, type=str.upper,
+                        help="replicas that must answer each read (default: the server's, QUORUM)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", metavar="PATH", help="also write the report here")
+    args = parser.parse_args()
+    asyncio.run(main(args))
@@ -0,0 +1,339 @@
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+import uuid as uuidlib
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+from weaviate.classes.tenants import Tenant
+import import_common
+import ingest_metrics
+import query_cache
+import replication
+
+# Export a collection to Parquet and restore it with the same UUIDs and
+# vectors, so reloading product or review (or cloning them into a test
+# instance) costs file I/O and batch inserts instead of another embedding
+# pass.
+#
+#   python collection_export.py export product backups/product --workers 8
+#   python collection_export.py restore backups/product --into product_test
+#
+# An export directory holds manifest.json (the collection config, property
+# types, vector names and parts) and one Parquet file per part: a uuid
+# column, one column per property and a list<float32> column per vector
+# ("vector" for the default one, "vector:<name>" for named vectors). The
+# client can't address shards directly, so parts split the UUID space into
+# --workers ranges, each walked with the cursor iterator in its own process;
+# multi-tenant collections get one part per tenant. Cross-references are not
+# exported.
+
+DEFAULT_WORKERS = 4
+ITERATOR_PAGE_SIZE = 1000  # objects per cursor request
+ROW_GROUP_SIZE = 10000  # rows per Parquet row group, and per batch read on restore
+MANIFEST = "manifest.json"
+
+ARROW_TYPES = {
+    "text": pa.string(),
+    "text[]": pa.list_(pa.string()),
+    "uuid": pa.string(),
+    "uuid[]": pa.list_(pa.string()),
+    "blob": pa.string(),
+    "number": pa.float64(),
+    "number[]": pa.list_(pa.float64()),
+    "int": pa.int64(),
+    "int[]": pa.list_(pa.int64()),
+    "boolean": pa.bool_(),
+    "boolean[]": pa.list_(pa.bool_()),
+    "date": pa.timestamp("us", tz="UTC"),
+    "date[]": pa.list_(pa.timestamp("us", tz="UTC")),
+}
+JSON_TYPES = ("object", "object[]")  # stored as JSON text
+VECTOR_TYPE = pa.list_(pa.float32())
+
+def vector_column(name):
+    return "vector" if name == "default" else f"vector:{name}"
+
+def exported_properties(config):
+    # [(name, data type)] for the properties that can go into Parquet
+    properties = []
+    for prop in config.get("properties", []):
+        kind = prop["dataType"][0]
+        if kind in ARROW_TYPES or kind in JSON_TYPES:
+            properties.append((prop["name"], kind))
+        else:
+            print(f"{config['class']}: Not exporting {prop['name']} ({kind})")
+    return properties
+
+def arrow_schema(properties, vector_names):
+    fields = [pa.field("uuid", pa.string(), nullable=False)]
+    for name, kind in properties:
+        fields.append(pa.field(name, ARROW_TYPES.get(kind, pa.string())))
+    for name in vector_names:
+        fields.append(pa.field(vector_column(name), VECTOR_TYPE))
+    return pa.schema(fields)
+
+def _property_array(values, kind, arrow_type):
+    if kind in JSON_TYPES:
+        values = [None if v is None else json.dumps(v, default=str) for v in values]
+    elif kind == "uuid":
+        values = [None if v is None else str(v) for v in values]
+    elif kind == "uuid[]":
+        values = [None if v is None else [str(u) for u in v] for v in values]
+    return pa.array(values, type=arrow_type)
+
+def _vector_array(vectors):
+    # One flat float32 buffer plus offsets instead of a Python list per value
+    lengths = np.fromiter((0 if v is None else len(v) for v in vectors), dtype=np.int32, count=len(vectors))
+    offsets = np.zeros(len(vectors) + 1, dtype=np.int32)
+    np.cumsum(lengths, out=offsets[1:])
+    present = [v for v in vectors if v is not None]
+    values = np.concatenate([np.asarray(v, dtype=np.float32) for v in present]) if present else np.zeros(0, np.float32)
+    mask = pa.array([v is None for v in vectors]) if len(present) < len(vectors) else None
+    return pa.ListArray.from_arrays(pa.array(offsets), pa.array(values), type=VECTOR_TYPE, mask=mask)
+
+def _table(objects, schema, properties, vector_names):
+    arrays = [pa.array([str(o.uuid) for o in objects], type=pa.string())]
+    for name, kind in properties:
+        arrays.append(_property_array([o.properties.get(name) for o in objects], kind, schema.field(name).type))
+    for name in vector_names:
+        arrays.append(_vector_array([(o.vector or {}).get(name) for o in objects]))
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+def key_ranges(n):
+    # n contiguous [low, high) slices of the 128-bit UUID space
+    bounds = [i * (1 << 128) // n for i in range(n)] + [1 << 128]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+def export_part(task):
+    # Runs in a worker process; returns (file name, objects written)
+    name, tenant, low, high, path, properties, vector_names, node = task
+    schema = arrow_schema(properties, vector_names)
+    client = import_common.connect_local(node)
+    try:
+        collection = client.collections.get(name)
+        if tenant is not None:
+            collection = collection.with_tenant(tenant)
+        # The cursor walks objects in UUID order and `after` is exclusive
+        after = uuidlib.UUID(int=low - 1) if low > 0 else None
+        objects = []
+        written = 0
+        with pq.ParquetWriter(path, schema, compression="zstd") as writer:
+            for o in collection.iterator(include_vector=bool(vector_names), after=after, cache_size=ITERATOR_PAGE_SIZE,
+                                         return_properties=[p for p, _ in properties]):
+                if o.uuid.int >= high:
+                    break
+                objects.append(o)
+                if len(objects) >= ROW_GROUP_SIZE:
+                    writer.write_table(_table(objects, schema, properties, vector_names))
+                    written += len(objects)
+                    objects = []
+            if objects:
+                writer.write_table(_table(objects, schema, properties, vector_names))
+                written += len(objects)
+        return os.path.basename(path), written
+    finally:
+        client.close()
+
+def _vector_names(collection):
+    response = collection.query.fetch_objects(limit=1, include_vector=True)
+    if not response.objects or not response.objects[0].vector:
+        return []
+    return sorted(response.objects[0].vector)
+
+def _pool(workers):
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+def export_collection(args):
+    os.makedirs(args.out_dir, exist_ok=True)
+    client = import_common.connect_local(replication.node_for(args))
+    try:
+        collection = client.collections.get(args.collection)
+        config = collection.config.get().to_dict()
+        name = config["class"]
+        properties = exported_properties(config)
+        multi_tenant = config.get("multiTenancyConfig", {}).get("enabled", False)
+        tenants = sorted(collection.tenants.get()) if multi_tenant else [None]
+        vector_names = []
+        for tenant in tenants:
+            vector_names = _vector_names(collection if tenant is None else collection.with_tenant(tenant))
+            if vector_names:
+                break
+    finally:
+        client.close()
+
+    tasks = []
+    parts = []
+    if multi_tenant:
+        for i, tenant in enumerate(tenants):
+            parts.append({"file": f"tenant-{i:05d}.parquet", "tenant": tenant})
+            tasks.append((name, tenant, 0, 1 << 128))
+    else:
+        for i, (low, high) in enumerate(key_ranges(args.workers)):
+            parts.append({"file": f"part-{i:05d}.parquet", "tenant": None})
+            tasks.append((name, None, low, high))
+    started = time.monotonic()
+    with _pool(args.workers) as pool:
+        results = pool.map(export_part, [
+            task + (os.path.join(args.out_dir, part["file"]), properties, vector_names, replication.node_for(args, i))
+            for i, (task, part) in enumerate(zip(tasks, parts))
+        ])
+        for part, (_, written) in zip(parts, results):
+            part["objects"] = written
+    elapsed = time.monotonic() - started
+    total = sum(part["objects"] for part in parts)
+    manifest = {
+        "collection": name,
+        "exported_at": datetime.now(timezone.utc).isoformat(),
+        "objects": total,
+        "properties": properties,
+        "vector_names": vector_names,
+        "multi_tenancy": multi_tenant,
+        "parts": parts,
+        "config": config,
+    }
+    with open(os.path.join(args.out_dir, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=2, default=str)
+    print(f"{name}: Exported {total} objects with {len(vector_names)} vector(s) in {elapsed:.1f}s "
+          f"({total / elapsed if elapsed else 0:.0f}/s) to {args.out_dir}")
+
+def _restore_rows(batch, properties, vector_names):
+    # (properties, uuid, vector) per row of a Parquet record batch
+    uuids = batch.column("uuid").to_pylist()
+    json_columns = [name for name, kind in properties if kind in JSON_TYPES]
+    rows = batch.select([name for name, _ in properties]).to_pylist()
+    vectors = []
+    for name in vector_names:
+        column = batch.column(vector_column(name))
+        values = column.values.to_numpy(zero_copy_only=False)
+        offsets = column.offsets.to_numpy()
+        valid = column.is_valid().to_numpy(zero_copy_only=False)
+        vectors.append([values[offsets[i]:offsets[i + 1]].tolist() if valid[i] else None for i in range(len(column))])
+    for i, row in enumerate(rows):
+        props = {k: v for k, v in row.items() if v is not None}
+        for name in json_columns:
+            if name in props:
+                props[name] = json.loads(props[name])
+        if not vector_names:
+            vector = None
+        elif vector_names == ["default"]:
+            vector = vectors[0][i]
+        else:
+            vector = {name: v[i] for name, v in zip(vector_names, vectors) if v[i] is not None}
+        yield props, uuids[i], vector
+
+def restore_part(task):
+    # Runs in a worker process; returns (objects sent, objects failed)
+    path, name, tenant, properties, vector_names, node, consistency = task
+    client = import_common.connect_local(node)
+    try:
+        collection = client.collections.get(name)
+        if tenant is not None:
+            collection = collection.with_tenant(tenant)
+        if consistency is not None:
+            collection = collection.with_consistency_level(consistency)
+        sent = 0
+        with collection.batch.dynamic() as batch:
+            for record_batch in pq.ParquetFile(path).iter_batches(batch_size=ROW_GROUP_SIZE):
+                for props, uuid, vector in _restore_rows(record_batch, properties, vector_names):
+                    batch.add_object(properties=props, uuid=uuid, vector=vector)
+                    sent += 1
+        failed = collection.batch.failed_objects
+        for o in failed[:5]:
+            print(f"{path}: Failed to restore {o.object_.uuid}: {o.message}")
+        return sent, len(failed)
+    finally:
+        client.close()
+
+def restore_config(manifest, args):
+    # The exported collection config, renamed and with cluster-specific
+    # settings adjusted for the target
+    config = json.loads(json.dumps(manifest["config"]))
+    config["class"] = args.into
+    sharding = config.get("shardingConfig", {})
+    for key in ("actualCount", "actualVirtualCount"):
+        sharding.pop(key, None)
+    if args.shards is not None:
+        sharding["desiredCount"] = args.shards
+    if args.replication_factor is not None:
+        config.setdefault("replicationConfig", {})["factor"] = args.replication_factor
+    if args.async_replication:
+        config.setdefault("replicationConfig", {})["asyncEnabled"] = True
+    return config
+
+def restore_collection(args):
+    with open(os.path.join(args.in_dir, MANIFEST)) as f:
+        manifest = json.load(f)
+    args.into = args.into or manifest["collection"]
+    consistency = replication.consistency_level(args)
+    client = import_common.connect_local(replication.node_for(args))
+    try:
+        replication.check_cluster(client, args)
+        if client.collections.exists(args.into):
+            print(f"{args.into}: Collection exists, restoring into it (objects with the same UUID are replaced)")
+        else:
+            client.collections.create_from_dict(restore_config(manifest, args))
+            print(f"{args.into}: Created from {os.path.join(args.in_dir, MANIFEST)}")
+        tenants = [part["tenant"] for part in manifest["parts"] if part["tenant"] is not None]
+        if tenants:
+            collection = client.collections.get(args.into)
+            existing = set(collection.tenants.get())
+            missing = [Tenant(name=t) for t in tenants if t not in existing]
+            if missing:
+                collection.tenants.create(missing)
+    finally:
+        client.close()
+
+    metrics = ingest_metrics.Metrics(args.into)
+    metrics.start(args)
+    tasks = [(os.path.join(args.in_dir, part["file"]), args.into, part["tenant"], manifest["properties"],
+              manifest["vector_names"], replication.node_for(args, i), consistency)
+             for i, part in enumerate(manifest["parts"])]
+    with _pool(args.workers) as pool:
+        results = list(pool.map(restore_part, tasks))
+    sent = sum(r[0] for r in results)
+    failed = sum(r[1] for r in results)
+    metrics.set_counter("objects", sent)
+    metrics.set_counter("failed", failed)
+    if args.wait_indexed:
+        import_common.wait_indexed(args.into, metrics, timeout=args.wait_indexed_timeout)
+    metrics.finish(args)
+    print(f"{args.into}: Restored {sent - failed} of {manifest['objects']} exported objects, {failed} failed")
+    query_cache.mark_changed(args.into)
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a collection with its vectors to Parquet, or restore one")
+    commands = parser.add_subparsers(dest="command", required=True)
+    export = commands.add_parser("export", help="write a collection to a directory of Parquet files")
+    export.add_argument("collection")
+    export.add_argument("out_dir")
+    export.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="parts exported in parallel")
+    replication.add_nodes_argument(export)
+    restore = commands.add_parser("restore", help="import an export directory with its UUIDs and vectors")
+    restore.add_argument("in_dir")
+    restore.add_argument("--into", help="collection to restore into (default: the exported collection's name)")
+    restore.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="parts restored in parallel")
+    replication.add_arguments(restore)
+    import_common.add_wait_indexed_argument(restore)
+    ingest_metrics.add_arguments(restore)
+    args = parser.parse_args()
+    if args.workers < 1:
+        print("Error: --workers must be at least 1.")
+        sys.exit(1)
+
+    try:
+        if args.command == "export":
+            export_collection(args)
+        else:
+            restore_collection(args)
+    except Exception as e:
+        print(f"Exception: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
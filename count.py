@@ -1,26 +1,195 @@
 import weaviate
-import weaviate.classes as wvc
-import weaviate.classes.config as wc
-import os
+from concurrent.futures import ThreadPoolExecutor
+import argparse
 import json
+import time
 
 headers = {
     #"X-OpenAI-Api-Key": os.getenv("OPENAI_APIKEY")
 }  # Replace with your OpenAI API key
 
-try:
-
-    client = weaviate.connect_to_local(headers=headers)
-    assert client.is_live()
-    collections = client.collections.list_all()
-    # Print all collection names
-    for name in collections:
-        print(name)
-        collection = client.collections.get(name)
-        aggregation = collection.aggregate.over_all(total_count=True)
-        print(aggregation.total_count)
-
-except Exception as e:
-    print(e)
-finally:  # This will always be executed, even if an exception is raised
-    client.close()  # Close the connection & release resources
+# Collection statistics. The per-shard numbers come from one nodes call,
+# which is cheap enough to poll: with ASYNC_INDEXING on, the vector queue
+# length there is how far indexing lags the imports. --exact adds
+# aggregate counts (per tenant for multi-tenant collections), run
+# concurrently rather than one collection after another.
+
+DEFAULT_WORKERS = 8
+
+def shard_stats(client):
+    # {collection: [shard dict]} from a single verbose nodes call
+    shards = {}
+    for node in client.cluster.nodes(output="verbose"):
+        for shard in node.shards:
+            shards.setdefault(shard.collection, []).append({
+                "name": shard.name,
+                "node": shard.node,
+                "objects": shard.object_count,
+                "vector_indexing_status": shard.vector_indexing_status,
+                "vector_queue_length": shard.vector_queue_length,
+                "compressed": shard.compressed,
+            })
+    return shards
+
+def shards_for(shards, name):
+    # Collection names are case-insensitive in Weaviate; the nodes endpoint
+    # reports the capitalized form ("Product" for "product")
+    return [s for n, collection_shards in shards.items() if n.lower() == name.lower() for s in collection_shards]
+
+def shard_totals(collection_shards):
+    # With replication every node holding a copy reports the shard, so count
+    # each shard once: objects from its fullest replica, queue from its
+    # slowest. Returns (objects, vector queue length).
+    objects = {}
+    queue = {}
+    for s in collection_shards:
+        objects[s["name"]] = max(objects.get(s["name"], 0), s["objects"] or 0)
+        queue[s["name"]] = max(queue.get(s["name"], 0), s["vector_queue_length"] or 0)
+    return sum(objects.values()), sum(queue.values())
+
+def _quantizer_name(quantizer):
+    if quantizer is None:
+        return None
+    return type(quantizer).__name__.strip("_").replace("Config", "")
+
+def _vector_dimensions(collection):
+    # Length of one stored vector (the first named vector if there are several)
+    response = collection.query.fetch_objects(limit=1, include_vector=True)
+    if not response.objects:
+        return None
+    vectors = response.objects[0].vector
+    if not vectors:
+        return None
+    vector = vectors.get("default", next(iter(vectors.values())))
+    return len(vector)
+
+def collection_details(client, name, exact):
+    collection = client.collections.get(name)
+    config = collection.config.get()
+    details = {
+        "vector_index_type": config.vector_index_type.value if config.vector_index_type else None,
+        "quantizer": _quantizer_name(config.vector_index_config.quantizer) if config.vector_index_config else None,
+        "multi_tenancy": config.multi_tenancy_config.enabled,
+        "vector_dimensions": _vector_dimensions(collection) if not config.multi_tenancy_config.enabled else None,
+    }
+    if exact:
+        if config.multi_tenancy_config.enabled:
+            tenants = collection.tenants.get()
+            with ThreadPoolExecutor(max_workers=min(DEFAULT_WORKERS, max(1, len(tenants)))) as pool:
+                counts = pool.map(lambda t: collection.with_tenant(t).aggregate.over_all(total_count=True).total_count,
+                                  tenants)
+                details["tenants"] = dict(zip(tenants, counts))
+            details["total_count"] = sum(details["tenants"].values())
+        else:
+            details["total_count"] = collection.aggregate.over_all(total_count=True).total_count
+    return details
+
+def collect_stats(client, names=None, exact=False, workers=DEFAULT_WORKERS):
+    if names is None:
+        names = list(client.collections.list_all())
+    shards = shard_stats(client)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        details = dict(zip(names, pool.map(lambda n: collection_details(client, n, exact), names)))
+    stats = {}
+    for name in names:
+        collection_shards = shards_for(shards, name)
+        objects, queue = shard_totals(collection_shards)
+        entry = {
+            "objects": objects,
+            "vector_queue_length": queue,
+            "indexing": sorted({s["vector_indexing_status"] for s in collection_shards}),
+            "shards": collection_shards,
+        }
+        entry.update(details[name])
+        if entry["vector_dimensions"]:
+            # Uncompressed float32 vectors; compression shrinks what is held in memory
+            entry["vector_bytes_estimate"] = entry["objects"] * entry["vector_dimensions"] * 4
+        stats[name] = entry
+    return stats
+
+def print_stats(stats):
+    for name, s in stats.items():
+        shard_count = len({shard['name'] for shard in s['shards']})
+        replicas = f", {len(s['shards'])} replicas" if len(s['shards']) > shard_count else ""
+        print(f"{name}: {s['objects']} objects in {shard_count} shards{replicas}"
+              + (f" (exact count {s['total_count']})" if "total_count" in s else ""))
+        index = s["vector_index_type"] or "no"
+        if s["quantizer"]:
+            index += f" + {s['quantizer']}"
+        line = f"  {index} vector index"
+        if s.get("vector_bytes_estimate"):
+            line += f", {s['vector_dimensions']} dims, ~{s['vector_bytes_estimate'] / (1 << 20):.1f} MiB of vectors"
+        print(line + f", indexing {'/'.join(s['indexing']) or 'n/a'}, queue {s['vector_queue_length']}")
+        for shard in s["shards"]:
+            print(f"    {shard['name']} on {shard['node']}: {shard['objects']} objects, "
+                  f"{shard['vector_indexing_status']}, queue {shard['vector_queue_length']}")
+        for tenant, count in s.get("tenants", {}).items():
+            print(f"    tenant {tenant}: {count}")
+
+def watch(client, names, interval, as_json):
+    # Polls only the nodes endpoint: object counts and queue lengths per
+    # collection, with the import and indexing rates since the last poll
+    wanted = {n.lower() for n in names} if names is not None else None
+    previous = None
+    while True:
+        now = time.monotonic()
+        shards = shard_stats(client)
+        current = {}
+        for name, collection_shards in shards.items():
+            if wanted is None or name.lower() in wanted:
+                current[name] = shard_totals(collection_shards)
+        rows = {}
+        for name, (objects, queue) in sorted(current.items()):
+            row = {"objects": objects, "vector_queue_length": queue}
+            if previous is not None and name in previous[1]:
+                elapsed = now - previous[0]
+                before_objects, before_queue = previous[1][name]
+                row["objects_per_second"] = (objects - before_objects) / elapsed
+                # Vectors indexed = objects added minus queue growth
+                row["indexed_per_second"] = ((objects - before_objects) - (queue - before_queue)) / elapsed
+            rows[name] = row
+        if as_json:
+            print(json.dumps({"time": time.time(), "collections": rows}))
+        else:
+            for name, row in rows.items():
+                line = f"{time.strftime('%H:%M:%S')} {name}: {row['objects']} objects, queue {row['vector_queue_length']}"
+                if "objects_per_second" in row:
+                    line += f", +{row['objects_per_second']:.0f}/s imported, {row['indexed_per_second']:.0f}/s indexed"
+                print(line)
+        previous = (now, current)
+        time.sleep(interval)
+
+def main():
+    parser = argparse.ArgumentParser(description="Show Weaviate collection statistics")
+    parser.add_argument("collections", nargs="*", help="collections to report on (default: all)")
+    parser.add_argument("--exact", action="store_true",
+                        help="also run aggregate total counts (per tenant for multi-tenant collections)")
+    parser.add_argument("--json", action="store_true", help="print JSON instead of text")
+    parser.add_argument("--watch", type=float, metavar="SECONDS",
+                        help="poll object counts and indexing queues every SECONDS and show rates")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="collections inspected concurrently")
+    args = parser.parse_args()
+    names = args.collections or None
+
+    client = None
+    try:
+        client = weaviate.connect_to_local(headers=headers)
+        assert client.is_live()
+        if args.watch:
+            watch(client, names, args.watch, args.json)
+        else:
+            stats = collect_stats(client, names, exact=args.exact, workers=args.workers)
+            if args.json:
+                print(json.dumps(stats, indent=2))
+            else:
+                print_stats(stats)
+    except KeyboardInterrupt:
+        pass
+    except Exception as e:
+        print(e)
+    finally:  # This will always be executed, even if an exception is raised
+        if client is not None:
+            client.close()  # Close the connection & release resources
+
+if __name__ == "__main__":
+    main()
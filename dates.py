@@ -0,0 +1,56 @@
+from datetime import datetime, timezone
+import numpy as np
+
+# Date conversion shared by the importers: review unix timestamps and
+# free-form product date strings both become Weaviate DATE strings, through
+# memos keyed by the input value. unixReviewTime is day-granular in the
+# Amazon dumps, so a few thousand distinct values cover hundreds of millions
+# of reviews; product dates repeat similarly.
+MAX_MEMO_SIZE = 1 << 20
+_memo = {}
+
+def unix_to_iso(timestamps):
+    # Converts a chunk of unix timestamps to Weaviate DATE strings
+    # ("2014-02-14T00:00:00+00:00"). Unseen values go through one vectorized
+    # datetime64 conversion; everything else comes from the memo.
+    distinct = set(timestamps)
+    missing = [t for t in distinct if t not in _memo]
+    if missing:
+        if len(_memo) + len(missing) > MAX_MEMO_SIZE:
+            # Start over with just this chunk, including what was memoized
+            _memo.clear()
+            missing = list(distinct)
+        seconds = np.array([int(t) for t in missing], dtype="datetime64[s]")
+        for t, iso in zip(missing, np.datetime_as_string(seconds, unit="s")):
+            _memo[t] = iso + "+00:00"
+    return [_memo[t] for t in timestamps]
+
+# Free-form product dates seen in the metadata dump, most common first
+DATE_FORMATS = ("%B %d, %Y", "%b %d, %Y", "%d %B %Y", "%d %b %Y", "%Y-%m-%d", "%m/%d/%Y", "%B %Y", "%Y")
+_text_memo = {}
+
+def _parse_text_date(text):
+    text = text.strip().rstrip(".")
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).replace(tzinfo=timezone.utc).isoformat()
+        except ValueError:
+            pass
+    return None
+
+def text_to_iso(values):
+    # Converts a chunk of product `date` strings to DATE strings; anything
+    # unparseable (the dump has HTML fragments in this field) becomes None.
+    # Like unix_to_iso, each distinct string is parsed once.
+    result = []
+    for value in values:
+        if type(value) is not str or len(value) > 40:
+            result.append(None)
+            continue
+        iso = _text_memo.get(value, False)
+        if iso is False:
+            if len(_text_memo) >= MAX_MEMO_SIZE:
+                _text_memo.clear()
+            iso = _text_memo[value] = _parse_text_date(value)
+        result.append(iso)
+    return result
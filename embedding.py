@@ -0,0 +1,278 @@
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED, ALL_COMPLETED
+from collections import OrderedDict
+import requests
+import random
+import threading
+import time
+from types import SimpleNamespace
+from embedding_cache import EmbeddingCache
+
+# The importers talk to LM Studio from the host; Weaviate reaches the same
+# server as host.docker.internal:1234 from inside docker.
+DEFAULT_EMBED_URL = "http://localhost:1234"
+DEFAULT_EMBED_MODEL = "text-embedding-3-small"
+DEFAULT_EMBED_BATCH = 64
+DEFAULT_EMBED_CONCURRENCY = 4
+DEFAULT_EMBED_TARGET_LATENCY = 2.0  # seconds per embedding request
+EMBED_MAX_ATTEMPTS = 5
+STUB_EMBED_URL = "stub"  # --embed-url stub: fake_weaviate's in-process embedding, for benchmarks
+DEFAULT_QUERY_MEMO_SIZE = 10000  # search strings whose vectors QueryEmbedder keeps
+
+class Embedder:
+    # Minimal client for an OpenAI-compatible /v1/embeddings endpoint
+    def __init__(self, base_url=DEFAULT_EMBED_URL, model=DEFAULT_EMBED_MODEL, timeout=120):
+        self.url = base_url.rstrip("/") + "/v1/embeddings"
+        self.model = model
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def embed(self, texts):
+        response = self.session.post(self.url, json={"model": self.model, "input": texts}, timeout=self.timeout)
+        response.raise_for_status()
+        data = sorted(response.json()["data"], key=lambda d: d["index"])
+        return [d["embedding"] for d in data]
+
+def normalize_query(text):
+    # Search strings that differ only in case or spacing share one vector
+    return " ".join(text.split()).casefold()
+
+class QueryEmbedder:
+    # Memoized embedding of search strings, so repeated queries can go to
+    # near_vector/hybrid with a vector we already have instead of making the
+    # server call the embedder again. Entries are keyed by model and
+    # normalized text and evicted least recently used first.
+    def __init__(self, embedder, max_entries=DEFAULT_QUERY_MEMO_SIZE):
+        self.embedder = embedder
+        self.max_entries = max_entries
+        self.memo = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def key(self, text):
+        return (self.embedder.model, normalize_query(text))
+
+    def lookup(self, text):
+        key = self.key(text)
+        with self.lock:
+            vector = self.memo.get(key)
+            if vector is None:
+                self.misses += 1
+                return None
+            self.memo.move_to_end(key)
+            self.hits += 1
+            return vector
+
+    def embed(self, text):
+        vector = self.lookup(text)
+        if vector is None:
+            vector = self.embed_missing(text)
+        return vector
+
+    def embed_missing(self, text):
+        # The embedder round trip for a lookup() miss
+        key = self.key(text)
+        vector = self.embedder.embed([key[1]])[0]
+        with self.lock:
+            self.memo[key] = vector
+            while len(self.memo) > self.max_entries:
+                self.memo.popitem(last=False)
+        return vector
+
+    def stats(self):
+        with self.lock:
+            return {"entries": len(self.memo), "hits": self.hits, "misses": self.misses}
+
+def vectorizer_text(collection_name, properties, vectorized):
+    # Same shape of input text2vec-openai builds on the server: the class name
+    # followed by the vectorized property values in property-name order.
+    parts = [collection_name]
+    for name in sorted(vectorized):
+        value = properties.get(name)
+        if value is None:
+            continue
+        if isinstance(value, list):
+            parts.extend(str(v) for v in value)
+        else:
+            parts.append(str(value))
+    return " ".join(parts)
+
+class AdaptiveLimits:
+    # AIMD-style controller for chunk size (N) and requests in flight (K).
+    # Fast responses grow N first, then K; slow responses shed a request in
+    # flight; errors halve both.
+    def __init__(self, batch_size, concurrency, max_batch_size=1024, max_concurrency=16, target_latency=2.0):
+        self.min_batch_size = 1
+        self.batch_size = batch_size
+        self.max_batch_size = max(batch_size, max_batch_size)
+        self.concurrency = min(concurrency, max_concurrency)
+        self.max_concurrency = max_concurrency
+        self.target_latency = target_latency
+
+    def record(self, latency, errors):
+        if errors:
+            self.batch_size = max(self.min_batch_size, self.batch_size // 2)
+            self.concurrency = max(1, self.concurrency // 2)
+        elif latency > self.target_latency:
+            if self.concurrency > 1:
+                self.concurrency -= 1
+            else:
+                self.batch_size = max(self.min_batch_size, self.batch_size * 3 // 4)
+        elif latency < self.target_latency / 2:
+            if self.batch_size < self.max_batch_size:
+                self.batch_size = min(self.max_batch_size, self.batch_size + max(1, self.batch_size // 4))
+            elif self.concurrency < self.max_concurrency:
+                self.concurrency += 1
+
+class VectorStage:
+    # Sits in front of a batch context: buffers objects into chunks, looks
+    # their text up in the cache and sends only the misses to the embedder.
+    # Up to limits.concurrency chunks are embedded in parallel on a thread
+    # pool; finished chunks are handed to the batch with vector=... set, so
+    # embedder throughput is independent of the batch's dynamic sizing. A
+    # chunk that still fails after EMBED_MAX_ATTEMPTS goes to the retry
+    # queue's dead-letter file (when one is given) instead of aborting the
+    # import.
+    def __init__(self, embedder, text_fn, cache=None, batch_size=DEFAULT_EMBED_BATCH,
+                 concurrency=DEFAULT_EMBED_CONCURRENCY, target_latency=DEFAULT_EMBED_TARGET_LATENCY, metrics=None,
+                 retries=None):
+        self.embedder = embedder
+        self.metrics = metrics
+        self.retries = retries
+        self.text_fn = text_fn
+        self.cache = cache
+        self.limits = AdaptiveLimits(batch_size, min(2, concurrency), max_concurrency=concurrency,
+                                     target_latency=target_latency)
+        self.executor = ThreadPoolExecutor(max_workers=concurrency)
+        self.pending = []
+        self.in_flight = {}
+        self.embedded = 0
+        self.requests = 0
+        self.errors = 0
+        self.failed = 0
+
+    def add(self, batch, properties, uuid=None):
+        self.pending.append((properties, uuid))
+        if len(self.pending) >= self.limits.batch_size:
+            self.submit(batch)
+
+    def submit(self, batch):
+        if not self.pending:
+            return
+        pending, self.pending = self.pending, []
+        texts = [self.text_fn(properties) for properties, _ in pending]
+        vectors = [None] * len(texts)
+        if self.cache is not None:
+            for i, text in enumerate(texts):
+                vectors[i] = self.cache.get(text)
+        missing = {}
+        for i, vector in enumerate(vectors):
+            if vector is None:
+                missing.setdefault(texts[i], []).append(i)
+        if not missing:
+            self._emit(batch, pending, vectors)
+            return
+        while len(self.in_flight) >= self.limits.concurrency:
+            self._collect(batch, FIRST_COMPLETED)
+        future = self.executor.submit(self._embed, list(missing))
+        self.in_flight[future] = (pending, vectors, missing)
+
+    def _embed(self, texts):
+        # Runs on the pool; returns the vectors with the latency of the
+        # successful request and how many attempts failed before it.
+        errors = 0
+        while True:
+            started = time.monotonic()
+            try:
+                return self.embedder.embed(texts), time.monotonic() - started, errors
+            except Exception:
+                errors += 1
+                if errors >= EMBED_MAX_ATTEMPTS:
+                    raise
+                time.sleep(min(30, 2 ** errors) * random.uniform(0.5, 1.0))
+
+    def _collect(self, batch, return_when):
+        done, _ = wait(list(self.in_flight), return_when=return_when)
+        for future in done:
+            pending, vectors, missing = self.in_flight.pop(future)
+            try:
+                new_vectors, latency, errors = future.result()
+            except Exception as e:
+                if self.retries is None:
+                    raise
+                self._fail(pending, e)
+                continue
+            self.requests += 1
+            self.errors += errors
+            self.embedded += len(missing)
+            self.limits.record(latency, errors)
+            if self.metrics is not None:
+                self.metrics.add_time("embed", latency)
+            new_texts = list(missing)
+            if self.cache is not None:
+                self.cache.put_many(new_texts, new_vectors)
+            for text, vector in zip(new_texts, new_vectors):
+                for i in missing[text]:
+                    vectors[i] = vector
+            self._emit(batch, pending, vectors)
+
+    def _fail(self, pending, error):
+        # The embedder gave up on this chunk; dead-letter its objects so the
+        # rest of the import carries on and they can be replayed later
+        self.errors += EMBED_MAX_ATTEMPTS
+        self.failed += len(pending)
+        self.limits.record(0.0, EMBED_MAX_ATTEMPTS)
+        for properties, uuid in pending:
+            self.retries.dead_letter(SimpleNamespace(uuid=uuid, properties=properties), EMBED_MAX_ATTEMPTS,
+                                     f"embedding failed: {error}", "embedding failed")
+
+    def _emit(self, batch, pending, vectors):
+        for (properties, uuid), vector in zip(pending, vectors):
+            batch.add_object(properties=properties, uuid=uuid, vector=vector)
+
+    def flush(self, batch):
+        # Submit the partial chunk and wait for every request in flight
+        self.submit(batch)
+        if self.in_flight:
+            self._collect(batch, ALL_COMPLETED)
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def summary(self):
+        text = (f"embedded {self.embedded} texts in {self.requests} requests ({self.errors} errors, "
+                f"{self.failed} objects dead-lettered), "
+                f"final chunk size {self.limits.batch_size}, concurrency {self.limits.concurrency}")
+        if self.cache is None:
+            return text
+        stats = self.cache.stats()
+        return f"{text}, cache hits {stats['hits']}, misses {stats['misses']}, entries {stats['entries']}"
+
+def add_arguments(parser):
+    parser.add_argument("--client-vectors", action="store_true",
+                        help="embed on the client and send vectors with each object instead of using the server vectorizer")
+    parser.add_argument("--embed-cache", metavar="DIR",
+                        help="reuse embeddings of unchanged text from this cache directory (implies --client-vectors)")
+    parser.add_argument("--embed-url", default=DEFAULT_EMBED_URL, help="OpenAI-compatible embedding server")
+    parser.add_argument("--embed-model", default=DEFAULT_EMBED_MODEL, help="embedding model name")
+    parser.add_argument("--embed-batch", type=int, default=DEFAULT_EMBED_BATCH,
+                        help="starting number of texts per embedding request; adapted to observed latency")
+    parser.add_argument("--embed-concurrency", type=int, default=DEFAULT_EMBED_CONCURRENCY,
+                        help="maximum embedding requests in flight")
+    parser.add_argument("--embed-target-latency", type=float, default=DEFAULT_EMBED_TARGET_LATENCY,
+                        help="seconds per embedding request the adaptive sizing aims for")
+
+def stage_from_args(args, text_fn, metrics=None, retries=None):
+    if not (args.client_vectors or args.embed_cache):
+        return None
+    cache = None
+    if args.embed_cache:
+        cache = EmbeddingCache(args.embed_cache, args.embed_model)
+    if args.embed_url == STUB_EMBED_URL:
+        import fake_weaviate
+        embedder = fake_weaviate.StubEmbedder(args.embed_model)
+    else:
+        embedder = Embedder(args.embed_url, args.embed_model)
+    return VectorStage(embedder, text_fn, cache=cache, batch_size=args.embed_batch,
+                       concurrency=args.embed_concurrency, target_latency=args.embed_target_latency, metrics=metrics,
+                       retries=retries)
@@ -0,0 +1,114 @@
+import numpy as np
+import hashlib
+import fcntl
+import json
+import os
+import re
+
+class EmbeddingCache:
+    # On-disk cache of embeddings keyed by a hash of (model, text).
+    #
+    # Each model gets its own directory holding:
+    #   vectors.f32  - append-only float32 matrix, one row per cached text, mmap'd for reads
+    #   keys.bin     - 16-byte blake2b digests, row i of keys.bin is row i of vectors.f32
+    #   meta.json    - vector dimension
+    # Appends take an exclusive lock on keys.bin so several import workers can share a cache.
+    KEY_SIZE = 16
+
+    def __init__(self, cache_dir, model):
+        self.model = model
+        self.dir = os.path.join(cache_dir, re.sub(r"[^A-Za-z0-9_.-]", "_", model))
+        os.makedirs(self.dir, exist_ok=True)
+        self.keys_path = os.path.join(self.dir, "keys.bin")
+        self.vectors_path = os.path.join(self.dir, "vectors.f32")
+        self.meta_path = os.path.join(self.dir, "meta.json")
+        self.dim = None
+        self.index = {}
+        self.vectors = None
+        self.hits = 0
+        self.misses = 0
+        self._load()
+
+    def key(self, text):
+        return hashlib.blake2b(f"{self.model}\0{text}".encode("utf-8"), digest_size=self.KEY_SIZE).digest()
+
+    def _load(self):
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path) as f:
+                self.dim = json.load(f)["dim"]
+        if os.path.exists(self.keys_path):
+            with open(self.keys_path, "rb") as f:
+                data = f.read()
+            for row in range(len(data) // self.KEY_SIZE):
+                self.index[data[row * self.KEY_SIZE:(row + 1) * self.KEY_SIZE]] = row
+        self._map()
+
+    def _map(self):
+        if self.dim is None or not os.path.exists(self.vectors_path):
+            self.vectors = None
+            return
+        rows = os.path.getsize(self.vectors_path) // (self.dim * 4)
+        if rows == 0:
+            self.vectors = None
+            return
+        self.vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(rows, self.dim))
+
+    def __len__(self):
+        return len(self.index)
+
+    def get(self, text):
+        row = self.index.get(self.key(text))
+        if row is None:
+            self.misses += 1
+            return None
+        if self.vectors is None or row >= self.vectors.shape[0]:
+            self._map()
+        self.hits += 1
+        return self.vectors[row].tolist()
+
+    def put_many(self, texts, vectors):
+        if not texts:
+            return
+        arr = np.asarray(vectors, dtype=np.float32)
+        if self.dim is None:
+            self.dim = arr.shape[1]
+            with open(self.meta_path, "w") as f:
+                json.dump({"dim": self.dim, "model": self.model}, f)
+        if arr.shape[1] != self.dim:
+            raise ValueError(f"{self.dir}: expected {self.dim}-dimensional vectors, got {arr.shape[1]}")
+
+        keys = []
+        rows = []
+        seen = set()
+        for i, text in enumerate(texts):
+            k = self.key(text)
+            if k in self.index or k in seen:
+                continue
+            seen.add(k)
+            keys.append(k)
+            rows.append(i)
+        if not keys:
+            return
+
+        with open(self.keys_path, "ab") as kf:
+            fcntl.flock(kf, fcntl.LOCK_EX)
+            try:
+                # A key's row is its position in keys.bin. A writer that died
+                # between the two appends below leaves vector rows (or a torn
+                # key) with no complete key; cut both files back to the last
+                # complete key so new rows line up with their keys again.
+                first_row = os.path.getsize(self.keys_path) // self.KEY_SIZE
+                kf.truncate(first_row * self.KEY_SIZE)
+                with open(self.vectors_path, "ab") as vf:
+                    vf.truncate(first_row * self.dim * 4)
+                    # Vectors go down before keys so a key on disk always has its row
+                    vf.write(arr[rows].tobytes())
+                kf.write(b"".join(keys))
+                kf.flush()
+            finally:
+                fcntl.flock(kf, fcntl.LOCK_UN)
+        for offset, k in enumerate(keys):
+            self.index[k] = first_row + offset
+
+    def stats(self):
+        return {"entries": len(self.index), "hits": self.hits, "misses": self.misses}
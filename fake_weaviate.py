@@ -0,0 +1,335 @@
+import asyncio
+import functools
+import hashlib
+import math
+import random
+import re
+import uuid as uuidlib
+from datetime import datetime, timezone
+from types import SimpleNamespace
+import numpy as np
+from synthetic_data import ARTISTS, GENRES, WORDS
+
+# Deterministic in-process stand-ins for the parts of the Weaviate client
+# that query_async.py (FakeAsyncClient) and the importers (FakeClient) use,
+# so the benchmarks run without docker or an embedding server. Vectors come
+# from stub_vector(), a hashed bag of words, so texts sharing words land near
+# each other; bm25 is a plain TF-IDF over the same tokens. Results are
+# plausible, not Weaviate's.
+
+STUB_DIMENSIONS = 64
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+def tokens(text):
+    return TOKEN_RE.findall(text.lower())
+
+@functools.lru_cache(maxsize=1 << 16)
+def _token_vector(token, dimensions):
+    seed = int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little")
+    return np.random.default_rng(seed).standard_normal(dimensions).astype(np.float32)
+
+def stub_vector(text, dimensions=STUB_DIMENSIONS):
+    # Fixed embedding stub: the normalized sum of per-token random vectors
+    vector = np.zeros(dimensions, dtype=np.float32)
+    for token in tokens(text):
+        vector += _token_vector(token, dimensions)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+class StubEmbedder:
+    # Drop-in for embedding.Embedder that never leaves the process
+    def __init__(self, model="stub", dimensions=STUB_DIMENSIONS):
+        self.model = model
+        self.dimensions = dimensions
+
+    def embed(self, texts):
+        return [stub_vector(t, self.dimensions).tolist() for t in texts]
+
+def synthetic_products(count, seed=0, duplicate_share=0.2):
+    # Product records shaped like the Amazon metadata; duplicate_share of them
+    # reuse an earlier ASIN, as the real dump does
+    rng = random.Random(seed)
+    products = []
+    for i in range(count):
+        if products and rng.random() < duplicate_share:
+            asin = rng.choice(products)["asin"]
+        else:
+            asin = f"B{i:09d}"
+        artist = rng.choice(ARTISTS)
+        genre = rng.choice(GENRES)
+        title = " ".join(rng.sample(WORDS, 3)).title()
+        price = rng.randint(500, 4099) / 100
+        released = datetime(rng.randint(1990, 2023), rng.choice([1, 6, 10]), rng.randint(1, 28), tzinfo=timezone.utc)
+        products.append({
+            "asin": asin,
+            "title": title,
+            "brand": artist,
+            "main_cat": "Digital Music",
+            "category": ["CDs & Vinyl", genre],
+            "description": [f"{title} by {artist}, {genre.lower()} {' '.join(rng.sample(WORDS, 5))}"],
+            "price": f"${price:.2f}",
+            "price_value": price,
+            "date": released.strftime("%B %d, %Y"),
+            "release_date": released,
+        })
+    return products
+
+def synthetic_reviews(products, per_product=3, seed=0):
+    rng = random.Random(seed)
+    reviews = []
+    for product in products:
+        for _ in range(rng.randint(0, 2 * per_product)):
+            reviews.append({
+                "asin": product["asin"],
+                "overall": float(rng.randint(1, 5)),
+                "verified": rng.random() < 0.7,
+                "reviewerName": f"reviewer{rng.randint(1, 10 ** 6)}",
+                "reviewText": " ".join(rng.choices(WORDS, k=12)),
+                "summary": " ".join(rng.choices(WORDS, k=3)),
+            })
+    return reviews
+
+def _matches(filters, obj):
+    # Evaluates the subset of weaviate filter trees the query modules build
+    op = filters.operator.value
+    children = getattr(filters, "filters", None)
+    if isinstance(children, list):
+        if op == "And":
+            return all(_matches(f, obj) for f in children)
+        if op == "Or":
+            return any(_matches(f, obj) for f in children)
+        return not _matches(children[0], obj)
+    target = filters.target
+    if not isinstance(target, str):
+        raise ValueError(f"fake_weaviate: unsupported filter target {target!r}")
+    actual = str(obj.uuid) if target == "_id" else obj.properties.get(target)
+    value = filters.value
+    if op == "IsNull":
+        return (actual is None) == value
+    if actual is None:
+        return False
+    values = actual if isinstance(actual, list) else [actual]
+    if op == "Equal":
+        return value in values
+    if op == "NotEqual":
+        return value not in values
+    if op == "ContainsAny":
+        return any(v in values for v in value)
+    if op == "ContainsAll":
+        return all(v in values for v in value)
+    if op == "Like":
+        pattern = re.compile(re.escape(value).replace(r"\*", ".*").replace(r"\?", "."), re.IGNORECASE)
+        return any(pattern.fullmatch(str(v)) for v in values)
+    compare = {"GreaterThan": lambda a: a > value, "GreaterThanEqual": lambda a: a >= value,
+               "LessThan": lambda a: a < value, "LessThanEqual": lambda a: a <= value}.get(op)
+    if compare is None:
+        raise ValueError(f"fake_weaviate: unsupported filter operator {op}")
+    try:
+        return any(compare(v) for v in values)
+    except TypeError:
+        return False
+
+class FakeCollection:
+    def __init__(self, name, records, vector_text, latency=0.0):
+        self.name = name
+        self.latency = latency
+        self.objects = [SimpleNamespace(uuid=uuidlib.UUID(int=random.Random(f"{name}{i}").getrandbits(128)),
+                                        properties=r) for i, r in enumerate(records)]
+        self.vectors = np.stack([stub_vector(vector_text(r)) for r in records]) if records else np.zeros((0, STUB_DIMENSIONS))
+        self.token_sets = [set(tokens(vector_text(r))) for r in records]
+        df = {}
+        for ts in self.token_sets:
+            for t in ts:
+                df[t] = df.get(t, 0) + 1
+        self.idf = {t: math.log(1 + len(records) / n) for t, n in df.items()}
+        self.query = _FakeQuery(self)
+
+    async def _wait(self):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    def _candidates(self, filters):
+        if filters is None:
+            return np.arange(len(self.objects))
+        return np.array([i for i, o in enumerate(self.objects) if _matches(filters, o)], dtype=np.int64)
+
+    def _result(self, index, return_properties, **metadata):
+        o = self.objects[index]
+        properties = o.properties
+        if return_properties is not None:
+            properties = {k: v for k, v in properties.items() if k in return_properties}
+        return SimpleNamespace(uuid=o.uuid, properties=properties, metadata=SimpleNamespace(**metadata))
+
+    def _respond(self, ranked, limit, group_by, return_properties, metric):
+        # ranked is [(index, score)] best first
+        if group_by is None:
+            objects = [self._result(i, return_properties, **{metric: s}) for i, s in ranked[:limit]]
+            return SimpleNamespace(objects=objects)
+        groups = {}
+        for i, s in ranked:
+            name = self.objects[i].properties.get(group_by.prop)
+            group = groups.get(name)
+            if group is None:
+                if len(groups) == group_by.number_of_groups:
+                    continue
+                group = groups[name] = SimpleNamespace(name=name, objects=[])
+            if len(group.objects) < group_by.objects_per_group:
+                group.objects.append(self._result(i, return_properties, **{metric: s}))
+        return SimpleNamespace(objects=[o for g in groups.values() for o in g.objects], groups=groups)
+
+    def vector_scores(self, vector, candidates):
+        distances = 1.0 - self.vectors[candidates] @ np.asarray(vector, dtype=np.float32)
+        order = np.argsort(distances, kind="stable")
+        return [(int(candidates[j]), float(distances[j])) for j in order]
+
+    def bm25_scores(self, text, candidates):
+        query_tokens = set(tokens(text))
+        scored = []
+        for i in candidates:
+            score = sum(self.idf.get(t, 0.0) for t in query_tokens & self.token_sets[i])
+            if score > 0:
+                scored.append((int(i), score))
+        scored.sort(key=lambda x: -x[1])
+        return scored
+
+class _FakeQuery:
+    def __init__(self, collection):
+        self.c = collection
+
+    async def near_vector(self, near_vector, limit=10, filters=None, group_by=None, return_properties=None,
+                          return_metadata=None, **kwargs):
+        await self.c._wait()
+        ranked = self.c.vector_scores(near_vector, self.c._candidates(filters))
+        return self.c._respond(ranked, limit, group_by, return_properties, "distance")
+
+    async def near_text(self, query, limit=10, **kwargs):
+        return await self.near_vector(stub_vector(query), limit=limit, **kwargs)
+
+    async def bm25(self, query, limit=10, filters=None, group_by=None, return_properties=None,
+                   return_metadata=None, **kwargs):
+        await self.c._wait()
+        ranked = self.c.bm25_scores(query, self.c._candidates(filters))
+        return self.c._respond(ranked, limit, group_by, return_properties, "score")
+
+    async def hybrid(self, query, vector=None, alpha=0.75, limit=10, filters=None, group_by=None,
+                     return_properties=None, return_metadata=None, **kwargs):
+        # Relative-score fusion of the two rankings, as Weaviate does by default
+        await self.c._wait()
+        candidates = self.c._candidates(filters)
+        dense = self.c.vector_scores(vector if vector is not None else stub_vector(query), candidates)
+        sparse = self.c.bm25_scores(query, candidates)
+        fused = {}
+        for ranked, weight, flip in ((dense, alpha, True), (sparse, 1 - alpha, False)):
+            if not ranked:
+                continue
+            values = [s for _, s in ranked]
+            low, high = min(values), max(values)
+            for i, s in ranked:
+                norm = (s - low) / (high - low) if high > low else 1.0
+                fused[i] = fused.get(i, 0.0) + weight * ((1 - norm) if flip else norm)
+        ranked = sorted(fused.items(), key=lambda x: -x[1])
+        return self.c._respond(ranked, limit, group_by, return_properties, "score")
+
+    async def fetch_objects(self, limit=10, filters=None, return_properties=None, **kwargs):
+        await self.c._wait()
+        ranked = [(int(i), None) for i in self.c._candidates(filters)]
+        return self.c._respond(ranked, limit, None, return_properties, "score")
+
+class _FakeCollections:
+    def __init__(self, collections):
+        self.collections = collections
+
+    def get(self, name):
+        return self.collections[name.lower()]
+
+class FakeAsyncClient:
+    # Matches what query_async needs: collections.get() and close()
+    def __init__(self, products=5000, seed=0, latency=0.0):
+        product_records = synthetic_products(products, seed=seed)
+        review_records = synthetic_reviews(product_records, seed=seed)
+        self.collections = _FakeCollections({
+            "product": FakeCollection("product", product_records,
+                                      lambda r: " ".join([r["title"], r["brand"]] + r["category"] + r["description"]),
+                                      latency=latency),
+            "review": FakeCollection("review", review_records, lambda r: r["reviewText"] + " " + r["summary"],
+                                     latency=latency),
+        })
+
+    async def close(self):
+        pass
+
+class _FakeBatch:
+    # What the importers call on a batch context; objects are counted, not kept
+    def __init__(self, collection):
+        self.collection = collection
+        self.number_errors = 0
+
+    def add_object(self, properties=None, uuid=None, vector=None, **kwargs):
+        self.collection.count += 1
+        if vector is not None:
+            self.collection.vectors += 1
+
+    def flush(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+class _FakeBatchAccess:
+    def __init__(self, collection):
+        self.collection = collection
+        self.failed_objects = []
+
+    def dynamic(self):
+        return _FakeBatch(self.collection)
+
+class FakeWriteCollection:
+    def __init__(self, name):
+        self.name = name
+        self.count = 0
+        self.vectors = 0
+        self.batch = _FakeBatchAccess(self)
+
+    def with_consistency_level(self, consistency_level):
+        return self
+
+class _FakeWriteCollections:
+    def __init__(self):
+        self.collections = {}
+
+    def exists(self, name):
+        return name.lower() in self.collections
+
+    def create(self, name, **kwargs):
+        self.collections[name.lower()] = FakeWriteCollection(name)
+
+    def get(self, name):
+        if name.lower() not in self.collections:
+            self.create(name)
+        return self.collections[name.lower()]
+
+class FakeClient:
+    # Sync client for the importers' benchmark: accepts everything, stores
+    # nothing, so the numbers measure our side of the pipeline
+    def __init__(self):
+        self.collections = _FakeWriteCollections()
+        self.cluster = SimpleNamespace(nodes=self._nodes)
+
+    def _nodes(self, collection=None, output=None):
+        # Everything is "indexed" the moment it arrives
+        shards = [SimpleNamespace(collection=c.name, name=f"{c.name}-0", node="fake", object_count=c.count,
+                                  vector_indexing_status="READY", vector_queue_length=0, compressed=False)
+                  for c in self.collections.collections.values()]
+        return [SimpleNamespace(name="fake", shards=shards)]
+
+    def is_live(self):
+        return True
+
+    def get_meta(self):
+        return {"version": "fake"}
+
+    def close(self):
+        pass
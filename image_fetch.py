@@ -0,0 +1,140 @@
+import base64
+import hashlib
+import os
+import tempfile
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Image loading for near_image searches. Remote images go through one pooled
+# session and are streamed to disk; both the bytes and their base64 form are
+# cached under a hash of the URL, so repeated visual searches for the same
+# product image skip the download and the encode. Local paths work too.
+
+# Next to this module, so every process hits the same cache wherever it starts
+CACHE_DIR = os.environ.get("IMAGE_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".image_cache"))
+DEFAULT_MAX_CACHE_BYTES = 512 << 20
+MAX_IMAGE_BYTES = 32 << 20  # refuse anything bigger than this
+TIMEOUT = (10, 60)  # connect, read seconds
+CHUNK_SIZE = 3 * (1 << 16)  # multiple of 3 so chunks base64-encode independently
+
+def make_session(pool_size=16):
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size,
+                          max_retries=Retry(total=3, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504)))
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def _encode_file(src_path, dst_path):
+    # Streams src_path through base64 into dst_path, CHUNK_SIZE bytes at a time
+    with open(src_path, "rb") as src, open(dst_path, "wb") as dst:
+        while True:
+            chunk = src.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            dst.write(base64.b64encode(chunk))
+
+class ImageCache:
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=DEFAULT_MAX_CACHE_BYTES, session=None):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.session = session or make_session()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def key(self, src):
+        if os.path.isfile(src):
+            # Local files are keyed by identity and version, not just the path
+            st = os.stat(src)
+            src = f"file:{os.path.abspath(src)}:{st.st_size}:{st.st_mtime_ns}"
+        return hashlib.sha256(src.encode("utf-8")).hexdigest()
+
+    def _paths(self, key):
+        return os.path.join(self.cache_dir, key + ".img"), os.path.join(self.cache_dir, key + ".b64")
+
+    def _download(self, url, dst_path):
+        fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as f, self.session.get(url, stream=True, timeout=TIMEOUT) as response:
+                response.raise_for_status()
+                size = 0
+                for chunk in response.iter_content(CHUNK_SIZE):
+                    size += len(chunk)
+                    if size > MAX_IMAGE_BYTES:
+                        raise ValueError(f"{url}: Image is larger than {MAX_IMAGE_BYTES} bytes")
+                    f.write(chunk)
+            os.replace(tmp, dst_path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def base64(self, src):
+        # Base64 of the image at src (URL or local path), from the cache when we can
+        key = self.key(src)
+        img_path, b64_path = self._paths(key)
+        try:
+            os.utime(b64_path)
+            with open(b64_path) as f:
+                encoded = f.read()
+            with self.lock:
+                self.hits += 1
+            return encoded
+        except FileNotFoundError:
+            pass  # not cached, or evicted by another process just now
+        with self.lock:
+            self.misses += 1
+
+        if os.path.isfile(src):
+            source = src
+        else:
+            if not os.path.isfile(img_path):
+                self._download(src, img_path)
+            source = img_path
+        tmp = b64_path + f".{os.getpid()}.{threading.get_ident()}.tmp"
+        _encode_file(source, tmp)
+        os.replace(tmp, b64_path)
+        with open(b64_path) as f:
+            encoded = f.read()
+        self.evict()
+        return encoded
+
+    def evict(self):
+        # Drops least recently used files until the cache fits in max_bytes
+        entries = []
+        total = 0
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith((".img", ".b64")):
+                st = entry.stat()
+                entries.append((st.st_mtime, st.st_size, entry.path))
+                total += st.st_size
+        if total <= self.max_bytes:
+            return
+        for _, size, path in sorted(entries):
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def stats(self):
+        size = sum(e.stat().st_size for e in os.scandir(self.cache_dir) if e.name.endswith((".img", ".b64")))
+        return {"hits": self.hits, "misses": self.misses, "bytes": size}
+
+_default = None
+_default_lock = threading.Lock()
+
+def default_cache():
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = ImageCache()
+    return _default
+
+def image_to_base64(src):
+    return default_cache().base64(src)
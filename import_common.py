@@ -0,0 +1,370 @@
+import weaviate
+from weaviate.classes.init import AdditionalConfig, Timeout
+import multiprocessing
+import queue
+import ijson
+import json
+import os
+import sys
+import time
+import count
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Prefer ijson's C backend for the streaming parser when it was built
+try:
+    ijson_backend = ijson.get_backend("yajl2_c")
+except ImportError:
+    ijson_backend = ijson
+
+PARSERS = ("auto", "orjson", "json", "ijson")
+WAIT_INDEXED_INTERVAL = 2.0  # seconds between indexing-queue polls
+DEFAULT_WAIT_INDEXED_TIMEOUT = 3600.0  # seconds before --wait-indexed gives up
+NDJSON_PROBE_BLOCK = 1 << 12  # bytes read at a time while skipping leading whitespace
+MAX_NDJSON_LINE = 64 << 20  # a longer first line is taken for one-line JSON, not a record
+
+# Don't need OPENAI_APIKEY when connecting to local LM Studio
+headers = {
+    # "X-OpenAI-Api-Key": os.getenv("OPENAI_APIKEY")
+    "X-OpenAI-Api-Key": "NO_KEY_NEEDED_FOR_LM_STUDIO"
+}  # Replace with your OpenAI API key
+
+# WEAVIATE_TARGET=fake points the importers at fake_weaviate.FakeClient;
+# bench_ingest.py uses it to time the pipeline without a server
+TARGET = os.environ.get("WEAVIATE_TARGET", "local")
+
+def connect_local(node=None):
+    # node: (host, http_port, grpc_port), see replication.node_for(); default localhost:8080
+    if TARGET == "fake":
+        import fake_weaviate
+        return fake_weaviate.FakeClient()
+    host, port, grpc_port = node or ("localhost", 8080, 50051)
+    client = weaviate.connect_to_local(
+        host=host,
+        port=port,
+        grpc_port=grpc_port,
+        headers=headers,
+        additional_config=AdditionalConfig(
+            timeout=Timeout(init=30, query=60, insert=120)  # Values in seconds
+        )
+    )
+    assert client.is_live()
+    return client
+
+def check_json_path(path):
+    if not os.path.isfile(path):
+        print(f"Error: The file '{path}' does not exist.")
+        sys.exit(1)
+    if not path.endswith('.json'):
+        print(f"Error: The file '{path}' does not have a .json extension.")
+        sys.exit(1)
+
+def shard_label(path, worker_id=None):
+    if worker_id is None:
+        return path
+    return f"{path}[{worker_id}]"
+
+def compute_shards(path, n):
+    # Split the file into n byte ranges, moving each boundary forward to the
+    # start of the next line so every shard holds whole records.
+    size = os.path.getsize(path)
+    bounds = [0]
+    with open(path, "rb") as f:
+        for i in range(1, n):
+            pos = size * i // n
+            if pos <= bounds[-1]:
+                continue
+            f.seek(pos - 1)
+            f.readline()
+            pos = f.tell()
+            if pos >= size:
+                break
+            if pos > bounds[-1]:
+                bounds.append(pos)
+    bounds.append(size)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+class ShardReader:
+    # File-like wrapper that stops reading at the end of a byte range
+    def __init__(self, f, start, end):
+        self.f = f
+        self.end = end
+        f.seek(start)
+
+    def read(self, n=-1):
+        remaining = self.end - self.f.tell()
+        if remaining <= 0:
+            return b""
+        if n is None or n < 0 or n > remaining:
+            n = remaining
+        return self.f.read(n)
+
+def is_ndjson(path):
+    # One JSON object per line? Arrays and pretty-printed objects need ijson.
+    # The first non-blank byte settles arrays without reading further; only
+    # then is the first line read, at most MAX_NDJSON_LINE bytes of it, so a
+    # minified one-line file isn't pulled into memory just to be rejected.
+    with open(path, "rb") as f:
+        start = 0
+        while True:
+            block = f.read(NDJSON_PROBE_BLOCK)
+            if not block:
+                return False
+            stripped = block.lstrip()
+            if stripped:
+                start += len(block) - len(stripped)
+                break
+            start += len(block)
+        if not stripped.startswith(b"{"):
+            return False
+        f.seek(start)
+        first_line = f.readline(MAX_NDJSON_LINE + 1)
+    if len(first_line) > MAX_NDJSON_LINE:
+        return False
+    try:
+        return isinstance(json.loads(first_line), dict)
+    except ValueError:
+        return False
+
+def resolve_parser(name, path, ndjson=None):
+    # ndjson: is_ndjson(path), if the caller already knows it
+    if name == "orjson" and orjson is None:
+        print("Error: --parser orjson requested but orjson is not installed.")
+        sys.exit(1)
+    if name != "auto":
+        return name
+    if ndjson is None:
+        ndjson = is_ndjson(path)
+    if not ndjson:
+        return "ijson"
+    return "orjson" if orjson is not None else "json"
+
+def describe_parser(name):
+    if name == "ijson":
+        return f"ijson streaming parser ({ijson_backend.backend} backend)"
+    return f"newline-delimited reader with {name}.loads"
+
+def _loads(parser):
+    if parser == "orjson":
+        return orjson.loads
+    return json.loads
+
+def iter_objects(f, start=0, end=None):
+    if end is None:
+        f.seek(start)
+        return ijson_backend.items(f, '', multiple_values=True)
+    return ijson_backend.items(ShardReader(f, start, end), '', multiple_values=True)
+
+def iter_ndjson(f, start=0, end=None, loads=json.loads, block_size=1 << 22):
+    # Reads large blocks, splits them into lines and decodes each line, yielding
+    # the byte offset just past every record so callers can checkpoint on a
+    # record boundary.
+    f.seek(start)
+    offset = start
+    tail = b""
+    while True:
+        want = block_size if end is None else min(block_size, end - offset - len(tail))
+        chunk = f.read(want) if want > 0 else b""
+        if not chunk:
+            if tail.strip():
+                yield offset + len(tail), loads(tail)
+            return
+        lines = (tail + chunk).split(b"\n")
+        tail = lines.pop()
+        for line in lines:
+            offset += len(line) + 1
+            if line.strip():
+                yield offset, loads(line)
+
+def iter_records(f, parser, start=0, end=None):
+    # (offset, object) pairs; the offset is None for the ijson parser, which
+    # can't tell where in the file a record ended.
+    if parser == "ijson":
+        return ((None, obj) for obj in iter_objects(f, start, end))
+    return iter_ndjson(f, start, end, loads=_loads(parser))
+
+def normalized(records, normalize, chunk_size):
+    # Groups (offset, obj) records into chunks so normalize() can work on a
+    # whole chunk at once; yields (offset, obj, normalized_obj)
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= chunk_size:
+            yield from _normalize_chunk(chunk, normalize)
+            chunk = []
+    if chunk:
+        yield from _normalize_chunk(chunk, normalize)
+
+def _normalize_chunk(chunk, normalize):
+    results = normalize([obj for _, obj in chunk])
+    for (offset, obj), result in zip(chunk, results):
+        yield offset, obj, result
+
+def add_parser_argument(parser):
+    parser.add_argument("--parser", choices=PARSERS, default="auto",
+                        help="JSON decoding backend; auto uses a line reader with orjson (or json) for NDJSON and ijson otherwise")
+
+CHECKPOINT_INTERVAL = 10000  # records between durable checkpoints
+
+def checkpoint_path(path, start=0):
+    if start == 0:
+        return f"{path}.checkpoint"
+    return f"{path}.checkpoint.{start}"
+
+class Checkpoint:
+    # Records how far into [start, end) the import has durably got. Shard
+    # layouts are deterministic for a given --workers, so each shard finds its
+    # own file again on --resume.
+    def __init__(self, path, start, end):
+        self.file = checkpoint_path(path, start)
+        self.start = start
+        self.end = end
+        self.offset = start
+        self.acknowledged = 0
+        self.done = False
+
+    def load(self):
+        if not os.path.isfile(self.file):
+            return self
+        with open(self.file) as f:
+            state = json.load(f)
+        if state["start"] != self.start or state["end"] != self.end:
+            print(f"{self.file}: Checkpoint is for a different shard layout, ignoring it")
+            return self
+        self.offset = state["offset"]
+        self.acknowledged = state["acknowledged"]
+        self.done = state["done"]
+        return self
+
+    def save(self, offset, acknowledged, done=False):
+        self.offset = offset
+        self.acknowledged = acknowledged
+        self.done = done
+        tmp = self.file + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"start": self.start, "end": self.end, "offset": offset,
+                       "acknowledged": acknowledged, "done": done}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.file)
+
+def _shard_worker(target, path, args, start, end, worker_id, progress_queue):
+    counter, failed = 0, 0
+    kind = "done"
+    try:
+        counter, failed = target(path, args, start, end, worker_id, progress_queue)
+    except Exception as e:
+        print(f"{shard_label(path, worker_id)}: Exception: {e}")
+        kind = "failed"
+    finally:
+        progress_queue.put((kind, worker_id, counter, failed, None))
+
+def run_sharded(path, args, target, noun, metrics, interval=1000):
+    # Coordinator: one process per shard, each with its own client and batch
+    # context. Workers report ("progress"|"done"|"failed", worker_id, count,
+    # failed, metrics snapshot), which are merged into the coordinator's
+    # metrics. If any shard failed or its process died, the import exits
+    # nonzero once the other shards are finished.
+    shards = compute_shards(path, args.workers)
+    print(f"{path}: Splitting into {len(shards)} shards")
+    ctx = multiprocessing.get_context("spawn")
+    progress_queue = ctx.Queue()
+    procs = []
+    for worker_id, (start, end) in enumerate(shards):
+        p = ctx.Process(target=_shard_worker, args=(target, path, args, start, end, worker_id, progress_queue))
+        p.start()
+        procs.append(p)
+
+    counts = [0] * len(procs)
+    failed = [0] * len(procs)
+    done = set()
+    failed_shards = []
+    last_reported = 0
+    while len(done) < len(procs):
+        try:
+            kind, worker_id, count, failed_count, snapshot = progress_queue.get(timeout=5)
+        except queue.Empty:
+            for worker_id, p in enumerate(procs):
+                if worker_id not in done and p.exitcode not in (None, 0):
+                    print(f"{shard_label(path, worker_id)}: Worker exited with code {p.exitcode}")
+                    done.add(worker_id)
+                    failed_shards.append(worker_id)
+            continue
+        counts[worker_id] = count
+        metrics.absorb(worker_id, snapshot)
+        metrics.export(args)
+        if kind in ("done", "failed"):
+            failed[worker_id] = failed_count
+            done.add(worker_id)
+        if kind == "failed":
+            failed_shards.append(worker_id)
+        total = sum(counts)
+        if total - last_reported >= interval or kind != "progress":
+            last_reported = total
+            print(f"{path}: Imported {total} {noun} ({metrics.rate():.0f}/s, {len(done)}/{len(procs)} shards done)...")
+
+    for p in procs:
+        p.join()
+    if failed_shards:
+        ranges = ", ".join(f"{shard_label(path, w)} bytes {shards[w][0]}-{shards[w][1]}" for w in sorted(failed_shards))
+        print(f"Error: {len(failed_shards)} of {len(procs)} shards failed ({ranges}); "
+              f"{sum(counts)} {noun} were sent before stopping. Re-run, or use --checkpoint/--resume to redo only what is missing.")
+        sys.exit(1)
+    return sum(counts), sum(failed)
+
+def add_wait_indexed_argument(parser):
+    parser.add_argument("--wait-indexed", action="store_true",
+                        help="after importing, wait for the async vector indexing queue to drain and report time-to-queryable")
+    parser.add_argument("--wait-indexed-timeout", type=float, default=DEFAULT_WAIT_INDEXED_TIMEOUT, metavar="SECONDS",
+                        help="stop waiting for indexing after this long")
+
+def wait_indexed(collection_name, metrics, interval=WAIT_INDEXED_INTERVAL, timeout=DEFAULT_WAIT_INDEXED_TIMEOUT):
+    # With ASYNC_INDEXING the batch returns before vectors are in the HNSW
+    # index. Poll the collection's shards until every queue is empty and
+    # every loaded shard is READY; the time from metrics.started to then is
+    # the import's time-to-queryable. Returns None if that can't be told:
+    # no shards, a READONLY shard, or timeout seconds passed.
+    client = connect_local()
+    try:
+        started = time.monotonic()
+        previous = None
+        rate = None
+        while True:
+            shards = count.shards_for(count.shard_stats(client), collection_name)
+            if not shards:
+                print(f"Error: {collection_name}: No shards found, not waiting for indexing")
+                return None
+            queued = count.shard_totals(shards)[1]
+            # Lazily loaded shards haven't been opened since startup and hold
+            # nothing this import wrote, so they don't hold up the wait
+            statuses = {shard["vector_indexing_status"] for shard in shards} - {"LAZY_LOADING"}
+            if "READONLY" in statuses:
+                print(f"{collection_name}: A shard is READONLY (disk full?), not waiting for indexing")
+                return None
+            if queued == 0 and statuses <= {"READY"}:
+                break
+            now = time.monotonic()
+            if now - started >= timeout:
+                print(f"Error: {collection_name}: Indexing still has {queued} vectors queued after {timeout:.0f}s, "
+                      f"giving up (see --wait-indexed-timeout)")
+                return None
+            if previous is not None:
+                drained = (previous[1] - queued) / (now - previous[0])
+                rate = drained if rate is None else 0.7 * rate + 0.3 * drained
+            eta = f"ETA {queued / rate:.0f}s" if rate and rate > 0 else "ETA unknown"
+            print(f"{collection_name}: Waiting for indexing, {queued} vectors queued in {len(shards)} shards "
+                  f"({rate or 0:.0f}/s, {eta})")
+            previous = (now, queued)
+            time.sleep(interval)
+        waited = time.monotonic() - started
+        metrics.add_time("wait_indexed", waited)
+        time_to_queryable = time.monotonic() - metrics.started
+        metrics.set_gauge("time_to_queryable_seconds", time_to_queryable)
+        print(f"{collection_name}: Vector index caught up after {waited:.1f}s; "
+              f"queryable {time_to_queryable:.1f}s after the import started")
+        return time_to_queryable
+    finally:
+        client.close()
@@ -0,0 +1,198 @@
+from collections import defaultdict
+from contextlib import contextmanager
+import http.server
+import json
+import os
+import threading
+import time
+
+EXPORT_INTERVAL = 5.0  # seconds between writes of --metrics-file
+
+# The client keeps the current dynamic batch size private; read it when we can
+BATCH_SIZE_ATTRS = ("_BatchBase__recommended_num_objects", "_BatchBaseSync__recommended_num_objects")
+
+def dynamic_batch_size(batch):
+    for attr in BATCH_SIZE_ATTRS:
+        value = getattr(batch, attr, None)
+        if value is not None:
+            return value
+    return None
+
+class Metrics:
+    # Per-stage timers, counters and gauges for one import run. Worker
+    # processes send snapshot()s to the coordinator, which absorb()s them so
+    # its own snapshot covers the whole run.
+    def __init__(self, name):
+        self.name = name
+        self.started = time.monotonic()
+        self.stage_seconds = defaultdict(float)
+        self.counters = defaultdict(int)
+        self.gauges = {}
+        self.workers = {}
+        self.lock = threading.Lock()
+        self.last_export = 0.0
+        self.server = None
+
+    @contextmanager
+    def timer(self, stage):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(stage, time.perf_counter() - started)
+
+    def add_time(self, stage, seconds):
+        with self.lock:
+            self.stage_seconds[stage] += seconds
+
+    def timed(self, fn, stage):
+        def wrapper(*args, **kwargs):
+            with self.timer(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+
+    def timed_iter(self, iterable, stage):
+        # Charges the time spent producing each item (e.g. parsing) to stage
+        it = iter(iterable)
+        while True:
+            started = time.perf_counter()
+            try:
+                item = next(it)
+            except StopIteration:
+                self.add_time(stage, time.perf_counter() - started)
+                return
+            self.add_time(stage, time.perf_counter() - started)
+            yield item
+
+    def set_counter(self, name, value):
+        with self.lock:
+            self.counters[name] = value
+
+    def set_gauge(self, name, value):
+        if value is None:
+            return
+        with self.lock:
+            self.gauges[name] = value
+
+    def observe(self, objects, batch=None, retries=None, stage=None):
+        # Called at each progress interval by the importers
+        self.set_counter("objects", objects)
+        if batch is not None:
+            self.set_gauge("batch_size", dynamic_batch_size(batch))
+            self.set_gauge("batch_errors", batch.number_errors)
+        if retries is not None:
+            self.set_counter("failed", retries.failed)
+            self.set_counter("retried", retries.retried)
+            self.set_counter("dead_lettered", retries.dead)
+            self.set_gauge("retry_queue_depth", len(retries.heap))
+        if stage is not None:
+            self.set_counter("embedded", stage.embedded)
+            self.set_gauge("embed_pending", len(stage.pending))
+            self.set_gauge("embed_in_flight", len(stage.in_flight))
+            self.set_gauge("embed_chunk_size", stage.limits.batch_size)
+            self.set_gauge("embed_concurrency", stage.limits.concurrency)
+
+    def absorb(self, worker_id, snapshot):
+        if snapshot is not None:
+            with self.lock:
+                self.workers[worker_id] = snapshot
+
+    def snapshot(self):
+        with self.lock:
+            stage_seconds = dict(self.stage_seconds)
+            counters = dict(self.counters)
+            gauges = dict(self.gauges)
+            for worker in self.workers.values():
+                for name, value in worker["stage_seconds"].items():
+                    stage_seconds[name] = stage_seconds.get(name, 0.0) + value
+                for name, value in worker["counters"].items():
+                    counters[name] = counters.get(name, 0) + value
+                for name, value in worker["gauges"].items():
+                    gauges[name] = gauges.get(name, 0) + value
+        elapsed = time.monotonic() - self.started
+        objects = counters.get("objects", 0)
+        return {
+            "name": self.name,
+            "elapsed_seconds": elapsed,
+            "objects_per_second": objects / elapsed if elapsed > 0 else 0.0,
+            "failure_rate": counters.get("failed", 0) / objects if objects else 0.0,
+            "workers": len(self.workers),
+            "stage_seconds": stage_seconds,
+            "counters": counters,
+            "gauges": gauges,
+        }
+
+    def rate(self):
+        return self.snapshot()["objects_per_second"]
+
+    def prometheus(self):
+        snap = self.snapshot()
+        label = f'importer="{self.name}"'
+        lines = [
+            f"ingest_elapsed_seconds{{{label}}} {snap['elapsed_seconds']:.3f}",
+            f"ingest_objects_per_second{{{label}}} {snap['objects_per_second']:.3f}",
+            f"ingest_failure_rate{{{label}}} {snap['failure_rate']:.6f}",
+        ]
+        for stage, seconds in sorted(snap["stage_seconds"].items()):
+            lines.append(f'ingest_stage_seconds_total{{{label},stage="{stage}"}} {seconds:.3f}')
+        for name, value in sorted(snap["counters"].items()):
+            lines.append(f"ingest_{name}_total{{{label}}} {value}")
+        for name, value in sorted(snap["gauges"].items()):
+            lines.append(f"ingest_{name}{{{label}}} {value}")
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port):
+        metrics = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = metrics.prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = http.server.ThreadingHTTPServer(("", port), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        print(f"Serving import metrics on http://localhost:{port}/metrics")
+
+    def export(self, args, force=False):
+        # Rewrites --metrics-file at most every EXPORT_INTERVAL seconds
+        if not getattr(args, "metrics_file", None):
+            return
+        now = time.monotonic()
+        if not force and now - self.last_export < EXPORT_INTERVAL:
+            return
+        self.last_export = now
+        _write_atomic(args.metrics_file, self.prometheus())
+
+    def start(self, args):
+        if getattr(args, "metrics_port", None):
+            self.serve(args.metrics_port)
+
+    def finish(self, args):
+        snap = self.snapshot()
+        stages = ", ".join(f"{stage} {seconds:.1f}s" for stage, seconds in sorted(snap["stage_seconds"].items()))
+        print(f"{self.name}: {snap['counters'].get('objects', 0)} objects in {snap['elapsed_seconds']:.1f}s "
+              f"({snap['objects_per_second']:.0f}/s), failure rate {snap['failure_rate']:.2%}; {stages}")
+        self.export(args, force=True)
+        if getattr(args, "metrics_json", None):
+            _write_atomic(args.metrics_json, json.dumps(snap, indent=2))
+        if self.server is not None:
+            self.server.shutdown()
+
+def _write_atomic(path, text):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+def add_arguments(parser):
+    parser.add_argument("--metrics-json", metavar="PATH", help="write a JSON summary of the run's metrics here at the end")
+    parser.add_argument("--metrics-file", metavar="PATH",
+                        help="keep a Prometheus text-format metrics file updated here while running")
+    parser.add_argument("--metrics-port", type=int, help="serve Prometheus text-format metrics on this port")
@@ -10,15 +10,126 @@ import os
 import zipfile
 from pathlib import Path
 import base64
+from concurrent.futures import ThreadPoolExecutor
+import query_cache
+import image_fetch
+import embedding
+import argparse
 
 headers = {
     "X-OpenAI-Api-Key": "NOT_NEEDED_FOR_LM_STUDIO"
 }  # Replace with your OpenAI API key
 
+# Repeated searches are answered from here; see query_cache.py
+cache = query_cache.QueryCache()
+
+# Set by use_client_vectors(); None leaves query vectorization to the server
+query_embedder = None
+
+def use_client_vectors(base_url=embedding.DEFAULT_EMBED_URL, model=embedding.DEFAULT_EMBED_MODEL):
+    # Embed search strings here through a memo so repeated queries skip the
+    # embedder entirely. The model must be the one the collection was built with.
+    global query_embedder
+    query_embedder = embedding.QueryEmbedder(embedding.Embedder(base_url, model))
+
+def query_vector(search_string):
+    if query_embedder is None:
+        return None
+    return query_embedder.embed(search_string)
+
+def near_text_or_vector(collection, search_string, **kwargs):
+    if query_embedder is None:
+        return collection.query.near_text(query=search_string, **kwargs)
+    return collection.query.near_vector(near_vector=query_vector(search_string), **kwargs)
+
+def cached_query(query_type, collection, text, limit, run, filters=None, return_properties=None):
+    # Client-side vectors come from a specific model, so it's part of the key
+    model = query_embedder.embedder.model if query_embedder is not None else None
+    key = cache.key(collection.name, query_type, text, filters, limit, return_properties, extra=model)
+    return cache.fetch(key, run)
+
+# Several product records can share an ASIN. Vector searches ask the server
+# to group hits by asin; bm25/hybrid over-fetch until they have enough
+# distinct products, doubling the limit up to MAX_DISTINCT_LIMIT.
+DISTINCT_OVERFETCH = 2
+MAX_DISTINCT_LIMIT = 200
+
+def group_by_asin(n):
+    return wq.GroupBy(prop="asin", objects_per_group=1, number_of_groups=n)
+
+def top_of_groups(response):
+    # Best-scoring object of each group; groups come back in rank order
+    return [group.objects[0] for group in response.groups.values()]
+
+def distinct_by_asin(objects, n):
+    seen_asin = set()
+    distinct = []
+    for o in objects:
+        asin = o.properties["asin"]
+        if asin in seen_asin:
+            continue
+        seen_asin.add(asin)
+        distinct.append(o)
+        if len(distinct) == n:
+            break
+    return distinct
+
+def fetch_distinct(run, n):
+    # run(limit) performs the search; returns up to n objects with distinct asins
+    limit = n * DISTINCT_OVERFETCH
+    while True:
+        objects = run(limit).objects
+        distinct = distinct_by_asin(objects, n)
+        if len(distinct) == n or len(objects) < limit or limit >= MAX_DISTINCT_LIMIT:
+            return distinct
+        limit = min(MAX_DISTINCT_LIMIT, limit * 2)
+
+# Range filters on the typed product properties (price_value NUMBER,
+# release_date DATE) that batch_import_products.py derives from the raw
+# price/date text. Passed as filters=, they pre-filter the vector search on
+# the server.
+def _as_datetime(value):
+    if isinstance(value, int):
+        return datetime(value, 1, 1, tzinfo=timezone.utc)
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value
+
+def price_between(low=None, high=None):
+    if low is None and high is None:
+        raise ValueError("price_between needs a low or a high bound")
+    filters = []
+    if low is not None:
+        filters.append(wq.Filter.by_property("price_value").greater_or_equal(low))
+    if high is not None:
+        filters.append(wq.Filter.by_property("price_value").less_or_equal(high))
+    return wq.Filter.all_of(filters)
+
+def price_under(high):
+    return wq.Filter.by_property("price_value").less_than(high)
+
+def released_after(when):
+    # when: a year, an ISO date string or a datetime
+    return wq.Filter.by_property("release_date").greater_than(_as_datetime(when))
+
+def released_between(start, end):
+    return wq.Filter.all_of([
+        wq.Filter.by_property("release_date").greater_or_equal(_as_datetime(start)),
+        wq.Filter.by_property("release_date").less_than(_as_datetime(end)),
+    ])
+
+def rating_at_least(min_rating, min_reviews=1):
+    # Uses the review aggregates batch_import_reviews.py --aggregate writes onto products
+    return wq.Filter.all_of([
+        wq.Filter.by_property("rating_mean").greater_or_equal(min_rating),
+        wq.Filter.by_property("review_count").greater_or_equal(min_reviews),
+    ])
+
 def url_to_base64(url):
-    image_response = requests.get(url)
-    content = image_response.content
-    return base64.b64encode(content).decode("utf-8")
+    # Pooled, disk-cached fetch; url may also be a local file path
+    return image_fetch.image_to_base64(url)
 
 def print_product(response_object):
     print("Product Title: " + response_object.properties["title"])
@@ -28,6 +139,12 @@ def print_product(response_object):
     for c in response_object.properties["category"]:
         print("    " + c)
     print("  Price: " + response_object.properties["price"])
+    review_count = response_object.properties.get("review_count")
+    if review_count:
+        # rating_mean is None when none of the reviews carried a rating
+        rating_mean = response_object.properties.get("rating_mean")
+        rating = f"{rating_mean:.1f}" if rating_mean is not None else "unrated"
+        print(f"  Rating: {rating} from {review_count} reviews")
     print("  Description: ")
     for d in response_object.properties["description"]:
         print("    " + d)
@@ -63,71 +180,91 @@ def image_query(src_img_url):
         )  # Print the distance of the object from the query
 
 def text_query(search_string):
-    response = products.query.near_text(
-        query=search_string,
-        limit=5,
+    objects = cached_query("near_text", products, search_string, 5, lambda: top_of_groups(near_text_or_vector(
+        products, search_string,
+        group_by=group_by_asin(5),
         return_metadata=wq.MetadataQuery(distance=True),
-    )
+    )))
 
-    seen_asin = []
-    for o in response.objects:
-        if o.properties["asin"] in seen_asin:
-            continue
-        seen_asin.append(o.properties["asin"])
+    for o in objects:
         print_product(o)
 
+REVIEW_OVERFETCH = 4  # extra reviews fetched per ASIN so one busy product can't crowd out the rest
+
+def fetch_reviews_by_asin(asins, per_asin=5):
+    # Reviews for many products in one request instead of one per product.
+    # If the shared limit cut the result short, the ASINs that came back with
+    # too few reviews are topped up in a single concurrent wave.
+    asins = list(dict.fromkeys(asins))
+    if not asins:
+        return {}
+    limit = per_asin * len(asins) * REVIEW_OVERFETCH
+    response = reviews.query.fetch_objects(
+        filters=wq.Filter.by_property("asin").contains_any(asins),
+        limit=limit
+    )
+    grouped = {asin: [] for asin in asins}
+    for o in response.objects:
+        group = grouped.get(o.properties["asin"])
+        if group is not None and len(group) < per_asin:
+            group.append(o)
+
+    short = [asin for asin, group in grouped.items() if len(group) < per_asin]
+    if len(response.objects) >= limit and short:
+        def fetch_one(asin):
+            return reviews.query.fetch_objects(
+                filters=wq.Filter.by_property("asin").equal(asin),
+                limit=per_asin
+            ).objects
+        with ThreadPoolExecutor(max_workers=min(8, len(short))) as pool:
+            for asin, objects in zip(short, pool.map(fetch_one, short)):
+                grouped[asin] = objects
+    return grouped
+
 def text_query_with_reviews(search_string):
-    response = products.query.near_text(
-        query=search_string,
-        limit=5,
+    hits = cached_query("near_text", products, search_string, 5, lambda: top_of_groups(near_text_or_vector(
+        products, search_string,
+        group_by=group_by_asin(5),
         return_metadata=wq.MetadataQuery(distance=True),
-    )
+    )))
 
-    seen_asin = []
-    for o in response.objects:
-        if o.properties["asin"] in seen_asin:
-            continue
-        seen_asin.append(o.properties["asin"])
+    reviews_by_asin = fetch_reviews_by_asin([o.properties["asin"] for o in hits], per_asin=5)
+    for o in hits:
         print_product(o)
-        review_response = reviews.query.bm25(
-            query=o.properties["asin"],
-            filters=wq.Filter.by_property("asin").equal(o.properties["asin"]),
-            limit=5
-        )
-        print_reviews(review_response.objects)
+        print_reviews(reviews_by_asin[o.properties["asin"]])
         print("\n")
 
 def keyword_query(keyword):
-    response = products.query.bm25(
-        query=keyword, limit=5, return_metadata=wq.MetadataQuery(score=True)
-    )
+    objects = cached_query("bm25", products, keyword, 5, lambda: fetch_distinct(lambda limit: products.query.bm25(
+        query=keyword, limit=limit, return_metadata=wq.MetadataQuery(score=True)
+    ), 5))
 
-    seen_asin = []
-    for o in response.objects:
-        if o.properties["asin"] in seen_asin:
-            continue
-        seen_asin.append(o.properties["asin"])
+    for o in objects:
+        print_product(o)
 
 def hybrid_query(search_string):
-    response = products.query.hybrid(
-        query=search_string, limit=5, return_metadata=wq.MetadataQuery(score=True)
-    )
+    objects = cached_query("hybrid", products, search_string, 5, lambda: fetch_distinct(lambda limit: products.query.hybrid(
+        query=search_string, vector=query_vector(search_string), limit=limit, return_metadata=wq.MetadataQuery(score=True)
+    ), 5))
 
     # Inspect the response
-    for o in response.objects:
+    for o in objects:
         print_product(o)
 
-def text_query_with_filter(search_string):
-    response = products.query.near_text(
-        query=search_string,
-        limit=5,
+def text_query_with_filter(search_string, filters=None):
+    if filters is None:
+        filters = released_after(2020)
+    return_properties = ["title", "brand", "asin", "category", "price", "description"]
+    objects = cached_query("near_text", products, search_string, 5, lambda: top_of_groups(near_text_or_vector(
+        products, search_string,
+        group_by=group_by_asin(5),
         return_metadata=wq.MetadataQuery(distance=True),
-        filters=wq.Filter.by_property("release_date").greater_than(datetime.fromisoformat('2020-01-01T00:00:00+00:00')),
-        return_properties=["title",  "asin","category", "price", "description"],
-    )
+        filters=filters,
+        return_properties=return_properties,
+    )), filters=filters, return_properties=return_properties)
 
     # Inspect the response
-    for o in response.objects:
+    for o in objects:
         print_product(o)
 
 def text_query_with_filter_translation(search_string, language):
@@ -169,43 +306,58 @@ def text_query_with_filter_common_grouping(search_string):
         )  # Print the distance of the object from the query
     print("What these movies have in common according to the LLM:", response.generated)
 
-try:
-    client = weaviate.connect_to_local(headers=headers)
-    assert client.is_live()
-    metainfo = client.get_meta()
-    # Get the collection
-    products = client.collections.get("product")
-    reviews = client.collections.get("review")
-
-    # Perform query
-    # print("\nRunning an image query based on the ISS")
-    # image_query("https://github.com/weaviate-tutorials/edu-datasets/blob/main/img/International_Space_Station_after_undocking_of_STS-132.jpg?raw=true")
-
-    #print("\nRunning a text query for 'charlie parker'")
-    #text_query("charlie parker")
-    text_query("background music for dinner parties")
-    #text_query("classical trumpet players")
-    #text_query("ethereal and eerie music")
-
-    # print("\nRunning a keyword query for 'history'")
-    #keyword_query("0001393774")
-    #keyword_query("Keith Green")
-    #keyword_query("Trans-Siberian Orchestra")
-    #keyword_query("bebop")
-    #keyword_query("classical trumpet players")
-
-    # print("\nRunning a hybrid query for 'history'")
-    # hybrid_query("history")
-
-    # print("\nRunning a text query with filter for 'dystopian future'")
-    # text_query_with_filter("dystopian future")
-
-    # print("\nRunning a text query with filter for 'dystopian future' and translating the title to French")
-    # text_query_with_filter_translation("dystopian future", "french")
-
-    #print("\nRunning a text query with filter for 'dystopian future' and grouping the results")
-    #text_query_with_filter_common_grouping("dystopian future")
-except Exception as e:
-    print(e)
-finally:  # This will always be executed, even if an exception is raised
-    client.close()  # Close the connection & release resources
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the demo product queries")
+    parser.add_argument("--client-vectors", action="store_true",
+                        help="embed search strings here (memoized) and query by vector instead of near_text")
+    parser.add_argument("--embed-url", default=embedding.DEFAULT_EMBED_URL, help="OpenAI-compatible embedding server")
+    parser.add_argument("--embed-model", default=embedding.DEFAULT_EMBED_MODEL, help="embedding model name")
+    args = parser.parse_args()
+    if args.client_vectors:
+        use_client_vectors(args.embed_url, args.embed_model)
+
+    client = None
+    try:
+        client = weaviate.connect_to_local(headers=headers)
+        assert client.is_live()
+        metainfo = client.get_meta()
+        # Get the collection
+        products = client.collections.get("product")
+        reviews = client.collections.get("review")
+
+        # Perform query
+        # print("\nRunning an image query based on the ISS")
+        # image_query("https://github.com/weaviate-tutorials/edu-datasets/blob/main/img/International_Space_Station_after_undocking_of_STS-132.jpg?raw=true")
+
+        #print("\nRunning a text query for 'charlie parker'")
+        #text_query("charlie parker")
+        text_query("background music for dinner parties")
+        #text_query("classical trumpet players")
+        #text_query("ethereal and eerie music")
+
+        # print("\nRunning a keyword query for 'history'")
+        #keyword_query("0001393774")
+        #keyword_query("Keith Green")
+        #keyword_query("Trans-Siberian Orchestra")
+        #keyword_query("bebop")
+        #keyword_query("classical trumpet players")
+
+        # print("\nRunning a hybrid query for 'history'")
+        # hybrid_query("history")
+
+        # print("\nRunning a text query for 'bebop' under $20 released after 2015")
+        # text_query_with_filter("bebop", price_under(20) & released_after(2015))
+
+        # print("\nRunning a text query with filter for 'dystopian future' and translating the title to French")
+        # text_query_with_filter_translation("dystopian future", "french")
+
+        #print("\nRunning a text query with filter for 'dystopian future' and grouping the results")
+        #text_query_with_filter_common_grouping("dystopian future")
+        print(f"Query cache: {cache.stats()}")
+        if query_embedder is not None:
+            print(f"Query embeddings: {query_embedder.stats()}")
+    except Exception as e:
+        print(e)
+    finally:  # This will always be executed, even if an exception is raised
+        if client is not None:
+            client.close()  # Close the connection & release resources
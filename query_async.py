@@ -0,0 +1,225 @@
+import asyncio
+import sys
+import weaviate
+import weaviate.classes.query as wq
+from weaviate.classes.init import AdditionalConfig, Timeout
+from weaviate.config import ConnectionConfig
+import query
+from query import headers, url_to_base64, print_product, cache, REVIEW_OVERFETCH
+from query import group_by_asin, top_of_groups, distinct_by_asin, DISTINCT_OVERFETCH, MAX_DISTINCT_LIMIT
+
+# Async counterparts of the query.py searches for serving many concurrent
+# searches from one process. Coroutines share pooled async clients, one per
+# node in NODES (see use_nodes()), created on first use and handed out round
+# robin; call close_client() on shutdown.
+
+DEFAULT_CONCURRENCY = 32  # searches gather_queries keeps in flight
+
+NODES = [("localhost", 8080, 50051)]
+consistency_level = None  # e.g. ConsistencyLevel.ONE to read from whichever replica answers first
+
+_clients = []
+_next_client = 0
+_client_lock = None
+
+def use_nodes(nodes, consistency=None):
+    # nodes: [(host, http_port, grpc_port)], see replication.parse_nodes()
+    global NODES, consistency_level
+    NODES = list(nodes)
+    consistency_level = consistency
+
+async def get_client():
+    global _clients, _next_client, _client_lock
+    if _client_lock is None:
+        _client_lock = asyncio.Lock()
+    async with _client_lock:
+        if not _clients:
+            clients = []
+            for host, port, grpc_port in NODES:
+                client = weaviate.use_async_with_local(
+                    host=host,
+                    port=port,
+                    grpc_port=grpc_port,
+                    headers=headers,
+                    additional_config=AdditionalConfig(
+                        connection=ConnectionConfig(session_pool_connections=DEFAULT_CONCURRENCY,
+                                                    session_pool_maxsize=DEFAULT_CONCURRENCY * 4),
+                        timeout=Timeout(init=30, query=60, insert=120)  # Values in seconds
+                    )
+                )
+                await client.connect()
+                clients.append(client)
+            _clients = clients
+        client = _clients[_next_client % len(_clients)]
+        _next_client += 1
+    return client
+
+async def close_client():
+    # The lock belongs to the running event loop; a later asyncio.run() needs a new one
+    global _clients, _client_lock
+    clients, _clients = _clients, []
+    _client_lock = None
+    for client in clients:
+        await client.close()
+
+def _collection(client, name):
+    collection = client.collections.get(name)
+    if consistency_level is None:
+        return collection
+    return collection.with_consistency_level(consistency_level)
+
+async def _products():
+    return _collection(await get_client(), "product")
+
+async def _reviews():
+    return _collection(await get_client(), "review")
+
+async def _query_vector(search_string):
+    # Vector from query.query_embedder's memo (see query.use_client_vectors);
+    # only a miss goes to the embedder, on a worker thread
+    embedder = query.query_embedder
+    if embedder is None:
+        return None
+    vector = embedder.lookup(search_string)
+    if vector is None:
+        vector = await asyncio.to_thread(embedder.embed_missing, search_string)
+    return vector
+
+async def _near_text_or_vector(collection, search_string, **kwargs):
+    vector = await _query_vector(search_string)
+    if vector is None:
+        return await collection.query.near_text(query=search_string, **kwargs)
+    return await collection.query.near_vector(near_vector=vector, **kwargs)
+
+async def _cached(query_type, collection, text, limit, run, filters=None, return_properties=None):
+    # Shares query.cache, so sync and async callers in one process hit the same entries
+    model = query.query_embedder.embedder.model if query.query_embedder is not None else None
+    key = cache.key(collection.name, query_type, text, filters, limit, return_properties, extra=model)
+    objects = cache.get(key)
+    if objects is None:
+        objects = await run()
+        cache.put(key, objects)
+    return objects
+
+async def _fetch_distinct(run, n):
+    # Async twin of query.fetch_distinct
+    limit = n * DISTINCT_OVERFETCH
+    while True:
+        objects = (await run(limit)).objects
+        distinct = distinct_by_asin(objects, n)
+        if len(distinct) == n or len(objects) < limit or limit >= MAX_DISTINCT_LIMIT:
+            return distinct
+        limit = min(MAX_DISTINCT_LIMIT, limit * 2)
+
+async def image_query(src_img_url, limit=5):
+    query_b64 = await asyncio.to_thread(url_to_base64, src_img_url)
+    products = await _products()
+    response = await products.query.near_image(
+        near_image=query_b64,
+        limit=limit,
+        return_metadata=wq.MetadataQuery(distance=True),
+        return_properties=["title", "category", "price", "description"]
+    )
+    return response.objects
+
+async def text_query(search_string, limit=5):
+    # Returns `limit` distinct products
+    products = await _products()
+    async def run():
+        return top_of_groups(await _near_text_or_vector(
+            products, search_string,
+            group_by=group_by_asin(limit),
+            return_metadata=wq.MetadataQuery(distance=True),
+        ))
+    return await _cached("near_text", products, search_string, limit, run)
+
+async def keyword_query(keyword, limit=5):
+    products = await _products()
+    return await _cached("bm25", products, keyword, limit, lambda: _fetch_distinct(lambda n: products.query.bm25(
+        query=keyword, limit=n, return_metadata=wq.MetadataQuery(score=True)
+    ), limit))
+
+async def hybrid_query(search_string, limit=5):
+    products = await _products()
+    async def run():
+        vector = await _query_vector(search_string)
+        return await _fetch_distinct(lambda n: products.query.hybrid(
+            query=search_string, vector=vector, limit=n, return_metadata=wq.MetadataQuery(score=True)
+        ), limit)
+    return await _cached("hybrid", products, search_string, limit, run)
+
+async def text_query_with_filter(search_string, filters, limit=5):
+    products = await _products()
+    return_properties = ["title", "brand", "asin", "category", "price", "description"]
+    async def run():
+        return top_of_groups(await _near_text_or_vector(
+            products, search_string,
+            group_by=group_by_asin(limit),
+            return_metadata=wq.MetadataQuery(distance=True),
+            filters=filters,
+            return_properties=return_properties,
+        ))
+    return await _cached("near_text", products, search_string, limit, run,
+                         filters=filters, return_properties=return_properties)
+
+async def fetch_reviews_by_asin(asins, per_asin=5):
+    # Same batching as query.fetch_reviews_by_asin; the top-up wave for
+    # truncated ASINs runs as concurrent coroutines
+    asins = list(dict.fromkeys(asins))
+    if not asins:
+        return {}
+    reviews = await _reviews()
+    limit = per_asin * len(asins) * REVIEW_OVERFETCH
+    response = await reviews.query.fetch_objects(
+        filters=wq.Filter.by_property("asin").contains_any(asins),
+        limit=limit
+    )
+    grouped = {asin: [] for asin in asins}
+    for o in response.objects:
+        group = grouped.get(o.properties["asin"])
+        if group is not None and len(group) < per_asin:
+            group.append(o)
+
+    short = [asin for asin, group in grouped.items() if len(group) < per_asin]
+    if len(response.objects) >= limit and short:
+        responses = await asyncio.gather(*[
+            reviews.query.fetch_objects(filters=wq.Filter.by_property("asin").equal(asin), limit=per_asin)
+            for asin in short
+        ])
+        for asin, r in zip(short, responses):
+            grouped[asin] = r.objects
+    return grouped
+
+async def text_query_with_reviews(search_string, limit=5, per_asin=5):
+    # Returns [(product, [reviews])] for `limit` distinct products
+    hits = await text_query(search_string, limit=limit)
+    reviews_by_asin = await fetch_reviews_by_asin([o.properties["asin"] for o in hits], per_asin=per_asin)
+    return [(o, reviews_by_asin[o.properties["asin"]]) for o in hits]
+
+async def gather_queries(queries, concurrency=DEFAULT_CONCURRENCY, return_exceptions=True):
+    # Runs (coroutine_function, args...) tuples with at most `concurrency`
+    # in flight; results come back in the same order as the queries
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(query):
+        fn, *args = query
+        async with semaphore:
+            return await fn(*args)
+
+    return await asyncio.gather(*[run(q) for q in queries], return_exceptions=return_exceptions)
+
+async def main(search_strings):
+    try:
+        results = await gather_queries([(text_query, s) for s in search_strings])
+        for search_string, objects in zip(search_strings, results):
+            print(f"\nResults for '{search_string}':")
+            if isinstance(objects, Exception):
+                print(f"  Error: {objects}")
+                continue
+            for o in objects:
+                print_product(o)
+    finally:
+        await close_client()
+
+if __name__ == "__main__":
+    asyncio.run(main(sys.argv[1:] or ["charlie parker", "background music for dinner parties", "bebop"]))
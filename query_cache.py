@@ -0,0 +1,157 @@
+from collections import OrderedDict
+import json
+import os
+import threading
+import time
+
+# Result cache for the query.py searches. Our traffic repeats the same few
+# near_text/bm25/hybrid queries, so identical requests are answered from
+# memory until they expire, fall out of the LRU, or an importer marks the
+# collection as changed.
+
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_TTL = 300.0  # seconds
+DEFAULT_MAX_BYTES = 64 << 20
+# Importers touch <dir>/<collection>.stamp when they finish writing; caches
+# in other processes compare its mtime to the one they last saw. The default
+# sits next to this module, so importers and query processes started from
+# different working directories still share it.
+STAMP_DIR = os.environ.get("QUERY_CACHE_DIR",
+                           os.path.join(os.path.dirname(os.path.abspath(__file__)), ".query_cache"))
+STAMP_CHECK_INTERVAL = 1.0  # seconds between stat() calls per collection
+ENTRY_OVERHEAD = 256  # rough bytes per cached object beyond its properties
+
+def stamp_path(collection, stamp_dir=STAMP_DIR):
+    return os.path.join(stamp_dir, f"{collection.lower()}.stamp")
+
+def mark_changed(collection, stamp_dir=STAMP_DIR):
+    # Called by the importers after a run so every process' cache drops the
+    # collection's results on its next lookup
+    os.makedirs(stamp_dir, exist_ok=True)
+    path = stamp_path(collection, stamp_dir)
+    with open(path, "a"):
+        pass
+    os.utime(path)
+
+def _stamp_mtime(collection, stamp_dir):
+    try:
+        return os.stat(stamp_path(collection, stamp_dir)).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+def estimate_size(objects):
+    size = 0
+    for o in objects:
+        size += ENTRY_OVERHEAD + len(json.dumps(o.properties, default=str))
+    return size
+
+def filter_key(filters):
+    # And/Or/Not filters have no useful repr (it includes the object's
+    # address), so walk the tree; leaf _FilterValues are dataclasses whose
+    # repr spells out target, operator and value
+    if filters is None:
+        return None
+    children = getattr(filters, "filters", None)
+    if isinstance(children, list):
+        return (filters.operator.value, tuple(filter_key(f) for f in children))
+    return repr(filters)
+
+class QueryCache:
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_BYTES,
+                 stamp_dir=STAMP_DIR):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.stamp_dir = stamp_dir
+        self.entries = OrderedDict()  # key -> (expires, size, objects)
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.stamps = {}  # collection -> (mtime seen, last checked)
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def key(collection, query_type, text, filters=None, limit=None, return_properties=None, extra=None):
+        props = tuple(return_properties) if return_properties is not None else None
+        return (collection.lower(), query_type, text, filter_key(filters), limit, props, extra)
+
+    def _check_stamp(self, collection):
+        now = time.monotonic()
+        seen = self.stamps.get(collection)
+        if seen is not None and now - seen[1] < STAMP_CHECK_INTERVAL:
+            return
+        mtime = _stamp_mtime(collection, self.stamp_dir)
+        if seen is not None and mtime != seen[0]:
+            self._drop(collection)
+        self.stamps[collection] = (mtime, now)
+
+    def _remove(self, key):
+        _, size, _ = self.entries.pop(key)
+        self.bytes -= size
+
+    def _drop(self, collection):
+        for key in [k for k in self.entries if k[0] == collection]:
+            self._remove(key)
+        self.invalidations += 1
+
+    def get(self, key):
+        with self.lock:
+            self._check_stamp(key[0])
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] <= time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def put(self, key, objects):
+        if self.max_entries <= 0:
+            return  # caching disabled
+        size = estimate_size(objects)
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            if key in self.entries:
+                self._remove(key)
+            self.entries[key] = (time.monotonic() + self.ttl, size, objects)
+            self.bytes += size
+            while len(self.entries) > self.max_entries or self.bytes > self.max_bytes:
+                self._remove(next(iter(self.entries)))
+                self.evictions += 1
+
+    def fetch(self, key, run):
+        # Returns the cached objects for key, or calls run() and caches its result
+        objects = self.get(key)
+        if objects is None:
+            objects = run()
+            self.put(key, objects)
+        return objects
+
+    def invalidate(self, collection=None):
+        with self.lock:
+            if collection is None:
+                self.entries.clear()
+                self.bytes = 0
+                self.invalidations += 1
+            else:
+                self._drop(collection.lower())
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "bytes": self.bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
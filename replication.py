@@ -0,0 +1,72 @@
+import sys
+import weaviate.classes.config as wc
+
+# Sharding, replication and node selection for running against the
+# three-node cluster in docker-compose.yml (docker compose --profile cluster
+# up). Shard count and replication factor only apply when a collection is
+# created; the consistency level applies to every write (and, in
+# query_async, read) made through the collection handle. --nodes spreads
+# import workers and async query clients across the nodes, so the
+# coordinating work isn't all on node1.
+
+CONSISTENCY_LEVELS = ("ONE", "QUORUM", "ALL")
+DEFAULT_NODES = "localhost:8080:50051"
+CLUSTER_NODES = "localhost:8080:50051,localhost:8081:50052,localhost:8082:50053"  # the compose cluster profile
+
+def add_arguments(parser):
+    parser.add_argument("--shards", type=int,
+                        help="shards for a newly created collection (default: one per node)")
+    parser.add_argument("--replication-factor", type=int,
+                        help="copies of each shard for a newly created collection (default: 1)")
+    parser.add_argument("--async-replication", action="store_true",
+                        help="let replicas repair themselves in the background (with --replication-factor > 1)")
+    parser.add_argument("--consistency", choices=CONSISTENCY_LEVELS, type=str.upper,
+                        help="replicas that must acknowledge each write (default: the server's, QUORUM)")
+    add_nodes_argument(parser)
+
+def add_nodes_argument(parser):
+    parser.add_argument("--nodes", default=DEFAULT_NODES,
+                        help="comma-separated host:http_port:grpc_port of the nodes to connect to, round robin; "
+                             f"'cluster' for {CLUSTER_NODES}")
+
+def parse_nodes(text):
+    if text == "cluster":
+        text = CLUSTER_NODES
+    nodes = []
+    for entry in text.split(","):
+        host, http_port, grpc_port = entry.strip().rsplit(":", 2)
+        nodes.append((host, int(http_port), int(grpc_port)))
+    return nodes
+
+def node_for(args, worker_id=None):
+    # Worker i of a sharded import talks to node i mod len(nodes)
+    nodes = parse_nodes(getattr(args, "nodes", DEFAULT_NODES))
+    return nodes[(worker_id or 0) % len(nodes)]
+
+def sharding_config(args):
+    if args.shards is None:
+        return None
+    return wc.Configure.sharding(desired_count=args.shards)
+
+def replication_config(args):
+    if args.replication_factor is None and not args.async_replication:
+        return None
+    return wc.Configure.replication(factor=args.replication_factor, async_enabled=args.async_replication or None)
+
+def consistency_level(args):
+    level = getattr(args, "consistency", None)
+    return wc.ConsistencyLevel(level) if level else None
+
+def with_consistency(collection, args):
+    level = consistency_level(args)
+    return collection if level is None else collection.with_consistency_level(level)
+
+def check_cluster(client, args):
+    # Fail before importing anything if the cluster can't hold the replicas
+    if not args.replication_factor:
+        return
+    nodes = client.cluster.nodes()
+    if args.replication_factor > len(nodes):
+        print(f"Error: --replication-factor {args.replication_factor} needs at least that many nodes, "
+              f"the cluster has {len(nodes)}.")
+        sys.exit(1)
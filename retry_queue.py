@@ -0,0 +1,159 @@
+import heapq
+import itertools
+import json
+import random
+import re
+import time
+
+DEFAULT_MAX_ATTEMPTS = 5
+DEFAULT_BASE_DELAY = 1.0  # seconds before the first retry
+DEFAULT_MAX_DELAY = 60.0
+
+# Weaviate validation errors that retrying cannot fix: the object itself is
+# bad, so it goes straight to the dead-letter file. Anything else (timeouts,
+# 429s, 5xx, vectorizer/embedder outages such as "invalid response from
+# ...") is retried, so these stay specific to the schema/object checks.
+PERMANENT_ERROR_MARKERS = (
+    "invalid object",
+    "invalid uuid",
+    "invalid id",
+    "no such prop",
+    "must be of type uuid",
+    "vector lengths don't match",
+    "could not be parsed",
+    "unprocessable entity",
+)
+# "invalid text property 'title' on class 'Product': not a string, ..."
+INVALID_PROPERTY_RE = re.compile(r"invalid (?:[a-z\[\]]+ ){1,2}property")
+
+def is_permanent(message):
+    message = (message or "").lower()
+    return any(marker in message for marker in PERMANENT_ERROR_MARKERS) or INVALID_PROPERTY_RE.search(message) is not None
+
+class RetryQueue:
+    # Failed batch objects wait here with exponential backoff and jitter,
+    # keyed by uuid so each object carries its own attempt count. poll() is
+    # called from the import loop and puts due objects back into the live
+    # batch; drain() finishes whatever is left after the main stream.
+    def __init__(self, label, dead_letter_path, max_attempts=DEFAULT_MAX_ATTEMPTS,
+                 base_delay=DEFAULT_BASE_DELAY, max_delay=DEFAULT_MAX_DELAY):
+        self.label = label
+        self.dead_letter_path = dead_letter_path
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.heap = []
+        self.seq = itertools.count()
+        self.attempts = {}
+        self.seen = 0
+        self.failed = 0
+        self.retried = 0
+        self.dead = 0
+        self.dead_file = None
+        # Called with the properties of every dead-lettered object, for
+        # bookkeeping that counted it when it was first sent
+        self.on_dead_letter = None
+
+    def reset(self):
+        # A new batch context starts a new failed_objects list
+        self.seen = 0
+
+    def collect(self, failed_objects):
+        new = failed_objects[self.seen:]
+        self.seen += len(new)
+        for failed in new:
+            obj = failed.object_
+            key = str(obj.uuid)
+            attempts = self.attempts.get(key, 0) + 1
+            self.attempts[key] = attempts
+            self.failed += 1
+            if is_permanent(failed.message):
+                self.dead_letter(obj, attempts, failed.message, "permanent")
+            elif attempts >= self.max_attempts:
+                self.dead_letter(obj, attempts, failed.message, "max attempts")
+            else:
+                delay = min(self.max_delay, self.base_delay * 2 ** (attempts - 1)) * random.uniform(0.5, 1.0)
+                heapq.heappush(self.heap, (time.monotonic() + delay, next(self.seq), obj))
+
+    def requeue_ready(self, batch):
+        now = time.monotonic()
+        count = 0
+        while self.heap and self.heap[0][0] <= now:
+            _, _, obj = heapq.heappop(self.heap)
+            batch.add_object(properties=obj.properties, uuid=obj.uuid, vector=obj.vector)
+            count += 1
+        self.retried += count
+        return count
+
+    def poll(self, batch, failed_objects):
+        self.collect(failed_objects)
+        return self.requeue_ready(batch)
+
+    def settle(self, batch, failed_objects):
+        # Retries everything pending through the live batch until each failed
+        # object has either gone through or been dead-lettered. Called before
+        # a checkpoint is saved, since the heap only lives in memory.
+        self.collect(failed_objects)
+        while self.heap:
+            wait = self.heap[0][0] - time.monotonic()
+            if wait > 0:
+                print(f"{self.label}: Settling {len(self.heap)} retries before checkpointing, next in {wait:.1f}s")
+                time.sleep(wait)
+            self.requeue_ready(batch)
+            batch.flush()
+            self.collect(failed_objects)
+
+    def drain(self, collection):
+        self.collect(collection.batch.failed_objects)
+        while self.heap:
+            wait = self.heap[0][0] - time.monotonic()
+            if wait > 0:
+                print(f"{self.label}: {len(self.heap)} objects waiting to be retried, next in {wait:.1f}s")
+                time.sleep(wait)
+            self.reset()
+            with collection.batch.dynamic() as batch:
+                count = self.requeue_ready(batch)
+            print(f"{self.label}: Retried {count} objects")
+            self.collect(collection.batch.failed_objects)
+        self.close()
+
+    def dead_letter(self, obj, attempts, message, reason):
+        if self.dead_file is None:
+            self.dead_file = open(self.dead_letter_path, "a")
+        record = {
+            "uuid": str(obj.uuid),
+            "reason": reason,
+            "attempts": attempts,
+            "error": message,
+            "properties": obj.properties,
+        }
+        self.dead_file.write(json.dumps(record, default=str) + "\n")
+        self.dead_file.flush()
+        self.dead += 1
+        if self.on_dead_letter is not None:
+            self.on_dead_letter(obj.properties)
+
+    def close(self):
+        if self.dead_file is not None:
+            self.dead_file.close()
+            self.dead_file = None
+
+def dead_letter_path(path, worker_id=None):
+    if worker_id is None:
+        return f"{path}.deadletter.ndjson"
+    return f"{path}.deadletter.{worker_id}.ndjson"
+
+def add_arguments(parser):
+    parser.add_argument("--max-attempts", type=int, default=DEFAULT_MAX_ATTEMPTS,
+                        help="times an object is tried before it is written to the dead-letter file")
+    parser.add_argument("--dead-letter", metavar="PATH",
+                        help="NDJSON file for objects that could not be imported (default: <input>.deadletter.ndjson)")
+
+def queue_from_args(args, label, path, worker_id=None):
+    if args.dead_letter is None:
+        dead_path = dead_letter_path(path, worker_id)
+    elif worker_id is None:
+        dead_path = args.dead_letter
+    else:
+        dead_path = f"{args.dead_letter}.{worker_id}"
+    return RetryQueue(label, dead_path, max_attempts=args.max_attempts)
@@ -0,0 +1,178 @@
+import csv
+import glob
+import heapq
+import os
+import numpy as np
+import weaviate.classes.query as wq
+import dates
+
+# Per-ASIN review aggregates collected while batch_import_reviews.py runs and
+# written onto the matching product objects afterwards, so searches can sort
+# and filter on rating without touching the review collection.
+#
+# Each importer process keeps a table keyed by ASIN with parallel numpy
+# columns. When it outgrows max_entries it is written out as a spill file
+# sorted by ASIN, and at the end every process' spill files from this run
+# are merged in one streaming pass.
+#
+# The aggregates describe only the reviews read in this run and replace
+# whatever the products held before, so they are right only for a full
+# reload: one run over a file holding every review.
+
+DEFAULT_MAX_ENTRIES = 1 << 20  # ASINs held in memory per process before spilling
+PRODUCT_FETCH_CHUNK = 500  # ASINs per product lookup
+PRODUCT_FETCH_LIMIT = 10000  # Weaviate's default QUERY_MAXIMUM_RESULTS
+
+class ReviewAggregates:
+    def __init__(self, spill_dir, run, worker, max_entries=DEFAULT_MAX_ENTRIES):
+        # Spill files are named <run>.<worker>.<n>.tsv, so merge() only reads
+        # this run's files even if the directory is reused
+        self.spill_dir = spill_dir
+        self.prefix = f"{run}.{worker}"
+        self.max_entries = max_entries
+        self.spills = 0
+        self._reset()
+
+    def _reset(self):
+        self.slots = {}
+        size = min(self.max_entries, 1 << 16)
+        self.count = np.zeros(size, dtype=np.int64)
+        self.rated = np.zeros(size, dtype=np.int64)
+        self.overall_sum = np.zeros(size, dtype=np.float64)
+        self.verified = np.zeros(size, dtype=np.int64)
+        self.latest = np.full(size, -1, dtype=np.int64)
+
+    def _grow(self):
+        for name in ("count", "rated", "overall_sum", "verified"):
+            column = getattr(self, name)
+            setattr(self, name, np.concatenate([column, np.zeros(len(column), dtype=column.dtype)]))
+        self.latest = np.concatenate([self.latest, np.full(len(self.latest), -1, dtype=np.int64)])
+
+    def add(self, review_obj):
+        self._update(review_obj, 1)
+
+    def remove(self, review_obj):
+        # Takes back a review that was added but then dead-lettered. The
+        # latest date can't be undone, so it may still count such a review.
+        self._update(review_obj, -1)
+
+    def _update(self, review_obj, sign):
+        asin = review_obj.get("asin")
+        if asin is None:
+            return
+        slot = self.slots.get(asin)
+        if slot is None:
+            if len(self.slots) >= self.max_entries:
+                self.spill()
+            slot = self.slots[asin] = len(self.slots)
+            if slot == len(self.count):
+                self._grow()
+        self.count[slot] += sign
+        overall = review_obj.get("overall")
+        if overall is not None:
+            self.rated[slot] += sign
+            self.overall_sum[slot] += sign * overall
+        if review_obj.get("verified"):
+            self.verified[slot] += sign
+        t = review_obj.get("unixReviewTime")
+        if sign > 0 and t is not None and t > self.latest[slot]:
+            self.latest[slot] = t
+
+    def spill(self):
+        if not self.slots:
+            return
+        path = os.path.join(self.spill_dir, f"{self.prefix}.{self.spills}.tsv")
+        self.spills += 1
+        # csv quotes an ASIN holding a tab, quote or newline
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f, delimiter="\t", lineterminator="\n")
+            for asin in sorted(self.slots):
+                s = self.slots[asin]
+                writer.writerow([asin, int(self.count[s]), int(self.rated[s]), repr(float(self.overall_sum[s])),
+                                 int(self.verified[s]), int(self.latest[s])])
+        self._reset()
+
+    def close(self):
+        # Everything ends up in spill files, which merge() reads
+        self.spill()
+
+def _read_spill(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        for asin, count, rated, overall_sum, verified, latest in csv.reader(f, delimiter="\t"):
+            yield asin, int(count), int(rated), float(overall_sum), int(verified), int(latest)
+
+def merge(spill_dir, run):
+    # Yields (asin, product properties) in ASIN order across the run's spill
+    # files. Rows can hold negative counts from remove(); they add up.
+    files = sorted(glob.glob(os.path.join(spill_dir, f"{glob.escape(run)}.*.tsv")))
+    current = None
+    for row in heapq.merge(*[_read_spill(p) for p in files]):
+        if current is not None and row[0] == current[0]:
+            current = [current[0], current[1] + row[1], current[2] + row[2], current[3] + row[3],
+                       current[4] + row[4], max(current[5], row[5])]
+            continue
+        if current is not None and current[1] > 0:
+            yield current[0], _properties(current)
+        current = list(row)
+    # An ASIN whose reviews were all dead-lettered is left alone, as if unreviewed
+    if current is not None and current[1] > 0:
+        yield current[0], _properties(current)
+
+def _properties(row):
+    _, count, rated, overall_sum, verified, latest = row
+    return {
+        "review_count": count,
+        "rating_mean": overall_sum / rated if rated else None,
+        "verified_share": verified / count if count else None,
+        "latest_review_date": dates.unix_to_iso([latest])[0] if latest >= 0 else None,
+    }
+
+def _fetch_products(products, asins):
+    response = products.query.fetch_objects(
+        filters=wq.Filter.by_property("asin").contains_any(asins),
+        limit=PRODUCT_FETCH_LIMIT,
+        include_vector=True,
+    )
+    if len(response.objects) >= PRODUCT_FETCH_LIMIT and len(asins) > 1:
+        # Possibly truncated; split the ASINs and ask again
+        half = len(asins) // 2
+        return _fetch_products(products, asins[:half]) + _fetch_products(products, asins[half:])
+    return response.objects
+
+def apply(client, spill_dir, run, collection_name="product", consistency_level=None):
+    # Writes the merged aggregates onto every product object with a matching
+    # ASIN. Weaviate's batch replaces whole objects, so each product is read
+    # back with its vector and re-sent with the aggregate properties merged
+    # in: PRODUCT_FETCH_CHUNK products per read, no re-vectorization.
+    products = client.collections.get(collection_name)
+    if consistency_level is not None:
+        products = products.with_consistency_level(consistency_level)
+    updated = 0
+    missing = 0
+
+    def flush(chunk, batch):
+        nonlocal updated, missing
+        found = set()
+        for o in _fetch_products(products, list(chunk)):
+            asin = o.properties["asin"]
+            found.add(asin)
+            properties = dict(o.properties)
+            properties.update(chunk[asin])
+            vector = o.vector.get("default") if o.vector else None
+            batch.add_object(properties=properties, uuid=o.uuid, vector=vector)
+            updated += 1
+        missing += len(chunk) - len(found)
+
+    with products.batch.dynamic() as batch:
+        chunk = {}
+        for asin, properties in merge(spill_dir, run):
+            chunk[asin] = properties
+            if len(chunk) == PRODUCT_FETCH_CHUNK:
+                flush(chunk, batch)
+                chunk = {}
+        if chunk:
+            flush(chunk, batch)
+    failed = len(products.batch.failed_objects)
+    print(f"{collection_name}: Wrote review aggregates to {updated - failed} products "
+          f"({failed} failed, {missing} reviewed ASINs have no product)")
+    return updated - failed
@@ -1,128 +1,235 @@
-import weaviate
-import weaviate.classes.config as wc
-from weaviate.classes.init import AdditionalConfig, Timeout
-from weaviate.util import generate_uuid5
-import requests
-from datetime import datetime, timezone
+import weaviate.classes as wvc
+from weaviate.exceptions import WeaviateInsertManyAllFailedError
 import json as json
-from tqdm import tqdm
 import os
-import zipfile
-from pathlib import Path
-import base64
-import ijson
-import sys
-
-if len(sys.argv) > 1:
-    LOCAL_JSON_PATH = sys.argv[1]
-else:
-    print("Error: No file path provided.")
-    print(f"Usage: python {sys.argv[0]} <path_to_json_file>")
-    sys.exit(1)
-if not os.path.isfile(LOCAL_JSON_PATH):
-    print(f"Error: The file '{LOCAL_JSON_PATH}' does not exist.")
-    sys.exit(1)
-if not LOCAL_JSON_PATH.endswith('.json'):
-    print(f"Error: The file '{LOCAL_JSON_PATH}' does not have a .json extension.")
-    sys.exit(1)
-
-# Don't need OPENAI_APIKEY when connecting to local LM Studio
-headers = {
-    # "X-OpenAI-Api-Key": os.getenv("OPENAI_APIKEY")
-    "X-OpenAI-Api-Key": "NO_KEY_NEEDED_FOR_LM_STUDIO"
-}  # Replace with your OpenAI API key
-
-client = None
-
-try:
-    client = weaviate.connect_to_local(
-        headers=headers,     
-        additional_config=AdditionalConfig(
-            timeout=Timeout(init=30, query=60, insert=120)  # Values in seconds
-        )
-    )
-    assert client.is_live()
-    metainfo = client.get_meta()
-    #print(json.dumps(metainfo, indent=2))  # Print the meta information in a readable format
-    if client.collections.exists("review"):
-        print("Dropping existing review collection")
-        client.collections.delete("review")
-    
-    if not client.collections.exists("review"):
-        print("Before Create review collection")
-        client.collections.create(
-            name = "review",
-            properties = [
-                wc.Property(name="overall", data_type=wc.DataType.NUMBER),
-                wc.Property(name="verified", data_type=wc.DataType.BOOL, skip_vectorization=True),
-                wc.Property(name="reviewerID", data_type=wc.DataType.TEXT, skip_vectorization=True),
-                wc.Property(name="asin", data_type=wc.DataType.TEXT, skip_vectorization=True),
-                #wc.Property(name="style", data_type=wc.DataType.OBJECT, skip_vectorization=True),
-                wc.Property(name="reviewerName", data_type=wc.DataType.TEXT, skip_vectorization=True),
-                wc.Property(name="reviewText", data_type=wc.DataType.TEXT),
-                wc.Property(name="summary", data_type=wc.DataType.TEXT),
-                wc.Property(name="unixReviewTime", data_type=wc.DataType.NUMBER, skip_vectorization=True),
-                wc.Property(name="unixReviewDate", data_type=wc.DataType.DATE, skip_vectorization=True),
-                wc.Property(name="reviewTime", data_type=wc.DataType.TEXT, skip_vectorization=True),
-                wc.Property(name="image", data_type=wc.DataType.TEXT_ARRAY, skip_vectorization=True),
-            ],
-            # references=[
-            #     wc.ReferenceProperty(
-            #         name="asin",
-            #         target_collection="product"
-            #     )
-            # ],
-            vectorizer_config = wc.Configure.Vectorizer.text2vec_openai(
-                base_url="http://host.docker.internal:1234"
-            ),
-            generative_config = wc.Configure.Generative.openai(
-                base_url="http://host.docker.internal:1234"
-            )
-        )
-        print("After Create review collection")
+import glob
+import time
+import argparse
+from types import SimpleNamespace
+import import_common
+import retry_queue
+import ingest_metrics
+import query_cache
+from batch_import_reviews import create_review_collection, normalize_reviews, review_uuid
 
+# Incremental ingester for the trickle of new reviews: follows a
+# newline-delimited JSON file (or every *.json file in a directory), groups
+# new records into micro-batches and upserts them with insert_many under
+# deterministic UUIDs, so re-reading a record overwrites instead of duplicating.
+
+DEFAULT_COLLECTION = "review"
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_MAX_WAIT = 2.0  # seconds a record may wait for its micro-batch to fill
+DEFAULT_POLL_INTERVAL = 1.0
+READ_BLOCK = 1 << 22
+
+class TailSource:
+    # Reads complete lines appended since the last poll. read_offsets is how
+    # far we've parsed; committed is how far has been upserted and is what
+    # the state file records, so a restart re-reads at most one micro-batch.
+    def __init__(self, path, state_path):
+        self.path = path
+        self.state_path = state_path
+        self.committed = {}
+        if os.path.isfile(state_path):
+            with open(state_path) as f:
+                self.committed = json.load(f)
+        self.read_offsets = dict(self.committed)
+
+    def files(self):
+        if os.path.isdir(self.path):
+            return sorted(glob.glob(os.path.join(self.path, "*.json")))
+        return [self.path]
+
+    def poll(self, retries):
+        # Yields (file, offset, obj); a line that isn't valid JSON is
+        # dead-lettered and comes back with obj None, so its offset is
+        # still committed with the micro-batch and it isn't read again
+        records = []
+        for file in self.files():
+            offset = self.read_offsets.get(file, 0)
+            size = os.path.getsize(file)
+            if size < offset:
+                print(f"{file}: File shrank, reading it again from the start")
+                offset = 0
+            if size == offset:
+                continue
+            with open(file, "rb") as f:
+                f.seek(offset)
+                data = f.read(min(size - offset, READ_BLOCK))
+                # A line longer than READ_BLOCK: keep reading until it ends
+                while b"\n" not in data and offset + len(data) < size:
+                    data += f.read(min(size - offset - len(data), READ_BLOCK))
+            # Leave a partially written last line for the next poll
+            end = data.rfind(b"\n")
+            if end < 0:
+                continue
+            for line in data[:end + 1].split(b"\n")[:-1]:
+                offset += len(line) + 1
+                if not line.strip():
+                    continue
+                try:
+                    obj = json.loads(line)
+                except ValueError as e:
+                    retries.dead_letter(SimpleNamespace(uuid=f"{file}:{offset - len(line) - 1}",
+                                                        properties=line.decode("utf-8", "replace")),
+                                        1, str(e), "malformed")
+                    obj = None
+                records.append((file, offset, obj))
+            self.read_offsets[file] = offset
+        return records
+
+    def commit(self, offsets):
+        self.committed.update(offsets)
+        tmp = self.state_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.committed, f)
+        os.replace(tmp, self.state_path)
+
+class InsertManyBatch:
+    # Gives RetryQueue a batch-like front end over insert_many, so failed
+    # objects are classified, backed off, capped at --max-attempts and
+    # dead-lettered the same way as in the batch importers. A call that
+    # raises counts as a failed attempt for every object in it.
+    def __init__(self, collection, retries, metrics):
+        self.collection = collection
+        self.retries = retries
+        self.metrics = metrics
+        self.objects = []
+        self.failed_objects = []
+
+    def add_object(self, properties=None, uuid=None, vector=None):
+        self.objects.append(wvc.data.DataObject(properties=properties, uuid=uuid, vector=vector))
+
+    def flush(self):
+        if not self.objects:
+            return
+        data, self.objects = self.objects, []
+        self._send(data)
+
+    def _send(self, data):
+        started = time.monotonic()
+        try:
+            response = self.collection.data.insert_many(data)
+        except WeaviateInsertManyAllFailedError as e:
+            if len(data) > 1:
+                # The error lists the messages but not which object each belongs
+                # to; send the objects one at a time to tell them apart
+                for obj in data:
+                    self._send([obj])
+                return
+            self._fail(data, str(e))
+            return
+        except Exception as e:
+            # Nothing was written (connection lost, timeout)
+            print(f"{self.retries.label}: insert_many failed ({e}), retrying {len(data)} reviews")
+            self._fail(data, str(e))
+            return
+        latency = time.monotonic() - started
+        self.metrics.add_time("send", latency)
+        self.metrics.set_gauge("last_batch_latency_seconds", latency)
+        self.metrics.set_gauge("last_batch_size", len(data))
+        for index, error in response.errors.items():
+            self.failed_objects.append(SimpleNamespace(object_=data[index], message=error.message))
+
+    def _fail(self, data, message):
+        for obj in data:
+            self.failed_objects.append(SimpleNamespace(object_=obj, message=message))
+
+def upsert(reviews, records, retries, source, metrics):
+    valid = [(file, offset, obj) for file, offset, obj in records if obj is not None]
+    with metrics.timer("normalize"):
+        objs = normalize_reviews([obj for _, _, obj in valid])
+    started = time.monotonic()
+    dead_before = retries.dead
+    batch = InsertManyBatch(reviews, retries, metrics)
+    for (_, _, obj), review_obj in zip(valid, objs):
+        batch.add_object(properties=review_obj, uuid=review_uuid(obj))
+    batch.flush()
+    # Transient errors are retried here, before the offsets move past them
+    retries.reset()
+    retries.settle(batch, batch.failed_objects)
+    latency = time.monotonic() - started
+    offsets = {}
+    for file, offset, _ in records:
+        offsets[file] = offset
+    source.commit(offsets)
+    query_cache.mark_changed(reviews.name)
+    failed = len(records) - len(valid) + retries.dead - dead_before
+    print(f"Upserted {len(records) - failed} reviews in {latency * 1000:.0f} ms ({failed} failed)")
+    return len(records) - failed
+
+def run(client, args):
+    create_review_collection(client, args.collection)
+    reviews = client.collections.get(args.collection)
+    source = TailSource(args.path, args.state or f"{args.path.rstrip(os.sep)}.offsets.json")
+    retries = retry_queue.RetryQueue(args.path, args.dead_letter or retry_queue.dead_letter_path(args.path.rstrip(os.sep)),
+                                     max_attempts=args.max_attempts)
+    metrics = ingest_metrics.Metrics("reviews-incremental")
+    metrics.start(args)
+    pending = []
+    oldest = None
     counter = 0
-    interval = 100  # print progress every this many records; should be bigger than the batch_size
-
-    # Get the collection
-    reviews = client.collections.get("review")
-
-    # Enter context manager
-    print("opening ", LOCAL_JSON_PATH)
-    with open(LOCAL_JSON_PATH, "rb") as f:
-        print("about to call parse")
-        objects = ijson.items(f, '', multiple_values=True)
-        print("after calling parse")
-        for obj in objects:
-            #print("category: ", obj["category"])
-            review_obj = {
-                "overall": float(obj["overall"]),
-                "verified": obj["verified"],
-                "reviewerID": obj["reviewerID"],
-                "asin": obj["asin"],
-                #"style": obj["style"],
-                "reviewerName": obj["reviewerName"],
-                "reviewText": obj["reviewText"],
-                "summary": obj["summary"],
-                "unixReviewTime": obj["unixReviewTime"],
-                "reviewTime": obj["reviewTime"],
-            }
-            review_obj["unixReviewDate"] = datetime.fromtimestamp(obj["unixReviewTime"], timezone.utc).strftime("%Y-%m-%dT%H:%M:%S+00:00")
-            if "image" in obj:
-                review_obj["image"] = obj["image"]
-            else:
-                review_obj["image"] = []
-            print(json.dumps(review_obj, indent=2, default=str))
-            uuid=reviews.data.insert(
-                properties=review_obj
-            )     
-
-            # Calculate and display progress
-            counter += 1
-            if counter % interval == 0:
-                print(f"Imported {counter} reviews...")
-
-except Exception as e:
-    print(f"Exception: {e}")
-finally:  # This will always be executed, even if an exception is raised
-    client.close()  # Close the connection & release resources
+    try:
+        while True:
+            with metrics.timer("parse"):
+                new = source.poll(retries)
+            if new and not pending:
+                oldest = time.monotonic()
+            pending.extend(new)
+            while len(pending) >= args.batch_size:
+                counter += upsert(reviews, pending[:args.batch_size], retries, source, metrics)
+                pending = pending[args.batch_size:]
+                oldest = time.monotonic()
+            if pending and (time.monotonic() - oldest >= args.max_wait or not args.watch):
+                counter += upsert(reviews, pending, retries, source, metrics)
+                pending = []
+            metrics.set_counter("objects", counter)
+            metrics.set_counter("dead_lettered", retries.dead)
+            metrics.set_counter("failed", retries.dead)
+            metrics.set_gauge("pending", len(pending))
+            metrics.export(args)
+            if not new:
+                if not args.watch:
+                    break
+                time.sleep(args.poll_interval)
+    except KeyboardInterrupt:
+        if pending:
+            counter += upsert(reviews, pending, retries, source, metrics)
+    finally:
+        retries.close()
+    metrics.set_counter("objects", counter)
+    metrics.finish(args)
+    print(f"Upserted {counter} reviews, {retries.dead} failed (see {retries.dead_letter_path})")
+
+def main():
+    parser = argparse.ArgumentParser(description="Incrementally upsert new reviews into Weaviate")
+    parser.add_argument("path", help="newline-delimited review JSON file, or a directory of them")
+    parser.add_argument("--watch", action="store_true", help="keep following the file/directory for new records")
+    parser.add_argument("--collection", default=DEFAULT_COLLECTION)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="records per insert_many call")
+    parser.add_argument("--max-wait", type=float, default=DEFAULT_MAX_WAIT,
+                        help="seconds to wait for a micro-batch to fill before sending it anyway")
+    parser.add_argument("--poll-interval", type=float, default=DEFAULT_POLL_INTERVAL)
+    parser.add_argument("--state", metavar="PATH", help="offsets file (default: <path>.offsets.json)")
+    parser.add_argument("--dead-letter", metavar="PATH",
+                        help="NDJSON file for reviews Weaviate rejected (default: <path>.deadletter.ndjson)")
+    parser.add_argument("--max-attempts", type=int, default=retry_queue.DEFAULT_MAX_ATTEMPTS,
+                        help="times a review is tried before it is written to the dead-letter file")
+    ingest_metrics.add_arguments(parser)
+    args = parser.parse_args()
+    if not os.path.isdir(args.path):
+        import_common.check_json_path(args.path)
+
+    client = None
+    try:
+        client = import_common.connect_local()
+        run(client, args)
+    except Exception as e:
+        print(f"Exception: {e}")
+    finally:  # This will always be executed, even if an exception is raised
+        if client is not None:
+            client.close()  # Close the connection & release resources
+
+if __name__ == "__main__":
+    main()
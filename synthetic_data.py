@@ -0,0 +1,146 @@
+import argparse
+import json
+import os
+import random
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Reproducible stand-ins for the Amazon product metadata and review dumps,
+# for benchmarking the importers. Records are newline-delimited JSON with
+# the same field shapes as the real files, including the quirks the
+# importers normalize: rank as a string or a list, category/description as
+# a scalar or a list, and image/also_buy/reviewerName sometimes missing.
+
+ARTISTS = ["Charlie Parker", "Miles Davis", "Dire Straits", "John Coltrane", "Keith Green", "Trans-Siberian Orchestra",
+           "Ella Fitzgerald", "Dizzy Gillespie", "Wynton Marsalis", "Chet Baker", "Nina Simone", "Pink Floyd"]
+GENRES = ["Jazz", "Bebop", "Rock", "Classical", "Christian", "Holiday", "Blues", "Soul", "Ambient", "Pop"]
+WORDS = ["live", "greatest", "hits", "sessions", "collection", "anthology", "night", "dinner", "party", "background",
+         "trumpet", "saxophone", "ethereal", "eerie", "remastered", "deluxe", "edition", "studio", "concert", "ballads"]
+MONTHS = ["January", "February", "March", "April", "May", "June", "July", "August", "September", "October",
+          "November", "December"]
+
+def asin(i):
+    return f"B{i:09d}"
+
+def _sentence(rng, n):
+    return " ".join(rng.choices(WORDS, k=n)).capitalize() + "."
+
+def product_record(rng, i):
+    title = " ".join(rng.sample(WORDS, 3)).title()
+    artist = rng.choice(ARTISTS)
+    obj = {
+        "asin": asin(i),
+        "title": title,
+        "brand": artist,
+        "main_cat": "Digital Music",
+        "tech1": "",
+        "fit": "",
+        "feature": [],
+        "date": f"{MONTHS[rng.randrange(12)]} {rng.randint(1, 28)}, {rng.randint(1990, 2023)}",
+        "price": f"${rng.randint(5, 40)}.{rng.randint(0, 99):02d}" if rng.random() < 0.8 else "",
+    }
+    categories = ["CDs & Vinyl"] + rng.sample(GENRES, rng.randint(1, 3))
+    obj["category"] = categories if rng.random() < 0.9 else categories[-1]
+    description = [_sentence(rng, rng.randint(8, 40)) for _ in range(rng.randint(1, 3))]
+    roll = rng.random()
+    if roll < 0.75:
+        obj["description"] = description
+    elif roll < 0.9:
+        obj["description"] = description[0]
+    rank = f"{rng.randint(1, 2000000):,} in CDs & Vinyl ("
+    roll = rng.random()
+    if roll < 0.6:
+        obj["rank"] = rank
+    elif roll < 0.9:
+        obj["rank"] = [rank, f">#{rng.randint(1, 50000):,} in {rng.choice(GENRES)}"]
+    if rng.random() < 0.7:
+        obj["image"] = [f"https://images-na.ssl-images-amazon.com/images/I/{rng.getrandbits(48):012x}.jpg"
+                        for _ in range(rng.randint(1, 3))]
+    if rng.random() < 0.5:
+        obj["also_buy"] = [asin(rng.randrange(i + 1)) for _ in range(rng.randint(1, 10))]
+    if rng.random() < 0.5:
+        obj["also_view"] = [asin(rng.randrange(i + 1)) for _ in range(rng.randint(1, 10))]
+    return obj
+
+def review_record(rng, product_asin):
+    t = rng.randint(946684800, 1538352000)  # 2000-01-01 .. 2018-10-01, day granular like the dump
+    t -= t % 86400
+    obj = {
+        "overall": float(rng.randint(1, 5)),
+        "verified": rng.random() < 0.7,
+        "reviewTime": "",
+        "reviewerID": f"A{rng.getrandbits(52):013X}",
+        "asin": product_asin,
+        "reviewText": " ".join(_sentence(rng, rng.randint(5, 25)) for _ in range(rng.randint(1, 6))),
+        "summary": _sentence(rng, rng.randint(2, 6)),
+        "unixReviewTime": t,
+    }
+    month, day, year = _date_parts(t)
+    obj["reviewTime"] = f"{month:02d} {day}, {year}"
+    if rng.random() < 0.95:
+        obj["reviewerName"] = f"{rng.choice(['Jazz', 'Music', 'Vinyl', 'Audio'])} Fan {rng.randint(1, 99999)}"
+    if rng.random() < 0.3:
+        obj["vote"] = f"{rng.randint(2, 3000):,}"
+    if rng.random() < 0.2:
+        obj["style"] = {"Format:": rng.choice([" Audio CD", " MP3 Music", " Vinyl"])}
+    if rng.random() < 0.02:
+        obj["image"] = [f"https://images-na.ssl-images-amazon.com/images/I/{rng.getrandbits(48):012x}.jpg"]
+    return obj
+
+def _date_parts(t):
+    days = t // 86400
+    # Civil-from-days, to avoid a datetime per record
+    z = days + 719468
+    era = z // 146097
+    doe = z - era * 146097
+    yoe = (doe - doe // 1460 + doe // 36524 - doe // 146096) // 365
+    doy = doe - (365 * yoe + yoe // 4 - yoe // 100)
+    mp = (5 * doy + 2) // 153
+    day = doy - (153 * mp + 2) // 5 + 1
+    month = mp + 3 if mp < 10 else mp - 9
+    return month, day, yoe + era * 400 + (month <= 2)
+
+def _dumps(obj):
+    if orjson is not None:
+        return orjson.dumps(obj) + b"\n"
+    return (json.dumps(obj) + "\n").encode("utf-8")
+
+def write_products(path, count, seed=0):
+    rng = random.Random(seed)
+    with open(path, "wb") as f:
+        for i in range(count):
+            f.write(_dumps(product_record(rng, i)))
+
+def write_reviews(path, products, per_product=5, seed=0):
+    # Review counts per product are skewed like the real data: most products
+    # have a few reviews, a handful have very many
+    rng = random.Random(seed + 1)
+    count = 0
+    with open(path, "wb") as f:
+        for i in range(products):
+            for _ in range(min(int(rng.paretovariate(1.5) * per_product / 3), per_product * 50)):
+                f.write(_dumps(review_record(rng, asin(i))))
+                count += 1
+    return count
+
+def generate(out_dir, products, reviews_per_product=5, seed=0):
+    # Returns (products path, reviews path, review count)
+    os.makedirs(out_dir, exist_ok=True)
+    products_path = os.path.join(out_dir, f"products_{products}_{seed}.json")
+    reviews_path = os.path.join(out_dir, f"reviews_{products}x{reviews_per_product}_{seed}.json")
+    write_products(products_path, products, seed)
+    review_count = write_reviews(reviews_path, products, reviews_per_product, seed)
+    return products_path, reviews_path, review_count
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write synthetic Amazon-shaped product and review files")
+    parser.add_argument("out_dir")
+    parser.add_argument("--products", type=int, default=100000)
+    parser.add_argument("--reviews-per-product", type=int, default=5, help="average; the distribution is skewed")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    products_path, reviews_path, review_count = generate(args.out_dir, args.products, args.reviews_per_product, args.seed)
+    print(f"Wrote {args.products} products to {products_path} and {review_count} reviews to {reviews_path}")
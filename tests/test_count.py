@@ -0,0 +1,15 @@
+import count
+
+def shard(name, node, objects, queue=0):
+    return {"name": name, "node": node, "objects": objects, "vector_indexing_status": "READY",
+            "vector_queue_length": queue, "compressed": False}
+
+def test_shards_for_ignores_case():
+    shards = {"Product": [shard("s1", "node1", 5)], "Review": [shard("s1", "node1", 7)]}
+    assert count.shards_for(shards, "product") == shards["Product"]
+    assert count.shards_for(shards, "missing") == []
+
+def test_shard_totals_counts_each_replicated_shard_once():
+    shards = [shard("s1", "node1", 10, 2), shard("s1", "node2", 9, 4), shard("s2", "node2", 5),
+              shard("s2", "node3", 5)]
+    assert count.shard_totals(shards) == (15, 4)
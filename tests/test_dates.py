@@ -0,0 +1,16 @@
+import dates
+
+def test_unix_to_iso_memo_eviction(monkeypatch):
+    monkeypatch.setattr(dates, "MAX_MEMO_SIZE", 10)
+    monkeypatch.setattr(dates, "_memo", {})
+    assert dates.unix_to_iso([0, 86400]) == ["1970-01-01T00:00:00+00:00", "1970-01-02T00:00:00+00:00"]
+    # Overflows the memo while 0 is already memoized; it must survive the clear
+    chunk = [0] + [86400 * i for i in range(2, 12)]
+    result = dates.unix_to_iso(chunk)
+    assert result[0] == "1970-01-01T00:00:00+00:00"
+    assert result[-1] == "1970-01-12T00:00:00+00:00"
+    assert len(dates._memo) == len(chunk)
+
+def test_text_to_iso():
+    assert dates.text_to_iso(["May 3, 2015", "2015-05-03", "1999", "<div>", None, "x" * 50]) == [
+        "2015-05-03T00:00:00+00:00", "2015-05-03T00:00:00+00:00", "1999-01-01T00:00:00+00:00", None, None, None]
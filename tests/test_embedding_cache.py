@@ -0,0 +1,35 @@
+import numpy as np
+from embedding_cache import EmbeddingCache
+
+def test_round_trip_and_reload(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), "m")
+    cache.put_many(["a", "b"], [[1, 1], [2, 2]])
+    assert cache.get("a") == [1.0, 1.0]
+    assert cache.get("missing") is None
+    reloaded = EmbeddingCache(str(tmp_path), "m")
+    assert reloaded.get("b") == [2.0, 2.0]
+    assert len(reloaded) == 2
+
+def test_orphan_vector_rows_are_dropped(tmp_path):
+    # A writer that died after appending vectors but before appending keys
+    cache = EmbeddingCache(str(tmp_path), "m")
+    cache.put_many(["a", "b"], [[1, 1], [2, 2]])
+    with open(cache.vectors_path, "ab") as f:
+        f.write(np.asarray([[9, 9]], dtype=np.float32).tobytes())
+
+    cache = EmbeddingCache(str(tmp_path), "m")
+    cache.put_many(["c"], [[3, 3]])
+    assert cache.get("c") == [3.0, 3.0]
+    reloaded = EmbeddingCache(str(tmp_path), "m")
+    assert [reloaded.get(t) for t in "abc"] == [[1.0, 1.0], [2.0, 2.0], [3.0, 3.0]]
+
+def test_torn_key_is_dropped(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), "m")
+    cache.put_many(["a"], [[1, 1]])
+    with open(cache.keys_path, "ab") as f:
+        f.write(b"\x01\x02\x03")
+    cache = EmbeddingCache(str(tmp_path), "m")
+    cache.put_many(["b"], [[2, 2]])
+    reloaded = EmbeddingCache(str(tmp_path), "m")
+    assert reloaded.get("a") == [1.0, 1.0]
+    assert reloaded.get("b") == [2.0, 2.0]
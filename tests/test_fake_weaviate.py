@@ -0,0 +1,23 @@
+from types import SimpleNamespace
+import pytest
+import weaviate.classes.query as wq
+import fake_weaviate
+
+def product(**properties):
+    return SimpleNamespace(uuid="u1", properties=properties)
+
+def test_supported_filters():
+    obj = product(asin="A", price_value=5.0, category=["Jazz", "Pop"])
+    assert fake_weaviate._matches(wq.Filter.by_property("price_value").less_than(6)
+                                  & wq.Filter.by_property("category").contains_any(["Jazz"]), obj)
+    assert not fake_weaviate._matches(wq.Filter.by_property("asin").equal("B")
+                                      | wq.Filter.by_property("price_value").greater_than(5), obj)
+    assert fake_weaviate._matches(wq.Filter.by_property("rating_mean").is_none(True), obj)
+
+def test_unsupported_filters_raise_value_error():
+    obj = product(asin="A", location={"latitude": 1.0, "longitude": 2.0})
+    with pytest.raises(ValueError, match="unsupported filter operator"):
+        fake_weaviate._matches(wq.Filter.by_property("location").within_geo_range(
+            coordinate=wq.GeoCoordinate(latitude=1.0, longitude=2.0), distance=10.0), obj)
+    with pytest.raises(ValueError, match="unsupported filter target"):
+        fake_weaviate._matches(wq.Filter.by_ref("artist").by_property("name").equal("x"), obj)
@@ -0,0 +1,83 @@
+import io
+import json
+import import_common
+import ingest_metrics
+
+def write_ndjson(path, records):
+    with open(path, "w") as f:
+        for obj in records:
+            f.write(json.dumps(obj) + "\n")
+
+def test_compute_shards_split_on_line_boundaries(tmp_path):
+    path = tmp_path / "data.json"
+    records = [{"asin": f"A{i}", "text": "x" * (i % 7)} for i in range(100)]
+    write_ndjson(path, records)
+    data = path.read_bytes()
+    shards = import_common.compute_shards(str(path), 4)
+    assert shards[0][0] == 0 and shards[-1][1] == len(data)
+    for (_, end), (start, _) in zip(shards, shards[1:]):
+        assert end == start and data[start - 1:start] == b"\n"
+    seen = []
+    with open(path, "rb") as f:
+        for start, end in shards:
+            seen += [obj for _, obj in import_common.iter_ndjson(f, start, end)]
+    assert seen == records
+
+def test_compute_shards_more_shards_than_lines(tmp_path):
+    path = tmp_path / "data.json"
+    write_ndjson(path, [{"asin": "A"}, {"asin": "B"}])
+    shards = import_common.compute_shards(str(path), 10)
+    assert len(shards) <= 2
+    assert shards[-1][1] == path.stat().st_size
+
+def test_iter_ndjson_offsets_and_blank_lines():
+    data = b'{"a": 1}\n\n{"a": 2}\n{"a": 3}'
+    records = list(import_common.iter_ndjson(io.BytesIO(data), block_size=4))
+    assert [obj["a"] for _, obj in records] == [1, 2, 3]
+    assert [offset for offset, _ in records] == [9, 19, len(data)]
+    # Resuming from an offset picks up with the next record
+    assert [obj["a"] for _, obj in import_common.iter_ndjson(io.BytesIO(data), start=9)] == [2, 3]
+
+def test_is_ndjson(tmp_path, monkeypatch):
+    cases = {
+        "lines.json": "\n\n  " + json.dumps({"a": "x" * 200000}) + "\n{\"a\": 2}\n",
+        "array.json": "  \n[" + ",".join(json.dumps({"a": i}) for i in range(3)) + "]",
+        "pretty.json": json.dumps({"a": 1}, indent=2),
+        "concatenated.json": '{"a": 1}{"a": 2}',
+        "blank.json": "   \n",
+    }
+    for name, text in cases.items():
+        (tmp_path / name).write_text(text)
+    assert import_common.is_ndjson(str(tmp_path / "lines.json"))
+    for name in ("array.json", "pretty.json", "concatenated.json", "blank.json"):
+        assert not import_common.is_ndjson(str(tmp_path / name)), name
+    # A first line over the bound is one-line JSON, not a record
+    monkeypatch.setattr(import_common, "MAX_NDJSON_LINE", 1000)
+    assert not import_common.is_ndjson(str(tmp_path / "lines.json"))
+
+class Closeable:
+    def close(self):
+        pass
+
+def fake_shards(monkeypatch, *polls):
+    polls = list(polls)
+    monkeypatch.setattr(import_common, "connect_local", lambda node=None: Closeable())
+    monkeypatch.setattr(import_common.count, "shard_stats", lambda client: polls.pop(0) if len(polls) > 1 else polls[0])
+    monkeypatch.setattr(import_common.time, "sleep", lambda seconds: None)
+
+def shard(status, queue=0, name="s1"):
+    return {"name": name, "node": "node1", "objects": 10, "vector_indexing_status": status,
+            "vector_queue_length": queue, "compressed": False}
+
+def test_wait_indexed_ignores_lazy_loading_shards(monkeypatch):
+    metrics = ingest_metrics.Metrics("test")
+    fake_shards(monkeypatch, {"Product": [shard("INDEXING", 5), shard("LAZY_LOADING", name="s2")]},
+                {"Product": [shard("READY"), shard("LAZY_LOADING", name="s2")]})
+    assert import_common.wait_indexed("product", metrics, interval=0) is not None
+
+def test_wait_indexed_fails_without_shards_or_after_timeout(monkeypatch):
+    metrics = ingest_metrics.Metrics("test")
+    fake_shards(monkeypatch, {"Review": [shard("READY")]})
+    assert import_common.wait_indexed("product", metrics, interval=0) is None
+    fake_shards(monkeypatch, {"Product": [shard("INDEXING", 5)]})
+    assert import_common.wait_indexed("product", metrics, interval=0, timeout=0) is None
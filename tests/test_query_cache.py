@@ -0,0 +1,45 @@
+from types import SimpleNamespace
+import query_cache
+
+def objects(*asins):
+    return [SimpleNamespace(properties={"asin": asin}) for asin in asins]
+
+def test_fetch_caches_until_ttl(tmp_path, monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(query_cache.time, "monotonic", lambda: now[0])
+    cache = query_cache.QueryCache(ttl=10, stamp_dir=str(tmp_path))
+    key = cache.key("Product", "bm25", "jazz", limit=5)
+    calls = []
+    run = lambda: calls.append(1) or objects("A")
+    cache.fetch(key, run)
+    cache.fetch(key, run)
+    assert len(calls) == 1
+    now[0] += 11
+    cache.fetch(key, run)
+    assert len(calls) == 2
+    assert cache.stats()["hits"] == 1
+
+def test_lru_eviction_by_entries_and_bytes(tmp_path):
+    cache = query_cache.QueryCache(max_entries=2, stamp_dir=str(tmp_path))
+    for text in ("a", "b"):
+        cache.put(cache.key("product", "bm25", text), objects(text))
+    cache.get(cache.key("product", "bm25", "a"))
+    cache.put(cache.key("product", "bm25", "c"), objects("c"))
+    assert cache.get(cache.key("product", "bm25", "b")) is None
+    assert cache.get(cache.key("product", "bm25", "a")) is not None
+    assert cache.stats()["evictions"] == 1
+
+    small = query_cache.QueryCache(max_bytes=query_cache.ENTRY_OVERHEAD, stamp_dir=str(tmp_path))
+    small.put(small.key("product", "bm25", "big"), objects("A", "B"))
+    assert small.stats()["entries"] == 0
+
+def test_stamp_invalidates_other_caches(tmp_path, monkeypatch):
+    monkeypatch.setattr(query_cache, "STAMP_CHECK_INTERVAL", 0)
+    cache = query_cache.QueryCache(stamp_dir=str(tmp_path))
+    key = cache.key("Product", "bm25", "jazz")
+    cache.get(key)
+    cache.put(key, objects("A"))
+    assert cache.get(key) is not None
+    query_cache.mark_changed("Product", str(tmp_path))
+    assert cache.get(key) is None
+    assert cache.stats()["invalidations"] == 1
@@ -0,0 +1,40 @@
+import json
+from types import SimpleNamespace
+import retry_queue
+
+class FakeBatch:
+    def __init__(self):
+        self.added = []
+
+    def add_object(self, properties=None, uuid=None, vector=None):
+        self.added.append(uuid)
+
+def failure(uuid, message):
+    return SimpleNamespace(object_=SimpleNamespace(uuid=uuid, properties={"asin": uuid}, vector=None), message=message)
+
+def test_is_permanent():
+    assert retry_queue.is_permanent("invalid text property 'title' on class 'Product': not a string")
+    assert retry_queue.is_permanent("invalid number array property 'x'")
+    assert retry_queue.is_permanent("no such prop with name 'foo' found in class 'Product'")
+    assert not retry_queue.is_permanent("invalid response from vectorizer: 503")
+    assert not retry_queue.is_permanent("connection reset by peer")
+    assert not retry_queue.is_permanent(None)
+
+def test_transient_failures_are_retried_then_dead_lettered(tmp_path):
+    path = tmp_path / "dead.ndjson"
+    queue = retry_queue.RetryQueue("test", str(path), max_attempts=2, base_delay=0.0)
+    failed = [failure("u1", "timeout"), failure("u2", "invalid uuid")]
+    batch = FakeBatch()
+    assert queue.poll(batch, failed) == 1
+    assert batch.added == ["u1"]
+    assert queue.dead == 1
+
+    # collect() only looks at failures it hasn't seen yet
+    failed.append(failure("u1", "timeout"))
+    queue.poll(batch, failed)
+    queue.close()
+    assert batch.added == ["u1"]
+    assert queue.dead == 2
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [(r["uuid"], r["reason"]) for r in records] == [("u2", "permanent"), ("u1", "max attempts")]
+    assert records[1]["attempts"] == 2
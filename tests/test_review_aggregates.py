@@ -0,0 +1,50 @@
+import review_aggregates
+
+def test_merge_combines_spills_across_processes(tmp_path):
+    a = review_aggregates.ReviewAggregates(str(tmp_path), "run1", "w0", max_entries=2)
+    for asin, overall, verified, t in [("B", 4.0, True, 100), ("A", 2.0, False, 50), ("C", 5.0, True, 10)]:
+        a.add({"asin": asin, "overall": overall, "verified": verified, "unixReviewTime": t})
+    a.close()
+    b = review_aggregates.ReviewAggregates(str(tmp_path), "run1", "w1")
+    b.add({"asin": "B", "overall": None, "verified": False, "unixReviewTime": 200})
+    b.add({"asin": "A", "overall": 4.0, "verified": True, "unixReviewTime": 20})
+    b.close()
+    assert a.spills == 2
+
+    merged = dict(review_aggregates.merge(str(tmp_path), "run1"))
+    assert list(merged) == ["A", "B", "C"]
+    assert merged["A"]["review_count"] == 2
+    assert merged["A"]["rating_mean"] == 3.0
+    assert merged["A"]["verified_share"] == 0.5
+    assert merged["B"]["review_count"] == 2
+    assert merged["B"]["rating_mean"] == 4.0
+    assert merged["B"]["latest_review_date"].startswith("1970-01-01T00:03:20")
+    assert merged["C"]["review_count"] == 1
+
+def test_merge_ignores_other_runs_and_removed_reviews(tmp_path):
+    old = review_aggregates.ReviewAggregates(str(tmp_path), "run1", "w0")
+    old.add({"asin": "A", "overall": 1.0})
+    old.close()
+    aggregates = review_aggregates.ReviewAggregates(str(tmp_path), "run2", "w0", max_entries=1)
+    aggregates.add({"asin": "A", "overall": 5.0, "verified": True})
+    aggregates.add({"asin": "B", "overall": 3.0})
+    aggregates.add({"asin": "A", "overall": 2.0})
+    # Dead-lettered after its slot was spilled
+    aggregates.remove({"asin": "A", "overall": 2.0})
+    aggregates.remove({"asin": "B", "overall": 3.0})
+    aggregates.close()
+
+    merged = dict(review_aggregates.merge(str(tmp_path), "run2"))
+    assert list(merged) == ["A"]
+    assert merged["A"]["review_count"] == 1
+    assert merged["A"]["rating_mean"] == 5.0
+    assert merged["A"]["verified_share"] == 1.0
+
+def test_asins_with_tabs_and_newlines_round_trip(tmp_path):
+    aggregates = review_aggregates.ReviewAggregates(str(tmp_path), "run1", "w0")
+    for asin in ("A\tB", "A\nB", 'A"B', "C"):
+        aggregates.add({"asin": asin, "overall": 4.0})
+    aggregates.close()
+    merged = dict(review_aggregates.merge(str(tmp_path), "run1"))
+    assert sorted(merged) == sorted(["A\tB", "A\nB", 'A"B', "C"])
+    assert all(p["review_count"] == 1 and p["rating_mean"] == 4.0 for p in merged.values())
@@ -0,0 +1,44 @@
+import json
+from types import SimpleNamespace
+from weaviate.exceptions import WeaviateInsertManyAllFailedError
+import ingest_metrics
+import retry_queue
+import single_import_reviews
+
+class FakeData:
+    def __init__(self, fail):
+        self.fail = fail
+        self.calls = 0
+
+    def insert_many(self, data):
+        self.calls += 1
+        return self.fail(data)
+
+def upsert(tmp_path, monkeypatch, fail):
+    monkeypatch.setattr(single_import_reviews.query_cache, "mark_changed", lambda name: None)
+    path = tmp_path / "reviews.json"
+    path.write_text("".join(json.dumps({"asin": f"A{i}", "reviewerID": "R", "overall": 5.0}) + "\n" for i in range(3)))
+    retries = retry_queue.RetryQueue("test", str(tmp_path / "dead.ndjson"), max_attempts=3, base_delay=0.0)
+    source = single_import_reviews.TailSource(str(path), str(tmp_path / "offsets.json"))
+    reviews = SimpleNamespace(data=FakeData(fail), name="review")
+    sent = single_import_reviews.upsert(reviews, source.poll(retries), retries, source, ingest_metrics.Metrics("test"))
+    retries.close()
+    dead = [json.loads(line) for line in (tmp_path / "dead.ndjson").read_text().splitlines()] if retries.dead else []
+    return sent, reviews.data.calls, dead, source.committed[str(path)]
+
+def test_all_failed_permanent_errors_are_dead_lettered(tmp_path, monkeypatch):
+    def fail(data):
+        if len(data) > 1 or data[0].properties["asin"] == "A1":
+            raise WeaviateInsertManyAllFailedError("invalid text property 'reviewText'")
+        return SimpleNamespace(errors={})
+    sent, calls, dead, offset = upsert(tmp_path, monkeypatch, fail)
+    assert sent == 2
+    assert [(r["properties"]["asin"], r["reason"]) for r in dead] == [("A1", "permanent")]
+    assert offset == (tmp_path / "reviews.json").stat().st_size
+
+def test_transient_errors_stop_at_max_attempts(tmp_path, monkeypatch):
+    def fail(data):
+        raise ConnectionError("connection refused")
+    sent, calls, dead, _ = upsert(tmp_path, monkeypatch, fail)
+    assert sent == 0
+    assert {(r["reason"], r["attempts"]) for r in dead} == {("max attempts", 3)}
@@ -0,0 +1,118 @@
+import sys
+import weaviate.classes.config as wc
+
+# Vector index settings for the collections the importers create. Left at
+# the defaults, Weaviate builds an uncompressed HNSW index, which keeps every
+# float32 vector in memory; these options pick the index type, compression
+# and HNSW parameters instead. bench_index.py measures what each choice
+# costs in memory, import rate and recall.
+#
+#   hnsw     graph index, the default
+#   flat     brute-force scan, no graph; fine for small collections
+#   dynamic  flat until --dynamic-threshold objects, then HNSW (needs ASYNC_INDEXING)
+#
+#   pq  product quantization, one byte per segment (HNSW only)
+#   bq  binary quantization, one bit per dimension
+#   sq  scalar quantization, one byte per dimension (HNSW only)
+
+INDEX_TYPES = ("hnsw", "flat", "dynamic")
+QUANTIZERS = ("none", "pq", "bq", "sq")
+FLAT_QUANTIZERS = ("none", "bq")  # what Weaviate supports on a flat index
+
+def add_arguments(parser):
+    parser.add_argument("--vector-index", choices=INDEX_TYPES, default=None,
+                        help="vector index type for a newly created collection (default: the server's, HNSW)")
+    parser.add_argument("--quantizer", choices=QUANTIZERS, default="none",
+                        help="compress vectors held in memory; pq and sq need an HNSW index")
+    add_tuning_arguments(parser)
+
+def add_tuning_arguments(parser):
+    parser.add_argument("--ef", type=int, help="HNSW query-time candidate list size (default: dynamic)")
+    parser.add_argument("--ef-construction", type=int, help="HNSW build-time candidate list size")
+    parser.add_argument("--max-connections", type=int, help="HNSW edges per node")
+    parser.add_argument("--pq-segments", type=int, help="PQ segments, must divide the vector dimensions")
+    parser.add_argument("--training-limit", type=int,
+                        help="objects PQ/SQ train on before compressing the rest")
+    parser.add_argument("--rescore-limit", type=int,
+                        help="BQ/SQ candidates re-ranked with the uncompressed vectors")
+    parser.add_argument("--dynamic-threshold", type=int, help="objects before a dynamic index switches to HNSW")
+
+def quantizer_config(quantizer, pq_segments=None, training_limit=None, rescore_limit=None):
+    if quantizer in (None, "none"):
+        return None
+    if quantizer == "pq":
+        return wc.Configure.VectorIndex.Quantizer.pq(segments=pq_segments, training_limit=training_limit)
+    if quantizer == "bq":
+        return wc.Configure.VectorIndex.Quantizer.bq(rescore_limit=rescore_limit)
+    if quantizer == "sq":
+        return wc.Configure.VectorIndex.Quantizer.sq(training_limit=training_limit, rescore_limit=rescore_limit)
+    raise ValueError(f"Unknown quantizer {quantizer!r}")
+
+def index_config(index_type=None, quantizer="none", ef=None, ef_construction=None, max_connections=None,
+                 pq_segments=None, training_limit=None, rescore_limit=None, dynamic_threshold=None):
+    # None when nothing was asked for, so the server default applies
+    hnsw_tuning = {"ef": ef, "ef_construction": ef_construction, "max_connections": max_connections}
+    if index_type is None:
+        if quantizer in (None, "none") and not any(v is not None for v in hnsw_tuning.values()):
+            return None
+        index_type = "hnsw"
+    if index_type == "flat" and any(v is not None for v in hnsw_tuning.values()):
+        raise ValueError("--ef, --ef-construction and --max-connections only apply to HNSW indexes")
+    if index_type in ("flat", "dynamic") and quantizer not in FLAT_QUANTIZERS:
+        raise ValueError(f"a {index_type} index can only be compressed with bq")
+    if dynamic_threshold is not None and index_type != "dynamic":
+        raise ValueError("--dynamic-threshold only applies to --vector-index dynamic")
+    compression = quantizer_config(quantizer, pq_segments, training_limit, rescore_limit)
+    if index_type == "hnsw":
+        return wc.Configure.VectorIndex.hnsw(quantizer=compression, **hnsw_tuning)
+    if index_type == "flat":
+        return wc.Configure.VectorIndex.flat(quantizer=compression)
+    if index_type == "dynamic":
+        return wc.Configure.VectorIndex.dynamic(
+            threshold=dynamic_threshold,
+            hnsw=wc.Configure.VectorIndex.hnsw(quantizer=compression, **hnsw_tuning),
+            flat=wc.Configure.VectorIndex.flat(quantizer=compression),
+        )
+    raise ValueError(f"Unknown vector index type {index_type!r}")
+
+def tuning_from_args(args):
+    return {
+        "ef": args.ef,
+        "ef_construction": args.ef_construction,
+        "max_connections": args.max_connections,
+        "pq_segments": args.pq_segments,
+        "training_limit": args.training_limit,
+        "rescore_limit": args.rescore_limit,
+        "dynamic_threshold": args.dynamic_threshold,
+    }
+
+def config_from_args(args):
+    try:
+        return index_config(args.vector_index, args.quantizer, **tuning_from_args(args))
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+def describe(index_type, quantizer):
+    return index_type if quantizer in (None, "none") else f"{index_type}+{quantizer}"
+
+def parse_setting(text):
+    # "hnsw", "hnsw+pq", "flat+bq", ... -> (index type, quantizer)
+    index_type, _, quantizer = text.partition("+")
+    if index_type not in INDEX_TYPES or (quantizer or "none") not in QUANTIZERS:
+        raise ValueError(f"Unknown vector index setting {text!r}, expected e.g. hnsw, hnsw+pq, flat+bq")
+    return index_type, quantizer or "none"
+
+def compressed_vector_bytes(dimensions, quantizer, pq_segments=None):
+    # In-memory bytes per vector once compression has kicked in; the
+    # uncompressed vectors stay on disk for rescoring. PQ's default segment
+    # count is chosen by the server, so it's unknown here without --pq-segments.
+    if quantizer in (None, "none"):
+        return dimensions * 4
+    if quantizer == "bq":
+        return (dimensions + 7) // 8
+    if quantizer == "sq":
+        return dimensions
+    if quantizer == "pq":
+        return pq_segments
+    return None